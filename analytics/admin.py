@@ -0,0 +1,6 @@
+from django.contrib import admin
+
+from analytics.models import BookCirculation, DailyCirculation
+
+admin.site.register(DailyCirculation)
+admin.site.register(BookCirculation)
@@ -0,0 +1,104 @@
+# Generated by Django 4.2.5 on 2026-10-17 09:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("books", "0004_book_facet_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyCirculation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("borrowed", models.IntegerField(default=0)),
+                ("returned", models.IntegerField(default=0)),
+                ("late_returns", models.IntegerField(default=0)),
+                ("overdue", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "fines_revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ("date",),
+            },
+        ),
+        migrations.CreateModel(
+            name="RolledUpBorrowing",
+            fields=[
+                (
+                    "borrowing_id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                ("book_id", models.BigIntegerField()),
+                ("borrow_date", models.DateField()),
+                ("returned_on", models.DateField(blank=True, null=True)),
+                ("late", models.BooleanField(default=False)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "fines_revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="BookCirculation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("borrowed", models.IntegerField(default=0)),
+                ("returned", models.IntegerField(default=0)),
+                ("late_returns", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "fines_revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="circulation",
+                        to="books.book",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-borrowed", "id"),
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import models
+
+from books.models import Book
+
+
+class DailyCirculation(models.Model):
+    """Circulation and revenue of one day, kept by the rollup task.
+
+    Borrowing fees are booked on the borrow date, fines on the return
+    date. ``overdue`` is the number of overdue borrowings the last time
+    the task ran on that day.
+    """
+
+    date = models.DateField(unique=True)
+    borrowed = models.IntegerField(default=0)
+    returned = models.IntegerField(default=0)
+    late_returns = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fines_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("date",)
+
+    def __str__(self):
+        return f"Circulation of {self.date}: {self.borrowed} borrowed"
+
+
+class BookCirculation(models.Model):
+    """All-time circulation and revenue of one book, kept by the rollup task"""
+
+    book = models.OneToOneField(
+        Book, on_delete=models.CASCADE, related_name="circulation"
+    )
+    borrowed = models.IntegerField(default=0)
+    returned = models.IntegerField(default=0)
+    late_returns = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fines_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-borrowed", "id")
+
+    def __str__(self):
+        return f"Circulation of {self.book}: {self.borrowed} borrowed"
+
+
+class RolledUpBorrowing(models.Model):
+    """What the rollups already count of a borrowing.
+
+    A changed borrowing is compared with this row, so only the difference
+    goes into the rollups and processing the same change twice adds
+    nothing. It outlives the borrowing when that is archived.
+    """
+
+    borrowing_id = models.BigIntegerField(primary_key=True)
+    book_id = models.BigIntegerField()
+    borrow_date = models.DateField()
+    returned_on = models.DateField(null=True, blank=True)
+    late = models.BooleanField(default=False)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fines_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Rolled up borrowing {self.borrowing_id}"
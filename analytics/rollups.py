@@ -0,0 +1,209 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from analytics.models import BookCirculation, DailyCirculation, RolledUpBorrowing
+from borrowings.models import Borrowing, TaskWatermark
+
+ROLLUP_BATCH_SIZE = 5000
+ROLLUP_WATERMARK = "analytics:rollups"
+# Rows committed after the watermark moved past their updated_at
+ROLLUP_OVERLAP = timedelta(minutes=5)
+
+ROLLUP_FIELDS = {
+    "borrowed": "integer",
+    "returned": "integer",
+    "late_returns": "integer",
+    "revenue": "numeric",
+    "fines_revenue": "numeric",
+}
+SNAPSHOT_FIELDS = (
+    "book_id",
+    "borrow_date",
+    "returned_on",
+    "late",
+    "revenue",
+    "fines_revenue",
+)
+
+
+def _paid(payment_type: str):
+    return Coalesce(
+        Sum(
+            "payments__money_to_pay",
+            filter=Q(payments__type=payment_type, payments__status="Paid"),
+        ),
+        Value(Decimal(0)),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def get_changed_borrowings(after: tuple | None, batch_size: int) -> list[dict]:
+    """Next batch in (updated_at, id) order, with the paid amounts"""
+    queryset = Borrowing.objects.order_by("updated_at", "id")
+    if after is not None:
+        changed_at, after_id = after
+        queryset = queryset.filter(
+            Q(updated_at__gt=changed_at) | Q(updated_at=changed_at, id__gt=after_id)
+        )
+    return list(
+        queryset.annotate(revenue=_paid("Payment"), fines_revenue=_paid("Fine")).values(
+            "id",
+            "book_id",
+            "borrow_date",
+            "expected_return_date",
+            "actual_return_date",
+            "updated_at",
+            "revenue",
+            "fines_revenue",
+        )[:batch_size]
+    )
+
+
+def _snapshot(row: dict) -> RolledUpBorrowing:
+    returned_on = row["actual_return_date"]
+    return RolledUpBorrowing(
+        borrowing_id=row["id"],
+        book_id=row["book_id"],
+        borrow_date=row["borrow_date"],
+        returned_on=returned_on,
+        late=returned_on is not None and returned_on > row["expected_return_date"],
+        revenue=row["revenue"],
+        fines_revenue=row["fines_revenue"],
+    )
+
+
+def _add_snapshot(days: dict, books: dict, snapshot: RolledUpBorrowing, sign: int):
+    """Adds (or with ``sign=-1`` takes back) what a borrowing counts for"""
+    book = books[snapshot.book_id]
+    borrow_day = days[snapshot.borrow_date]
+    for counts in (borrow_day, book):
+        counts["borrowed"] += sign
+        counts["revenue"] += sign * snapshot.revenue
+    if snapshot.returned_on is not None:
+        for counts in (days[snapshot.returned_on], book):
+            counts["returned"] += sign
+            counts["late_returns"] += sign * snapshot.late
+    for counts in (days[snapshot.returned_on or snapshot.borrow_date], book):
+        counts["fines_revenue"] += sign * snapshot.fines_revenue
+
+
+def _apply_deltas(
+    model, key_column: str, key_type: str, changes: dict, defaults: str = ""
+) -> None:
+    """Adds the deltas to the rollup rows with one upsert, in key order"""
+    changes = {key: delta for key, delta in changes.items() if any(delta.values())}
+    if not changes:
+        return
+    table = model._meta.db_table
+    columns = ", ".join(ROLLUP_FIELDS)
+    row = ", ".join(
+        [f"%s::{key_type}"] + [f"%s::{db_type}" for db_type in ROLLUP_FIELDS.values()]
+    )
+    values = ", ".join([f"({row})"] * len(changes))
+    params = []
+    for key in sorted(changes):
+        params.append(key)
+        params.extend(changes[key].get(field, 0) for field in ROLLUP_FIELDS)
+    updates = ", ".join(
+        f"{field} = {table}.{field} + EXCLUDED.{field}" for field in ROLLUP_FIELDS
+    )
+    default_columns = "".join(f", {column}" for column in defaults.split())
+    default_values = ", 0" * len(defaults.split())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} ({key_column}, {columns}{default_columns}, updated_at)
+            SELECT *{default_values}, now() FROM (VALUES {values}) AS delta
+            ON CONFLICT ({key_column}) DO UPDATE
+            SET {updates}, updated_at = EXCLUDED.updated_at
+            """,
+            params,
+        )
+
+
+def fold_into_rollups(rows: list[dict]) -> None:
+    """Moves the rollups by the difference between the rows and what they
+    already count for, then records the new snapshots"""
+    rolled_up = RolledUpBorrowing.objects.in_bulk([row["id"] for row in rows])
+    days = defaultdict(lambda: defaultdict(int))
+    books = defaultdict(lambda: defaultdict(int))
+    snapshots = []
+    for row in rows:
+        snapshot = _snapshot(row)
+        previous = rolled_up.get(row["id"])
+        if previous is not None:
+            if all(
+                getattr(previous, field) == getattr(snapshot, field)
+                for field in SNAPSHOT_FIELDS
+            ):
+                continue
+            _add_snapshot(days, books, previous, -1)
+        _add_snapshot(days, books, snapshot, 1)
+        snapshots.append(snapshot)
+
+    _apply_deltas(DailyCirculation, "date", "date", days, defaults="overdue")
+    _apply_deltas(BookCirculation, "book_id", "bigint", books)
+    RolledUpBorrowing.objects.bulk_create(
+        snapshots,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["borrowing_id"],
+        update_fields=list(SNAPSHOT_FIELDS),
+    )
+
+
+def record_overdue(today: date) -> None:
+    """Overdue count of the day, read from the active due-date index"""
+    overdue = Borrowing.objects.filter(
+        actual_return_date__isnull=True, expected_return_date__lt=today
+    ).count()
+    DailyCirculation.objects.bulk_create(
+        [DailyCirculation(date=today, overdue=overdue)],
+        update_conflicts=True,
+        unique_fields=["date"],
+        update_fields=["overdue", "updated_at"],
+    )
+
+
+def roll_up_borrowings(today: date = None, batch_size: int = ROLLUP_BATCH_SIZE) -> int:
+    """Folds the borrowings changed since the watermark into the rollups.
+
+    Payments move the ``updated_at`` of their borrowing, so one keyset scan
+    of the changed borrowings covers both. Each batch runs in a transaction
+    holding the watermark row, so concurrent runs never fold the same
+    batch. The scan starts ``ROLLUP_OVERLAP`` before the watermark; rows
+    already counted are no-ops thanks to RolledUpBorrowing. Returns the
+    number of borrowings scanned.
+    """
+    today = today or datetime.now().date()
+    position = None
+    scanned = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = TaskWatermark.objects.select_for_update().get_or_create(
+                name=ROLLUP_WATERMARK
+            )
+            changed_at = watermark.value.get("updated_at")
+            if position is None and changed_at:
+                position = (datetime.fromisoformat(changed_at) - ROLLUP_OVERLAP, 0)
+            rows = get_changed_borrowings(position, batch_size)
+            if rows:
+                fold_into_rollups(rows)
+                last = rows[-1]
+                position = (last["updated_at"], last["id"])
+                if not changed_at or last["updated_at"] > datetime.fromisoformat(
+                    changed_at
+                ):
+                    watermark.value = {"updated_at": last["updated_at"].isoformat()}
+                    watermark.save()
+        scanned += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    record_overdue(today)
+    return scanned
@@ -0,0 +1,41 @@
+from rest_framework import serializers
+
+from analytics.models import BookCirculation, DailyCirculation
+
+
+class DailyCirculationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyCirculation
+        fields = (
+            "date",
+            "borrowed",
+            "returned",
+            "late_returns",
+            "overdue",
+            "revenue",
+            "fines_revenue",
+        )
+
+
+class CirculationSummarySerializer(serializers.Serializer):
+    borrowed = serializers.IntegerField()
+    returned = serializers.IntegerField()
+    late_returns = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    fines_revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class BookCirculationSerializer(serializers.ModelSerializer):
+    book = serializers.StringRelatedField(many=False, read_only=True)
+
+    class Meta:
+        model = BookCirculation
+        fields = (
+            "book_id",
+            "book",
+            "borrowed",
+            "returned",
+            "late_returns",
+            "revenue",
+            "fines_revenue",
+        )
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from analytics.rollups import roll_up_borrowings
+
+
+@shared_task
+def update_analytics_rollups() -> int:
+    return roll_up_borrowings()
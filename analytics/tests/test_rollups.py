@@ -0,0 +1,177 @@
+import decimal
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from analytics.models import BookCirculation, DailyCirculation
+from analytics.rollups import ROLLUP_OVERLAP, ROLLUP_WATERMARK, roll_up_borrowings
+from books.tests.test_book_api import sample_book
+from borrowings.models import Borrowing, TaskWatermark
+from payments.models import Payment
+
+DAILY_URL = reverse("analytics:dailycirculation-list")
+SUMMARY_URL = reverse("analytics:dailycirculation-summary")
+BOOKS_URL = reverse("analytics:bookcirculation-list")
+
+
+class RollupTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.book = sample_book()
+        self.other_book = sample_book(title="other")
+        self.today = datetime.now().date()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def create_borrowing(self, book, expected_in: int, **params) -> Borrowing:
+        return Borrowing.objects.create(
+            expected_return_date=self.today + timedelta(days=expected_in),
+            book=book,
+            user=self.user,
+            **params,
+        )
+
+    def get_day(self, day):
+        return DailyCirculation.objects.values(
+            "borrowed",
+            "returned",
+            "late_returns",
+            "overdue",
+            "revenue",
+            "fines_revenue",
+        ).get(date=day)
+
+    def test_rollups_follow_borrowings_and_payments(self):
+        on_time = self.create_borrowing(self.book, 3, actual_return_date=self.today)
+        late = self.create_borrowing(self.book, -1, actual_return_date=self.today)
+        overdue = self.create_borrowing(self.other_book, -2)
+        Borrowing.objects.filter(id=late.id).update(borrow_date=self.yesterday)
+        Payment.objects.create(
+            status="Paid", type="Payment", borrowing=on_time, money_to_pay=20
+        )
+        Payment.objects.create(
+            status="Paid", type="Fine", borrowing=late, money_to_pay=5
+        )
+        Payment.objects.create(
+            status="Pending", type="Payment", borrowing=overdue, money_to_pay=7
+        )
+
+        roll_up_borrowings(self.today)
+        first_run = self.get_day(self.today)
+        roll_up_borrowings(self.today)
+        Borrowing.objects.filter(id=overdue.id).update(
+            actual_return_date=self.today, updated_at=timezone.now()
+        )
+        Payment.objects.filter(borrowing=overdue).update(status="Paid")
+        roll_up_borrowings(self.today)
+
+        self.assertEquals(
+            first_run,
+            {
+                "borrowed": 2,
+                "returned": 2,
+                "late_returns": 1,
+                "overdue": 1,
+                "revenue": decimal.Decimal(20),
+                "fines_revenue": decimal.Decimal(5),
+            },
+        )
+        self.assertEquals(self.get_day(self.yesterday)["borrowed"], 1)
+        self.assertEquals(
+            self.get_day(self.today),
+            {
+                "borrowed": 2,
+                "returned": 3,
+                "late_returns": 2,
+                "overdue": 0,
+                "revenue": decimal.Decimal(27),
+                "fines_revenue": decimal.Decimal(5),
+            },
+        )
+        self.assertEquals(
+            list(
+                BookCirculation.objects.values_list(
+                    "book_id", "borrowed", "returned", "revenue"
+                )
+            ),
+            [(self.book.id, 2, 2, 20), (self.other_book.id, 1, 1, 7)],
+        )
+
+    def test_rollups_scan_only_rows_changed_since_watermark(self):
+        borrowing = self.create_borrowing(self.book, 3)
+        self.assertEquals(roll_up_borrowings(self.today), 1)
+        watermark = TaskWatermark.objects.get(name=ROLLUP_WATERMARK)
+        stale = datetime.fromisoformat(watermark.value["updated_at"]) - (
+            ROLLUP_OVERLAP * 2
+        )
+        Borrowing.objects.filter(id=borrowing.id).update(
+            actual_return_date=self.today, updated_at=stale
+        )
+
+        scanned = roll_up_borrowings(self.today)
+
+        self.assertEquals(scanned, 0)
+        self.assertEquals(self.get_day(self.today)["returned"], 0)
+
+
+@override_settings(QUERY_INSPECTOR="raise")
+class AnalyticsApiTests(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.admin = get_user_model().objects.create_user(
+            "admin@tests.com", "unique_password", is_staff=True
+        )
+        self.book = sample_book()
+        self.today = datetime.now().date()
+        DailyCirculation.objects.bulk_create(
+            DailyCirculation(
+                date=self.today - timedelta(days=days),
+                borrowed=days,
+                revenue=decimal.Decimal(days * 10),
+            )
+            for days in range(20)
+        )
+        BookCirculation.objects.create(book=self.book, borrowed=3)
+
+    def test_analytics_for_staff_only(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(DAILY_URL)
+
+        self.assertEquals(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_daily_rollups_by_date_range(self):
+        self.client.force_authenticate(self.admin)
+        date_from = (self.today - timedelta(days=9)).isoformat()
+
+        response = self.client.get(
+            DAILY_URL, {"date_from": date_from, "date_to": self.today.isoformat()}
+        )
+        summary = self.client.get(SUMMARY_URL, {"date_from": date_from})
+        invalid = self.client.get(DAILY_URL, {"date_from": "yesterday"})
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data["count"], 10)
+        self.assertEquals(response.data["results"][0]["date"], date_from)
+        self.assertEquals(summary.data["borrowed"], 45)
+        self.assertEquals(summary.data["revenue"], "450.00")
+        self.assertEquals(summary.data["late_returns"], 0)
+        self.assertEquals(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_book_rollups(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(BOOKS_URL)
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data["results"][0]["book_id"], self.book.id)
+        self.assertEquals(response.data["results"][0]["borrowed"], 3)
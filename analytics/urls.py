@@ -0,0 +1,11 @@
+from rest_framework import routers
+
+from analytics.views import BookCirculationViewSet, DailyCirculationViewSet
+
+router = routers.DefaultRouter()
+router.register("daily", DailyCirculationViewSet)
+router.register("books", BookCirculationViewSet)
+
+urlpatterns = router.urls
+
+app_name = "analytics"
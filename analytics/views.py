@@ -0,0 +1,102 @@
+import rest_framework_simplejwt.authentication
+from django.db.models import Sum
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.serializers import DateField
+from rest_framework.viewsets import GenericViewSet
+
+from analytics.models import BookCirculation, DailyCirculation
+from analytics.serializers import (
+    BookCirculationSerializer,
+    CirculationSummarySerializer,
+    DailyCirculationSerializer,
+)
+
+DATE_RANGE_PARAMETERS = [
+    OpenApiParameter(
+        "date_from",
+        type={"type": "string"},
+        description="From the date, included (ex. ?date_from=2023-01-01)",
+    ),
+    OpenApiParameter(
+        "date_to",
+        type={"type": "string"},
+        description="To the date, included (ex. ?date_to=2023-01-31)",
+    ),
+]
+
+
+class DailyCirculationViewSet(mixins.ListModelMixin, GenericViewSet):
+    """Staff dashboards read the daily rollups, one row per day"""
+
+    queryset = DailyCirculation.objects.all()
+    serializer_class = DailyCirculationSerializer
+    permission_classes = (IsAdminUser,)
+    query_budgets = {
+        "list": 2,
+        "summary": 1,
+    }
+    authentication_classes = (
+        rest_framework_simplejwt.authentication.JWTAuthentication,
+    )
+
+    @staticmethod
+    def _params_to_date(name: str, qs: str):
+        """Converts an ISO date, a 400 response when it isn't one"""
+        try:
+            return DateField().to_internal_value(qs)
+        except ValidationError as error:
+            raise ValidationError({name: error.detail})
+
+    def get_queryset(self):
+        queryset = self.queryset
+
+        """Filtering by date range"""
+        date_from = self.request.query_params.get("date_from")
+        date_to = self.request.query_params.get("date_to")
+        if date_from:
+            queryset = queryset.filter(
+                date__gte=self._params_to_date("date_from", date_from)
+            )
+        if date_to:
+            queryset = queryset.filter(
+                date__lte=self._params_to_date("date_to", date_to)
+            )
+        return queryset
+
+    @extend_schema(parameters=DATE_RANGE_PARAMETERS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=DATE_RANGE_PARAMETERS,
+        responses=CirculationSummarySerializer,
+    )
+    @action(methods=["GET"], detail=False, url_path="summary")
+    def summary(self, request):
+        """Endpoint for the totals of the date range, summed over the days"""
+        totals = self.get_queryset().aggregate(
+            **{field: Sum(field) for field in CirculationSummarySerializer().fields}
+        )
+        serializer = CirculationSummarySerializer(
+            {field: total or 0 for field, total in totals.items()}
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class BookCirculationViewSet(mixins.ListModelMixin, GenericViewSet):
+    """All-time circulation per book, the most borrowed first"""
+
+    queryset = BookCirculation.objects.all().select_related("book")
+    serializer_class = BookCirculationSerializer
+    permission_classes = (IsAdminUser,)
+    query_budgets = {
+        "list": 2,
+    }
+    authentication_classes = (
+        rest_framework_simplejwt.authentication.JWTAuthentication,
+    )
@@ -0,0 +1,208 @@
+import bisect
+import threading
+import time
+from array import array
+from typing import Iterable
+
+from books.cache import get_titles_version
+from books.models import Book
+
+AUTOCOMPLETE_FIELDS = ("title", "author")
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+VERSION_CHECK_INTERVAL = 5
+OFFSET_BITS = 8
+OFFSET_MASK = (1 << OFFSET_BITS) - 1
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def get_word_offsets(normalized: str) -> list[int]:
+    """Start of every word, up to the largest offset an entry can store"""
+    offsets = [0]
+    offsets += [
+        position + 1
+        for position, char in enumerate(normalized)
+        if char == " " and position < OFFSET_MASK
+    ]
+    return offsets
+
+
+class PrefixIndex:
+    """Sorted array of title/author word starts answering prefix lookups.
+
+    Every distinct title and author is stored once with a reference count
+    of the books sharing it; the sorted array holds one packed integer
+    (text id and word offset) per word of it, ordered by the normalized
+    text from that word on. A lookup bisects to the prefix and reads at
+    most ``limit`` matches, so "potter" finds "Harry Potter".
+
+    The index is built lazily on the first lookup, kept up to date by the
+    Book signals of this process, and rebuilt when the titles version
+    shows that another process changed the titles or authors. Inventory
+    changes leave that version alone, so they never cause a rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    @property
+    def is_built(self) -> bool:
+        return self._version is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = array("q")
+            self._texts: list[tuple | None] = []
+            self._normalized: list[str] = []
+            self._text_ids: dict[tuple, int] = {}
+            self._references: list[int] = []
+            self._free_ids: list[int] = []
+            self._book_texts: dict[int, tuple] = {}
+            self._version = None
+            self._next_check = 0.0
+
+    def build(self, books: Iterable[tuple[int, str, str]] = None) -> None:
+        version = get_titles_version()
+        if books is None:
+            books = Book.objects.values_list("id", "title", "author").iterator(
+                chunk_size=5000
+            )
+
+        index = PrefixIndex()
+        for book_id, title, author in books:
+            index._book_texts[book_id] = (
+                index._acquire("title", title),
+                index._acquire("author", author),
+            )
+        entries = [
+            text_id << OFFSET_BITS | offset
+            for text_id, normalized in enumerate(index._normalized)
+            for offset in get_word_offsets(normalized)
+        ]
+        entries.sort(key=index._key)
+        index._entries = array("q", entries)
+
+        with self._lock:
+            self._entries = index._entries
+            self._texts = index._texts
+            self._normalized = index._normalized
+            self._text_ids = index._text_ids
+            self._references = index._references
+            self._free_ids = index._free_ids
+            self._book_texts = index._book_texts
+            self._version = version
+            self._next_check = time.monotonic() + VERSION_CHECK_INTERVAL
+
+    def update(self, book_id: int, title: str, author: str) -> None:
+        with self._lock:
+            old_text_ids = self._book_texts.get(book_id, ())
+            text_ids = (
+                self._acquire("title", title, insert=True),
+                self._acquire("author", author, insert=True),
+            )
+            for text_id in old_text_ids:
+                self._release(text_id)
+            self._book_texts[book_id] = text_ids
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            for text_id in self._book_texts.pop(book_id, ()):
+                self._release(text_id)
+
+    def mark_version(self, version: int) -> None:
+        """Records the version of a change this process applied.
+
+        Only when the index was at the version right before it; otherwise
+        another process changed the titles too and the index is rebuilt.
+        """
+        with self._lock:
+            if self._version is not None and self._version == version - 1:
+                self._version = version
+
+    def search(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[dict]:
+        """Returns up to ``limit`` distinct titles and authors by prefix"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self._refresh()
+
+        results = []
+        seen = set()
+        with self._lock:
+            entries = self._entries
+            position = bisect.bisect_left(entries, prefix, key=self._key)
+            while position < len(entries) and len(results) < limit:
+                entry = entries[position]
+                if not self._key(entry).startswith(prefix):
+                    break
+                text_id = entry >> OFFSET_BITS
+                if text_id not in seen:
+                    seen.add(text_id)
+                    field, text = self._texts[text_id]
+                    results.append({"field": field, "value": text})
+                position += 1
+        return results
+
+    def _key(self, entry: int) -> str:
+        return self._normalized[entry >> OFFSET_BITS][entry & OFFSET_MASK :]
+
+    def _refresh(self) -> None:
+        if not self.is_built:
+            self.build()
+            return
+        if time.monotonic() < self._next_check:
+            return
+        self._next_check = time.monotonic() + VERSION_CHECK_INTERVAL
+        if get_titles_version() != self._version:
+            self.build()
+
+    def _acquire(self, field: str, text: str, insert: bool = False) -> int:
+        text_id = self._text_ids.get((field, text))
+        if text_id is not None:
+            self._references[text_id] += 1
+            return text_id
+
+        normalized = normalize(text)
+        if self._free_ids:
+            text_id = self._free_ids.pop()
+            self._texts[text_id] = (field, text)
+            self._normalized[text_id] = normalized
+            self._references[text_id] = 1
+        else:
+            text_id = len(self._texts)
+            self._texts.append((field, text))
+            self._normalized.append(normalized)
+            self._references.append(1)
+        self._text_ids[(field, text)] = text_id
+
+        if insert:
+            for offset in get_word_offsets(normalized):
+                bisect.insort(
+                    self._entries, text_id << OFFSET_BITS | offset, key=self._key
+                )
+        return text_id
+
+    def _release(self, text_id: int) -> None:
+        self._references[text_id] -= 1
+        if self._references[text_id]:
+            return
+
+        for offset in get_word_offsets(self._normalized[text_id]):
+            entry = text_id << OFFSET_BITS | offset
+            position = bisect.bisect_left(
+                self._entries, self._key(entry), key=self._key
+            )
+            while self._entries[position] != entry:
+                position += 1
+            del self._entries[position]
+        del self._text_ids[self._texts[text_id]]
+        self._texts[text_id] = None
+        self._normalized[text_id] = ""
+        self._free_ids.append(text_id)
+
+
+book_index = PrefixIndex()
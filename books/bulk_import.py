@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Iterator, TextIO
+
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from books.cache import bump_titles_version, invalidate_catalog
+from books.models import Book
+from books.serializers import BookSerializer
+
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_BATCH_SIZE = 5000
+IMPORT_FIELDS = ("title", "author", "cover", "inventory", "daily_fee")
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)
+    # Set when the file stopped decoding or parsing, the rows before it
+    # are imported
+    unreadable: bool = False
+
+    def add_error(self, row_number: int, errors) -> None:
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "errors": errors})
+
+
+def get_import_format(file_name: str) -> str | None:
+    extension = file_name.rsplit(".", 1)[-1].lower()
+    if extension == "ndjson":
+        return "jsonl"
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def read_rows(stream: TextIO, file_format: str) -> Iterator[tuple[int, dict]]:
+    """Yields (row number, row) pairs; undecodable rows are yielded as None"""
+    if file_format == "csv":
+        for row_number, row in enumerate(csv.DictReader(stream), start=1):
+            yield row_number, row
+        return
+
+    for row_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row_number, row if isinstance(row, dict) else None
+
+
+def validate_batch(
+    rows: list[tuple[int, dict]], result: ImportResult
+) -> dict[int | None, dict]:
+    """Validates rows with BookSerializer rules, keyed by id (last row wins)"""
+    serializer = BookSerializer()
+    books = {}
+    for row_number, row in rows:
+        if row is None:
+            result.add_error(row_number, ["Invalid row."])
+            continue
+        try:
+            book_id = int(row["id"]) if row.get("id") not in (None, "") else None
+            book = serializer.run_validation(row)
+        except (TypeError, ValueError):
+            result.add_error(row_number, {"id": ["A valid integer is required."]})
+            continue
+        except ValidationError as error:
+            result.add_error(row_number, error.detail)
+            continue
+        books[book_id if book_id is not None else -row_number] = {
+            "id": book_id,
+            **book,
+        }
+    return books
+
+
+def copy_books(books: list[dict]) -> tuple[int, int]:
+    """Upserts books by id through COPY into a temporary table.
+
+    Rows without an id are inserted with the next sequence value, rows
+    with an id update the existing book or are inserted under that id.
+    """
+    table = Book._meta.db_table
+    columns = ", ".join(IMPORT_FIELDS)
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in IMPORT_FIELDS)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for book in books:
+        writer.writerow([book["id"], *(book[name] for name in IMPORT_FIELDS)])
+    buffer.seek(0)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS books_import")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE books_import ("
+            "id bigint, title varchar(255), author varchar(255), "
+            "cover varchar(255), inventory integer, daily_fee numeric(5, 2)"
+            ") ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            f"COPY books_import (id, {columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cursor.execute(
+            f"""
+            WITH upserted AS (
+                INSERT INTO {table} (id, {columns})
+                SELECT COALESCE(id, nextval(pg_get_serial_sequence(%s, 'id'))),
+                       {columns}
+                FROM books_import
+                ON CONFLICT (id) DO UPDATE SET {updates}
+                RETURNING xmax = 0 AS inserted
+            )
+            SELECT COUNT(*) FILTER (WHERE inserted),
+                   COUNT(*) FILTER (WHERE NOT inserted)
+            FROM upserted
+            """,
+            [table],
+        )
+        created, updated = cursor.fetchone()
+        if any(book["id"] is not None for book in books):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                f"(SELECT GREATEST(MAX(id), 1) FROM {table}))",
+                [table],
+            )
+    return created, updated
+
+
+def import_books(
+    stream: TextIO, file_format: str, batch_size: int = IMPORT_BATCH_SIZE
+) -> ImportResult:
+    """Streams rows from the file, validating and writing them batch by batch"""
+    result = ImportResult()
+    batch = []
+
+    def flush():
+        books = validate_batch(batch, result)
+        if books:
+            created, updated = copy_books(list(books.values()))
+            result.created += created
+            result.updated += updated
+        batch.clear()
+
+    row_number = 0
+    try:
+        for row in read_rows(stream, file_format):
+            row_number = row[0]
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+    except (UnicodeDecodeError, csv.Error) as error:
+        result.add_error(row_number + 1, [f"The file could not be read: {error}"])
+        result.unreadable = True
+    flush()
+
+    if result.created or result.updated:
+        invalidate_catalog()
+        transaction.on_commit(bump_titles_version)
+    return result
@@ -0,0 +1,102 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = "books:catalog:version"
+CATALOG_MODIFIED_KEY = "books:catalog:modified"
+TITLES_VERSION_KEY = "books:titles:version"
+CATALOG_CACHE_TIMEOUT = 60 * 60
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT_TIMEOUT = 2
+REBUILD_POLL_INTERVAL = 0.05
+
+
+def get_catalog_version() -> int:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so a lost key never brings back old entries
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def get_catalog_last_modified() -> datetime:
+    modified = cache.get(CATALOG_MODIFIED_KEY)
+    if modified is None:
+        cache.add(CATALOG_MODIFIED_KEY, time.time(), timeout=None)
+        modified = cache.get(CATALOG_MODIFIED_KEY)
+    return datetime.fromtimestamp(modified, tz=timezone.utc)
+
+
+def bump_catalog_version() -> None:
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+    cache.set(CATALOG_MODIFIED_KEY, time.time(), timeout=None)
+
+
+def invalidate_catalog() -> None:
+    """Invalidates every cached catalog response.
+
+    The version is bumped right away and once more after commit: a reader
+    running between the two bumps may cache rows that are not committed
+    yet, and the second bump makes those entries unreachable.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def get_titles_version() -> int:
+    """Version of the titles and authors, inventory changes don't move it"""
+    version = cache.get(TITLES_VERSION_KEY)
+    if version is None:
+        cache.add(TITLES_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(TITLES_VERSION_KEY)
+    return version
+
+
+def bump_titles_version() -> int:
+    """Bumps the titles version, returning the version of this change"""
+    try:
+        return cache.incr(TITLES_VERSION_KEY)
+    except ValueError:
+        return get_titles_version()
+
+
+def get_catalog_cache_key(*parts: str) -> str:
+    digest = hashlib.md5(":".join(parts).encode()).hexdigest()
+    return f"books:catalog:{get_catalog_version()}:{digest}"
+
+
+def get_or_set_catalog_response(key: str, producer: Callable[[], Any]) -> Any:
+    """Returns cached data for the key, letting one caller rebuild it on a miss.
+
+    Concurrent callers that miss the same key wait for the rebuilding one
+    instead of all querying the database, and only fall back to running
+    the producer themselves if the rebuild takes too long.
+    """
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=REBUILD_LOCK_TIMEOUT):
+        try:
+            data = producer()
+            cache.set(key, data, timeout=CATALOG_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return data
+
+    deadline = time.monotonic() + REBUILD_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return producer()
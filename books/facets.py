@@ -0,0 +1,58 @@
+from django.db import connection
+from django.db.models import QuerySet
+
+FACET_AUTHOR_LIMIT = 20
+
+# GROUPING(cover, author, in_stock) bitmask of the columns rolled up in a set
+COVER_FACET = 0b011
+AUTHOR_FACET = 0b101
+IN_STOCK_FACET = 0b110
+
+
+def get_book_facets(queryset: QuerySet, author_limit: int = FACET_AUTHOR_LIMIT):
+    """Counts the filtered books by cover, author and stock in one query.
+
+    Every facet is a grouping set of the same GROUP BY, so the filtered
+    rows are scanned once whatever the number of facets; authors are
+    limited to the most frequent ones.
+    """
+    sql, params = (
+        queryset.order_by()
+        .values("cover", "author", "inventory")
+        .query.sql_with_params()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH facets AS (
+                SELECT GROUPING(cover, author, in_stock) AS facet,
+                       cover, author, in_stock, COUNT(*) AS count
+                FROM (
+                    SELECT cover, author, inventory > 0 AS in_stock
+                    FROM ({sql}) AS filtered
+                ) AS books
+                GROUP BY GROUPING SETS ((cover), (author), (in_stock))
+            )
+            SELECT facet, cover, author, in_stock, count
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY facet ORDER BY count DESC, author
+                ) AS position
+                FROM facets
+            ) AS ranked
+            WHERE facet <> %s OR position <= %s
+            ORDER BY facet, position
+            """,
+            [*params, AUTHOR_FACET, author_limit],
+        )
+        rows = cursor.fetchall()
+
+    facets = {"cover": {}, "author": {}, "in_stock": {"true": 0, "false": 0}}
+    for facet, cover, author, in_stock, count in rows:
+        if facet == COVER_FACET:
+            facets["cover"][cover] = count
+        elif facet == AUTHOR_FACET:
+            facets["author"][author] = count
+        elif facet == IN_STOCK_FACET:
+            facets["in_stock"]["true" if in_stock else "false"] = count
+    return facets
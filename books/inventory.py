@@ -0,0 +1,118 @@
+from django.db import connection, transaction
+from django.db.models import F
+
+from books.cache import invalidate_catalog
+from books.models import Book
+
+ADJUSTMENT_CHUNK_SIZE = 1000
+# Range of the integer inventory column
+MAX_INVENTORY = 2**31 - 1
+
+
+def _apply_adjustments(cursor, adjustments: list[dict]) -> dict[int, int]:
+    table = Book._meta.db_table
+    values = ", ".join(["(%s::bigint, %s::integer, %s::integer)"] * len(adjustments))
+    params = []
+    for adjustment in adjustments:
+        params += [
+            adjustment["id"],
+            adjustment.get("delta"),
+            adjustment.get("absolute"),
+        ]
+    cursor.execute(
+        f"""
+        UPDATE {table} AS book
+        SET inventory = COALESCE(
+            adjustment.absolute, book.inventory::bigint + adjustment.delta
+        )
+        FROM (VALUES {values}) AS adjustment (id, delta, absolute)
+        WHERE book.id = adjustment.id
+          AND COALESCE(adjustment.absolute, book.inventory::bigint + adjustment.delta)
+              BETWEEN 0 AND %s
+        RETURNING book.id, book.inventory
+        """,
+        params + [MAX_INVENTORY],
+    )
+    return dict(cursor.fetchall())
+
+
+def reserve_copy(book_id: int) -> bool:
+    """Takes one copy of the book with a single conditional UPDATE.
+
+    Concurrent checkouts never lose each other's decrements, and the row
+    is locked only for the rest of the caller's transaction. Returns
+    False when the book is out of stock.
+    """
+    reserved = Book.objects.filter(id=book_id, inventory__gt=0).update(
+        inventory=F("inventory") - 1
+    )
+    if reserved:
+        invalidate_catalog()
+    return bool(reserved)
+
+
+def reserve_copies(counts: dict[int, int]) -> set[int]:
+    """Takes ``count`` copies of every book with one set-based UPDATE.
+
+    Books are updated in id order, so concurrent carts lock them in the
+    same order. Returns the ids of the books that had enough copies; the
+    caller rolls back when some are missing.
+    """
+    adjustments = [
+        {"id": book_id, "delta": -count} for book_id, count in sorted(counts.items())
+    ]
+    with connection.cursor() as cursor:
+        reserved = _apply_adjustments(cursor, adjustments)
+    if reserved:
+        invalidate_catalog()
+    return set(reserved)
+
+
+def release_copies(counts: dict[int, int]) -> None:
+    """Puts ``count`` copies of every book back with one set-based UPDATE"""
+    adjustments = [
+        {"id": book_id, "delta": count} for book_id, count in sorted(counts.items())
+    ]
+    with connection.cursor() as cursor:
+        _apply_adjustments(cursor, adjustments)
+    invalidate_catalog()
+
+
+def adjust_inventory(adjustments: list[dict]) -> list[dict]:
+    """Applies {id, delta | absolute} adjustments with set-based UPDATEs.
+
+    All adjustments run in one transaction, one statement per chunk. An
+    adjustment that would make the inventory negative, or overflow the
+    column, is rejected and leaves the book untouched.
+    """
+    updated = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(adjustments), ADJUSTMENT_CHUNK_SIZE):
+            chunk = adjustments[start : start + ADJUSTMENT_CHUNK_SIZE]
+            updated.update(_apply_adjustments(cursor, chunk))
+
+        skipped = [item["id"] for item in adjustments if item["id"] not in updated]
+        existing = set(Book.objects.filter(id__in=skipped).values_list("id", flat=True))
+        if updated:
+            invalidate_catalog()
+
+    results = []
+    for adjustment in adjustments:
+        book_id = adjustment["id"]
+        if book_id in updated:
+            results.append(
+                {"id": book_id, "status": "updated", "inventory": updated[book_id]}
+            )
+        elif book_id in existing:
+            results.append(
+                {
+                    "id": book_id,
+                    "status": "rejected",
+                    "detail": f"Inventory must be between 0 and {MAX_INVENTORY}.",
+                }
+            )
+        else:
+            results.append(
+                {"id": book_id, "status": "not_found", "detail": "Book not found."}
+            )
+    return results
@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from books.facets import get_book_facets
+from books.models import Book
+
+BENCHMARK_FILTERS = {
+    "no filters": {},
+    "cover": {"cover__in": ["Hard"]},
+    "cover + daily fee": {"cover__in": ["Soft"], "daily_fee__lte": 2},
+    "author": {"author__in": ["author 7", "author 42"]},
+    "in stock": {"inventory__gt": 0},
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Django command that times the catalog facet query on generated books"""
+
+    help = (
+        "Seed books inside a rolled back transaction and time the facet "
+        "query for common filter combinations. "
+        "Refuses to run unless the database name contains 'benchmark', "
+        "use --force to run it anyway."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=100_000)
+        parser.add_argument("--authors", type=int, default=1_000)
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run against a database not named as a benchmark database",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        database = connection.settings_dict["NAME"]
+        if "benchmark" not in database and not options["force"]:
+            raise CommandError(
+                f"Seeds {options['books']} books into '{database}', "
+                "use a benchmark database or pass --force."
+            )
+
+        try:
+            with transaction.atomic():
+                self.seed(options["books"], options["authors"])
+                for name, filters in BENCHMARK_FILTERS.items():
+                    self.benchmark(name, filters, options["runs"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, books: int, authors: int) -> None:
+        table = Book._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (title, author, cover, inventory, daily_fee)
+                SELECT 'book ' || n,
+                       'author ' || (n %% %s),
+                       CASE WHEN n %% 3 = 0 THEN 'Hard' ELSE 'Soft' END,
+                       n %% 5,
+                       (n %% 500) / 100.0
+                FROM generate_series(1, %s) AS n
+                """,
+                [authors, books],
+            )
+            cursor.execute(f"ANALYZE {table}")
+        self.stdout.write(f"Seeded {books} books by {authors} authors")
+
+    def benchmark(self, name: str, filters: dict, runs: int) -> None:
+        queryset = Book.objects.filter(**filters)
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            get_book_facets(queryset)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{name}: median {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms"
+        )
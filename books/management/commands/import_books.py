@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.bulk_import import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    get_import_format,
+    import_books,
+)
+
+
+class Command(BaseCommand):
+    """Django command that imports books from a CSV or JSON Lines file"""
+
+    help = "Import books from a CSV or JSON Lines file (upsert by id)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the file, '-' to read stdin")
+        parser.add_argument("--format", dest="file_format", choices=IMPORT_FORMATS)
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        path = options["path"]
+        file_format = options["file_format"] or get_import_format(path)
+        if file_format is None:
+            raise CommandError("Can't detect file format, use --format.")
+
+        if path == "-":
+            result = import_books(sys.stdin, file_format, options["batch_size"])
+        else:
+            with open(path, encoding="utf-8", newline="") as stream:
+                result = import_books(stream, file_format, options["batch_size"])
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if result.unreadable:
+            raise CommandError(
+                f"Import stopped, created: {result.created}, "
+                f"updated: {result.updated}, invalid: {result.invalid}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created: {result.created}, updated: {result.updated}, "
+                f"invalid: {result.invalid}"
+            )
+        )
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -18,7 +20,47 @@ class Book(models.Model):
     )
 
     class Meta:
-        ordering = ("title",)
+        ordering = ("title", "id")
+        indexes = [
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+            models.Index(fields=["cover", "daily_fee"], name="book_cover_fee_idx"),
+            models.Index(
+                fields=["author", "title", "id"], name="book_author_title_idx"
+            ),
+            models.Index(
+                fields=["title", "id"],
+                condition=models.Q(inventory__gt=0),
+                name="book_in_stock_title_idx",
+            ),
+            GinIndex(
+                SearchVector("title", "author", config="english"),
+                name="book_search_vector_idx",
+            ),
+            GinIndex(
+                fields=["title"], opclasses=["gin_trgm_ops"], name="book_title_trgm_idx"
+            ),
+            GinIndex(
+                fields=["author"],
+                opclasses=["gin_trgm_ops"],
+                name="book_author_trgm_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the loaded title and author, see books/signals.py"""
+        book = super().from_db(db, field_names, values)
+        book._loaded_texts = (
+            book.__dict__.get("title"),
+            book.__dict__.get("author"),
+        )
+        return book
+
+    @property
+    def texts_changed(self) -> bool:
+        """Whether the title or author differ from the loaded row"""
+        loaded = getattr(self, "_loaded_texts", None)
+        return loaded != (self.title, self.author)
 
     def __str__(self):
         return self.title
@@ -0,0 +1,51 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Greatest
+
+SEARCH_CONFIG = "english"
+
+# Must stay identical to the expression of the GIN index declared on
+# Book.Meta.indexes, otherwise Postgres can't use the index for lookups.
+BOOK_SEARCH_VECTOR = SearchVector("title", "author", config=SEARCH_CONFIG)
+
+
+def full_text_search(queryset: QuerySet, query: str) -> QuerySet:
+    """Filters books matching the query and ranks them by relevance"""
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset.annotate(
+            search=BOOK_SEARCH_VECTOR,
+            rank=SearchRank(BOOK_SEARCH_VECTOR, search_query),
+        )
+        .filter(search=search_query)
+        .order_by("-rank", "title", "id")
+    )
+
+
+def trigram_search(queryset: QuerySet, query: str) -> QuerySet:
+    """Filters books whose title or author is similar to the query (typos)"""
+    return (
+        queryset.filter(
+            Q(title__trigram_word_similar=query) | Q(author__trigram_word_similar=query)
+        )
+        .annotate(
+            rank=Greatest(
+                TrigramWordSimilarity(query, "title"),
+                TrigramWordSimilarity(query, "author"),
+            )
+        )
+        .order_by("-rank", "title", "id")
+    )
+
+
+def search_books(queryset: QuerySet, query: str) -> QuerySet:
+    """Full-text search with a trigram fallback when nothing matches exactly"""
+    results = full_text_search(queryset, query)
+    if results.exists():
+        return results
+    return trigram_search(queryset, query)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from books.inventory import MAX_INVENTORY
 from books.models import Book
 
 
@@ -13,3 +14,30 @@ class BookListSerializer(BookSerializer):
     class Meta:
         model = Book
         fields = ("id", "title", "author")
+
+
+class InventoryAdjustmentSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    delta = serializers.IntegerField(
+        required=False, min_value=-MAX_INVENTORY, max_value=MAX_INVENTORY
+    )
+    absolute = serializers.IntegerField(
+        required=False, min_value=0, max_value=MAX_INVENTORY
+    )
+
+    def validate(self, attrs):
+        if ("delta" in attrs) == ("absolute" in attrs):
+            raise serializers.ValidationError(
+                "Provide either delta or absolute inventory."
+            )
+        return attrs
+
+
+class InventoryBatchSerializer(serializers.Serializer):
+    adjustments = InventoryAdjustmentSerializer(many=True, allow_empty=False)
+
+    def validate_adjustments(self, value):
+        ids = [adjustment["id"] for adjustment in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each book can be adjusted only once.")
+        return value
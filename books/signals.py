@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from books.autocomplete import book_index
+from books.cache import bump_titles_version, invalidate_catalog
+from books.models import Book
+
+
+@receiver([post_save, post_delete], sender=Book)
+def invalidate_catalog_cache(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Book)
+def update_autocomplete_index(sender, instance, created, update_fields, **kwargs):
+    """Applies the change after commit, with the titles version it bumped.
+
+    Saves leaving the title and author alone, like inventory updates,
+    bump nothing, so other processes don't rebuild their index.
+    """
+    if update_fields is not None and not {"title", "author"} & update_fields:
+        return
+    if not created and not instance.texts_changed:
+        return
+    title, author = instance.title, instance.author
+    instance._loaded_texts = (title, author)
+
+    def update():
+        version = bump_titles_version()
+        if book_index.is_built:
+            book_index.update(instance.id, title, author)
+            book_index.mark_version(version)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender=Book)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    book_id = instance.id
+
+    def remove():
+        version = bump_titles_version()
+        if book_index.is_built:
+            book_index.remove(book_id)
+            book_index.mark_version(version)
+
+    transaction.on_commit(remove)
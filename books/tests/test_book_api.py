@@ -1,14 +1,28 @@
 import decimal
+from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
+from books.autocomplete import book_index
+from books.inventory import reserve_copy
+from books.cache import (
+    bump_titles_version,
+    get_catalog_cache_key,
+    get_or_set_catalog_response,
+    get_titles_version,
+)
 from books.models import Book
 from books.serializers import BookListSerializer, BookSerializer
 
 BOOK_URL = reverse("books:book-list")
+INVENTORY_URL = reverse("books:book-inventory")
+EXPORT_URL = reverse("books:book-export")
+AUTOCOMPLETE_URL = reverse("books:book-autocomplete")
 
 
 def sample_book(**params):
@@ -48,6 +62,120 @@ class UnauthenticatedBooksApiTests(APITestCase):
 
         self.assertEquals(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_list_books_keyset_pagination(self):
+        for title in ("b", "a", "c", "a", "d"):
+            sample_book(title=title)
+        expected = list(Book.objects.values_list("id", flat=True))
+
+        response = self.client.get(BOOK_URL, data={"cursor": "", "page_size": 2})
+        self.assertNotIn("count", response.data)
+        self.assertIsNone(response.data["previous"])
+
+        crawled = []
+        while True:
+            crawled += [book["id"] for book in response.data["results"]]
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+
+        previous = self.client.get(response.data["previous"])
+
+        self.assertEquals(crawled, expected)
+        self.assertEquals(
+            [book["id"] for book in previous.data["results"]], expected[-4:-2]
+        )
+
+    def test_list_books_keyset_pagination_invalid_cursor(self):
+        response = self.client.get(BOOK_URL, data={"cursor": "not-a-cursor"})
+
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_books_ranked_by_relevance(self):
+        book1 = sample_book(title="Harry Potter", author="J. K. Rowling")
+        book2 = sample_book(title="Potter's Field", author="Ellis Peters")
+        sample_book(title="Dune", author="Frank Herbert")
+
+        response = self.client.get(BOOK_URL, data={"q": "harry potter"})
+        response_author = self.client.get(BOOK_URL, data={"q": "herbert"})
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals([book["id"] for book in response.data["results"]], [book1.id])
+        self.assertEquals(response_author.data["results"][0]["title"], "Dune")
+        self.assertNotIn(
+            book2.id, [book["id"] for book in response_author.data["results"]]
+        )
+
+    def test_search_books_rejects_keyset_cursor(self):
+        sample_book(title="Harry Potter", author="J. K. Rowling")
+
+        response = self.client.get(BOOK_URL, data={"q": "harry", "cursor": ""})
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("cursor", response.data)
+
+    def test_search_books_typo_fallback(self):
+        book = sample_book(title="Harry Potter", author="J. K. Rowling")
+
+        response = self.client.get(BOOK_URL, data={"q": "Hary Poter"})
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data["results"][0]["id"], book.id)
+
+    def test_filter_books_by_facets(self):
+        book1 = sample_book(author="Homer", cover="Hard", daily_fee=1, inventory=0)
+        book2 = sample_book(author="Homer", cover="Soft", daily_fee=2)
+        book3 = sample_book(author="Ovid", cover="Hard", daily_fee=3)
+
+        response = self.client.get(
+            BOOK_URL,
+            data={"author": ["Homer", "Ovid"], "min_daily_fee": 1, "max_daily_fee": 2},
+        )
+        response_cover = self.client.get(BOOK_URL, data={"cover": "Hard"})
+        response_in_stock = self.client.get(
+            BOOK_URL, data={"author": "Homer", "in_stock": "true"}
+        )
+
+        self.assertEquals(
+            [book["id"] for book in response.data["results"]], [book1.id, book2.id]
+        )
+        self.assertEquals(
+            [book["id"] for book in response_cover.data["results"]],
+            [book1.id, book3.id],
+        )
+        self.assertEquals(
+            [book["id"] for book in response_in_stock.data["results"]], [book2.id]
+        )
+
+    def test_filter_books_invalid_daily_fee(self):
+        response = self.client.get(BOOK_URL, data={"min_daily_fee": "cheap"})
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_books_facet_counts(self):
+        sample_book(author="Homer", cover="Hard", inventory=0)
+        sample_book(author="Homer", cover="Hard")
+        sample_book(author="Ovid", cover="Soft", daily_fee=1)
+
+        response = self.client.get(BOOK_URL)
+        response_filtered = self.client.get(BOOK_URL, data={"max_daily_fee": 1})
+
+        self.assertEquals(
+            response.data["facets"],
+            {
+                "cover": {"Hard": 2, "Soft": 2},
+                "author": {"Homer": 2, "Ovid": 1, "test_author": 1},
+                "in_stock": {"true": 3, "false": 1},
+            },
+        )
+        self.assertEquals(
+            response_filtered.data["facets"],
+            {
+                "cover": {"Soft": 1},
+                "author": {"Ovid": 1},
+                "in_stock": {"true": 1, "false": 0},
+            },
+        )
+
     def test_detail_book_allowed(self):
         book = sample_book()
         url = detail_url(book.id)
@@ -57,6 +185,7 @@ class UnauthenticatedBooksApiTests(APITestCase):
         self.assertEquals(response.status_code, status.HTTP_200_OK)
 
 
+@override_settings(QUERY_INSPECTOR="raise")
 class AuthenticatedBookApiTests(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -75,6 +204,18 @@ class AuthenticatedBookApiTests(APITestCase):
         self.assertEquals(response.status_code, status.HTTP_200_OK)
         self.assertEquals(response.data["results"], serializer.data)
 
+    def test_list_books_queries_do_not_grow_with_page(self):
+        response_one = self.client.get(BOOK_URL, {"limit": 20})
+        Book.objects.bulk_create(
+            Book(title=f"book {index}", author="author", inventory=1, daily_fee=1)
+            for index in range(19)
+        )
+        cache.clear()
+        response_many = self.client.get(BOOK_URL, {"limit": 20})
+
+        self.assertEquals(len(response_many.data["results"]), 20)
+        self.assertEquals(response_many["X-Query-Count"], response_one["X-Query-Count"])
+
     def test_retrieve_book_detail(self):
         book = self.book
 
@@ -115,6 +256,18 @@ class AuthenticatedBookApiTests(APITestCase):
 
         self.assertEquals(res.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_export_books_not_allowed(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEquals(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_inventory_adjustment_not_allowed(self):
+        payload = {"adjustments": [{"id": self.book.id, "delta": 1}]}
+
+        res = self.client.post(INVENTORY_URL, payload, format="json")
+
+        self.assertEquals(res.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_book_delete_not_allowed(self):
         book = self.book
 
@@ -125,6 +278,7 @@ class AuthenticatedBookApiTests(APITestCase):
         self.assertEquals(res.status_code, status.HTTP_403_FORBIDDEN)
 
 
+@override_settings(QUERY_INSPECTOR="raise")
 class AdminBookApiTests(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -172,3 +326,272 @@ class AdminBookApiTests(APITestCase):
         res = self.client.delete(url)
 
         self.assertEquals(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_export_books_csv(self):
+        sample_book(title="Dune, part one")
+
+        res = self.client.get(EXPORT_URL, data={"format": "csv"})
+        content = b"".join(res.streaming_content).decode()
+
+        self.assertEquals(res.status_code, status.HTTP_200_OK)
+        self.assertEquals(res["Content-Type"], "text/csv")
+        self.assertEquals(
+            content.splitlines(),
+            [
+                "id,title,author,cover,inventory,daily_fee",
+                f'{Book.objects.get(title="Dune, part one").id},'
+                f'"Dune, part one",test_author,Soft,25,25.00',
+                f"{self.book.id},test_title,test_author,Soft,25,25.00",
+            ],
+        )
+
+    def test_inventory_batch_adjustment(self):
+        book2 = sample_book(inventory=3)
+        book3 = sample_book(inventory=1)
+        payload = {
+            "adjustments": [
+                {"id": self.book.id, "delta": -5},
+                {"id": book2.id, "absolute": 10},
+                {"id": book3.id, "delta": -2},
+                {"id": 0, "delta": 1},
+            ]
+        }
+
+        res = self.client.post(INVENTORY_URL, payload, format="json")
+        self.book.refresh_from_db()
+        book2.refresh_from_db()
+        book3.refresh_from_db()
+
+        self.assertEquals(res.status_code, status.HTTP_200_OK)
+        self.assertEquals(
+            [result["status"] for result in res.data["results"]],
+            ["updated", "updated", "rejected", "not_found"],
+        )
+        self.assertEquals(res.data["results"][0]["inventory"], 20)
+        self.assertEquals(
+            (self.book.inventory, book2.inventory, book3.inventory), (20, 10, 1)
+        )
+
+    def test_inventory_batch_adjustment_invalid_payload(self):
+        payload = {
+            "adjustments": [
+                {"id": self.book.id, "delta": 1, "absolute": 1},
+                {"id": self.book.id},
+            ]
+        }
+        payload_duplicates = {
+            "adjustments": [
+                {"id": self.book.id, "delta": 1},
+                {"id": self.book.id, "delta": 2},
+            ]
+        }
+        payload_out_of_range = {
+            "adjustments": [
+                {"id": self.book.id, "delta": 2**31},
+                {"id": self.book.id, "absolute": 2**40},
+            ]
+        }
+
+        res = self.client.post(INVENTORY_URL, payload, format="json")
+        res_duplicates = self.client.post(
+            INVENTORY_URL, payload_duplicates, format="json"
+        )
+        res_out_of_range = self.client.post(
+            INVENTORY_URL, payload_out_of_range, format="json"
+        )
+
+        self.assertEquals(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(res_duplicates.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(res_out_of_range.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("delta", res_out_of_range.data["adjustments"][0])
+        self.assertIn("absolute", res_out_of_range.data["adjustments"][1])
+
+    def test_inventory_batch_adjustment_overflow_rejected(self):
+        payload = {"adjustments": [{"id": self.book.id, "delta": 2**31 - 1}]}
+
+        res = self.client.post(INVENTORY_URL, payload, format="json")
+        self.book.refresh_from_db()
+
+        self.assertEquals(res.status_code, status.HTTP_200_OK)
+        self.assertEquals(res.data["results"][0]["status"], "rejected")
+        self.assertEquals(self.book.inventory, 25)
+
+
+@override_settings(QUERY_INSPECTOR="raise")
+class BookCatalogCacheTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.book = sample_book()
+
+    def test_catalog_reads_served_from_cache(self):
+        self.client.get(BOOK_URL)
+        self.client.get(detail_url(self.book.id))
+
+        with self.assertNumQueries(0):
+            response_list = self.client.get(BOOK_URL)
+            response_detail = self.client.get(detail_url(self.book.id))
+
+        self.assertEquals(response_list.status_code, status.HTTP_200_OK)
+        self.assertEquals(response_list.data["results"][0]["id"], self.book.id)
+        self.assertEquals(response_detail.data, BookSerializer(self.book).data)
+
+    def test_book_changes_invalidate_cache(self):
+        self.client.get(BOOK_URL)
+        self.client.get(detail_url(self.book.id))
+
+        self.book.title = "updated_title"
+        self.book.save()
+        new_book = sample_book(title="new_title")
+
+        response_list = self.client.get(BOOK_URL)
+        response_detail = self.client.get(detail_url(self.book.id))
+
+        self.assertIn(
+            new_book.id, [book["id"] for book in response_list.data["results"]]
+        )
+        self.assertEquals(response_detail.data["title"], "updated_title")
+
+    def test_catalog_etag_differs_per_renderer(self):
+        response = self.client.get(BOOK_URL)
+        response_html = self.client.get(BOOK_URL, HTTP_ACCEPT="text/html")
+
+        self.assertNotEquals(response["ETag"], response_html["ETag"])
+
+    def test_catalog_conditional_get(self):
+        response = self.client.get(BOOK_URL)
+        etag = response["ETag"]
+
+        response_not_modified = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+        sample_book(title="new_title")
+        response_modified = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("Authorization", response["Vary"])
+        self.assertIn("Accept", response["Vary"])
+        self.assertTrue(response.has_header("Last-Modified"))
+        self.assertEquals(
+            response_not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEquals(response_not_modified["ETag"], etag)
+        self.assertEquals(response_modified.status_code, status.HTTP_200_OK)
+        self.assertNotEquals(response_modified["ETag"], etag)
+
+    @patch("books.cache.time.sleep")
+    def test_cache_miss_waits_for_concurrent_rebuild(self, mock_sleep):
+        key = get_catalog_cache_key("list", "test")
+        cache.add(f"{key}:lock", 1)
+        mock_sleep.side_effect = lambda seconds: cache.set(key, {"cached": True})
+        producer = MagicMock(return_value={"cached": False})
+
+        data = get_or_set_catalog_response(key, producer)
+
+        self.assertEquals(data, {"cached": True})
+        producer.assert_not_called()
+
+
+@override_settings(QUERY_INSPECTOR="raise")
+class BookAutocompleteTests(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        book_index.clear()
+        sample_book(title="Harry Potter", author="J. K. Rowling")
+        sample_book(title="Harry Potter", author="J. K. Rowling")
+        sample_book(title="Hard Times", author="Charles Dickens")
+
+    def tearDown(self) -> None:
+        book_index.clear()
+
+    def test_autocomplete_prefix_matches(self):
+        response = self.client.get(AUTOCOMPLETE_URL, data={"q": "Har"})
+        response_word = self.client.get(AUTOCOMPLETE_URL, data={"q": "rowl"})
+        response_limit = self.client.get(AUTOCOMPLETE_URL, data={"q": "h", "limit": 1})
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(
+            response.data["results"],
+            [
+                {"field": "title", "value": "Hard Times"},
+                {"field": "title", "value": "Harry Potter"},
+            ],
+        )
+        self.assertEquals(
+            response_word.data["results"],
+            [{"field": "author", "value": "J. K. Rowling"}],
+        )
+        self.assertEquals(len(response_limit.data["results"]), 1)
+
+    def test_autocomplete_served_from_memory(self):
+        self.client.get(AUTOCOMPLETE_URL, data={"q": "har"})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(AUTOCOMPLETE_URL, data={"q": "harry"})
+
+        self.assertEquals(len(response.data["results"]), 1)
+
+    def test_autocomplete_follows_book_changes(self):
+        self.client.get(AUTOCOMPLETE_URL, data={"q": "har"})
+        book = Book.objects.get(title="Hard Times")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_book(title="Dune", author="Frank Herbert")
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = "Great Expectations"
+            book.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.filter(title="Harry Potter").first().delete()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(AUTOCOMPLETE_URL, data={"q": "har"})
+            response_new = self.client.get(AUTOCOMPLETE_URL, data={"q": "du"})
+            response_author = self.client.get(AUTOCOMPLETE_URL, data={"q": "dick"})
+
+        self.assertEquals(
+            response.data["results"], [{"field": "title", "value": "Harry Potter"}]
+        )
+        self.assertEquals(
+            response_new.data["results"], [{"field": "title", "value": "Dune"}]
+        )
+        self.assertEquals(
+            response_author.data["results"],
+            [{"field": "author", "value": "Charles Dickens"}],
+        )
+
+    def test_autocomplete_not_rebuilt_on_inventory_changes(self):
+        self.client.get(AUTOCOMPLETE_URL, data={"q": "har"})
+        book = Book.objects.get(title="Hard Times")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_copy(book.id)
+        book_index._next_check = 0
+        with self.assertNumQueries(0):
+            self.client.get(AUTOCOMPLETE_URL, data={"q": "har"})
+
+    def test_titles_version_bumped_only_on_title_changes(self):
+        book = Book.objects.get(title="Hard Times")
+        version = get_titles_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.inventory = 3
+            book.save()
+        version_after_inventory = get_titles_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            book.author = "Dickens"
+            book.save()
+
+        self.assertEquals(version_after_inventory, version)
+        self.assertEquals(get_titles_version(), version + 1)
+
+    def test_autocomplete_rebuilt_on_changes_of_other_processes(self):
+        self.client.get(AUTOCOMPLETE_URL, data={"q": "har"})
+        Book.objects.filter(title="Hard Times").update(title="Bleak House")
+        bump_titles_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_book(title="Dune", author="Frank Herbert")
+
+        book_index._next_check = 0
+        response = self.client.get(AUTOCOMPLETE_URL, data={"q": "b"})
+
+        self.assertEquals(
+            response.data["results"], [{"field": "title", "value": "Bleak House"}]
+        )
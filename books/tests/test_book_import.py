@@ -0,0 +1,126 @@
+import decimal
+import io
+from tempfile import NamedTemporaryFile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from books.bulk_import import import_books
+from books.models import Book
+from books.tests.test_book_api import sample_book
+
+IMPORT_URL = reverse("books:book-bulk-import")
+
+CSV_HEADER = "id,title,author,cover,inventory,daily_fee\n"
+
+
+class BookImportTests(APITestCase):
+    def test_import_books_upserts_by_id(self):
+        book = sample_book(title="old_title")
+        stream = io.StringIO(
+            CSV_HEADER
+            + f"{book.id},new_title,new_author,Hard,3,1.50\n"
+            + ",Dune,Frank Herbert,Soft,5,2.00\n"
+            + ",Emma,Jane Austen,Soft,5,2.00\n"
+        )
+
+        result = import_books(stream, "csv", batch_size=2)
+        book.refresh_from_db()
+
+        self.assertEquals((result.created, result.updated, result.invalid), (2, 1, 0))
+        self.assertEquals(book.title, "new_title")
+        self.assertEquals(book.daily_fee, decimal.Decimal("1.50"))
+        self.assertEquals(Book.objects.filter(title__in=["Dune", "Emma"]).count(), 2)
+
+    def test_import_books_reports_invalid_rows(self):
+        stream = io.StringIO(
+            '{"title": "Dune", "author": "Frank Herbert", "cover": "Soft", '
+            '"inventory": 5, "daily_fee": "2.00"}\n'
+            '{"title": "Emma", "author": "Jane Austen", "cover": "Paper", '
+            '"inventory": -1, "daily_fee": "2.00"}\n'
+            "not json\n"
+        )
+
+        result = import_books(stream, "jsonl")
+
+        self.assertEquals((result.created, result.invalid), (1, 2))
+        self.assertEquals([error["row"] for error in result.errors], [2, 3])
+        self.assertIn("cover", result.errors[0]["errors"])
+
+    def test_imported_ids_do_not_break_sequence(self):
+        stream = io.StringIO(CSV_HEADER + "100000,Dune,Frank Herbert,Soft,5,2.00\n")
+
+        import_books(stream, "csv")
+        book = sample_book()
+
+        self.assertGreater(book.id, 100000)
+
+    def test_import_books_command(self):
+        with NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write(CSV_HEADER + ",Dune,Frank Herbert,Soft,5,2.00\n")
+            file.flush()
+            out = io.StringIO()
+            call_command("import_books", file.name, stdout=out)
+
+        self.assertIn("Created: 1", out.getvalue())
+        self.assertTrue(Book.objects.filter(title="Dune").exists())
+
+
+@override_settings(QUERY_INSPECTOR="raise")
+class BookImportApiTests(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.admin = get_user_model().objects.create_user(
+            "admin@admin.com", "testpass", is_staff=True
+        )
+
+    def test_import_not_allowed_for_regular_user(self):
+        self.client.force_authenticate(self.user)
+        upload = SimpleUploadedFile("books.csv", CSV_HEADER.encode())
+
+        response = self.client.post(IMPORT_URL, {"file": upload})
+
+        self.assertEquals(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_books_by_admin(self):
+        self.client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile(
+            "books.csv", (CSV_HEADER + ",Dune,Frank Herbert,Soft,5,2.00\n").encode()
+        )
+
+        response = self.client.post(IMPORT_URL, {"file": upload})
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data["created"], 1)
+        self.assertTrue(Book.objects.filter(title="Dune").exists())
+
+    def test_import_unreadable_file(self):
+        self.client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile("books.csv", CSV_HEADER.encode() + b"\xff\n")
+        oversized = SimpleUploadedFile(
+            "books.csv", (CSV_HEADER + f',"{"x" * 200_000}",a,Soft,5,2.00\n').encode()
+        )
+
+        response = self.client.post(IMPORT_URL, {"file": upload})
+        response_oversized = self.client.post(IMPORT_URL, {"file": oversized})
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(response.data["errors"][0]["row"], 1)
+        self.assertEquals(response_oversized.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(response_oversized.data["errors"][0]["row"], 1)
+
+    def test_import_unknown_format(self):
+        self.client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile("books.xlsx", b"")
+
+        response = self.client.post(IMPORT_URL, {"file": upload})
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,16 +1,63 @@
+import io
+from decimal import Decimal, InvalidOperation
+
 import rest_framework_simplejwt.authentication
-from rest_framework import viewsets
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAdminUser, AllowAny
+from rest_framework.response import Response
 
+from books.autocomplete import (
+    AUTOCOMPLETE_LIMIT,
+    MAX_AUTOCOMPLETE_LIMIT,
+    book_index,
+)
+from books.bulk_import import IMPORT_FORMATS, get_import_format, import_books
+from books.cache import (
+    get_catalog_cache_key,
+    get_catalog_last_modified,
+    get_or_set_catalog_response,
+)
+from books.facets import get_book_facets
+from books.inventory import adjust_inventory
 from books.models import Book
-from books.serializers import BookSerializer, BookListSerializer
+from books.search import search_books
+from books.serializers import (
+    BookSerializer,
+    BookListSerializer,
+    InventoryBatchSerializer,
+)
+from borrowings.availability import (
+    MAX_AVAILABILITY_DAYS,
+    annotate_waiting_reservations,
+    get_projected_availability,
+)
+from library_service_api.conditional import ConditionalGetMixin, make_etag
+from library_service_api.export import ExportMixin
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     """Endpoint for CRUD operations with book"""
 
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    export_fields = ("id", "title", "author", "cover", "inventory", "daily_fee")
+    query_budgets = {
+        "list": 5,
+        "retrieve": 1,
+        "create": 1,
+        "update": 2,
+        "partial_update": 2,
+        "destroy": 6,
+        "export": 1,
+        "bulk_import": 5,
+        "inventory": 4,
+        "availability": 1,
+        "autocomplete": 1,
+    }
     permission_classes = (IsAdminUser,)
     authentication_classes = (
         rest_framework_simplejwt.authentication.JWTAuthentication,
@@ -19,9 +66,233 @@ class BookViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == "list":
             return BookListSerializer
+        if self.action == "inventory":
+            return InventoryBatchSerializer
         return BookSerializer
 
     def get_permissions(self):
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "availability", "autocomplete"):
             return [AllowAny()]
         return super().get_permissions()
+
+    @staticmethod
+    def _params_to_bool(qs: str) -> bool:
+        """Converts a str to bool True or False"""
+        return qs.lower() == "true"
+
+    @staticmethod
+    def _params_to_decimal(name: str, qs: str) -> Decimal:
+        """Converts a str to Decimal, rejecting invalid numbers"""
+        try:
+            return Decimal(qs)
+        except InvalidOperation:
+            raise ValidationError({name: "A valid number is required."})
+
+    def filter_catalog(self, queryset):
+        """Filtering by cover, daily fee range, author and stock"""
+        params = self.request.query_params
+        covers = params.getlist("cover")
+        authors = params.getlist("author")
+        min_daily_fee = params.get("min_daily_fee")
+        max_daily_fee = params.get("max_daily_fee")
+        in_stock = params.get("in_stock")
+
+        if covers:
+            queryset = queryset.filter(cover__in=covers)
+        if authors:
+            queryset = queryset.filter(author__in=authors)
+        if min_daily_fee:
+            min_daily_fee = self._params_to_decimal("min_daily_fee", min_daily_fee)
+            queryset = queryset.filter(daily_fee__gte=min_daily_fee)
+        if max_daily_fee:
+            max_daily_fee = self._params_to_decimal("max_daily_fee", max_daily_fee)
+            queryset = queryset.filter(daily_fee__lte=max_daily_fee)
+        if in_stock and self._params_to_bool(in_stock):
+            queryset = queryset.filter(inventory__gt=0)
+        if in_stock and not self._params_to_bool(in_stock):
+            queryset = queryset.filter(inventory=0)
+        return queryset
+
+    def get_queryset(self):
+        queryset = self.queryset
+
+        if self.action in ("list", "export"):
+            queryset = self.filter_catalog(queryset)
+
+            """Searching by title and author ranked by relevance"""
+            query = self.request.query_params.get("q")
+            if query:
+                # Ranked results page by offset, the keyset cursor would
+                # re-sort them by title
+                if "cursor" in self.request.query_params:
+                    raise ValidationError(
+                        {"cursor": "Search results are paginated by offset."}
+                    )
+                queryset = search_books(queryset, query)
+
+        if self.action == "availability":
+            queryset = annotate_waiting_reservations(
+                queryset.select_related("return_schedule")
+            )
+
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type={"type": "string"},
+                description=(
+                    "Search by title and author, paginated by limit/offset only "
+                    "(ex. ?q=harry potter)"
+                ),
+            ),
+            OpenApiParameter(
+                "cover",
+                type={"type": "list", "items": {"type": "string"}},
+                description="Filter by cover (ex. ?cover=Hard)",
+            ),
+            OpenApiParameter(
+                "author",
+                type={"type": "list", "items": {"type": "string"}},
+                description="Filter by authors (ex. ?author=Jane Austen&author=Homer)",
+            ),
+            OpenApiParameter(
+                "min_daily_fee",
+                type={"type": "number"},
+                description="Filter by minimal daily fee (ex. ?min_daily_fee=0.5)",
+            ),
+            OpenApiParameter(
+                "max_daily_fee",
+                type={"type": "number"},
+                description="Filter by maximal daily fee (ex. ?max_daily_fee=2)",
+            ),
+            OpenApiParameter(
+                "in_stock",
+                type={"type": "string"},
+                description="Filter by availability (ex. ?in_stock=True)",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        """Catalog list with facet counts, cached until the catalog changes"""
+        key = get_catalog_cache_key("list", request.get_host(), request.get_full_path())
+        return self._catalog_response(
+            request, key, lambda: self._get_list_data(request, *args, **kwargs)
+        )
+
+    def _get_list_data(self, request, *args, **kwargs):
+        data = super().list(request, *args, **kwargs).data
+        data["facets"] = get_book_facets(self.filter_queryset(self.get_queryset()))
+        return data
+
+    def retrieve(self, request, *args, **kwargs):
+        """Book detail, cached until the catalog changes"""
+        key = get_catalog_cache_key("retrieve", str(kwargs["pk"]))
+        return self._catalog_response(
+            request,
+            key,
+            lambda: super(BookViewSet, self).retrieve(request, *args, **kwargs).data,
+        )
+
+    def _catalog_response(self, request, key, get_data):
+        return self.conditional_response(
+            request,
+            make_etag(key),
+            get_catalog_last_modified(),
+            lambda: Response(get_or_set_catalog_response(key, get_data)),
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                type={"type": "string"},
+                description="Title or author prefix (ex. ?q=harry po)",
+            ),
+            OpenApiParameter(
+                "limit",
+                type={"type": "number"},
+                description="Number of suggestions, up to 50 (ex. ?limit=5)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="autocomplete")
+    def autocomplete(self, request):
+        """Endpoint for search-as-you-type suggestions served from memory"""
+        try:
+            limit = int(request.query_params.get("limit", AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_LIMIT
+        limit = min(max(limit, 1), MAX_AUTOCOMPLETE_LIMIT)
+        query = request.query_params.get("q", "")
+        return Response({"results": book_index.search(query, limit)})
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def bulk_import(self, request):
+        """Endpoint for importing books from a CSV or JSON Lines file"""
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"file": "CSV or JSON Lines file is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        file_format = request.data.get("file_format") or get_import_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response(
+                {"file_format": "Supported formats are csv and jsonl."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        result = import_books(stream, file_format)
+        return Response(
+            {
+                "created": result.created,
+                "updated": result.updated,
+                "invalid": result.invalid,
+                "errors": result.errors,
+            },
+            status=(
+                status.HTTP_400_BAD_REQUEST if result.unreadable else status.HTTP_200_OK
+            ),
+        )
+
+    @action(methods=["POST"], detail=False, url_path="inventory")
+    def inventory(self, request):
+        """Endpoint for adjusting inventory of many books after a stocktake"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = adjust_inventory(serializer.validated_data["adjustments"])
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "days",
+                type={"type": "number"},
+                description="Number of days to project, up to 365 (ex. ?days=30)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=True, url_path="availability")
+    def availability(self, request, pk=None):
+        """Endpoint for projected number of available copies by date"""
+        book = self.get_object()
+        try:
+            days = int(request.query_params.get("days", 30))
+        except ValueError:
+            days = 30
+        days = min(max(days, 1), MAX_AVAILABILITY_DAYS)
+        return Response(
+            {
+                "book": book.id,
+                "inventory": book.inventory,
+                "availability": get_projected_availability(book, days),
+            }
+        )
@@ -1,5 +1,13 @@
 from django.contrib import admin
 
-from borrowings.models import Borrowing
+from borrowings.models import (
+    ArchivedBorrowing,
+    Borrowing,
+    BorrowingStats,
+    TelegramMessage,
+)
 
 admin.site.register(Borrowing)
+admin.site.register(TelegramMessage)
+admin.site.register(ArchivedBorrowing)
+admin.site.register(BorrowingStats)
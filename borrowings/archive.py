@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from borrowings.models import ArchivedBorrowing, Borrowing
+from payments.models import Payment
+
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def get_archive_cutoff(today: date = None) -> date:
+    """Borrowings returned before this date are moved to the archive"""
+    today = today or datetime.now().date()
+    return today - timedelta(days=settings.BORROWING_ARCHIVE_AFTER_DAYS)
+
+
+def ensure_archive_partitions(first_year: int, last_year: int) -> None:
+    """Creates the missing yearly partitions of the archive table"""
+    table = ArchivedBorrowing._meta.db_table
+    with connection.cursor() as cursor:
+        for year in range(first_year, last_year + 1):
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table}_{year}
+                PARTITION OF {table}
+                FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')
+                """
+            )
+
+
+def _archive_batch(cutoff: date, batch_size: int) -> int:
+    """Moves one batch with a single statement, with a snapshot of payments.
+
+    The payments themselves stay in their table, so the payment endpoints
+    keep serving them. Borrowings with a payment still Creating or Pending
+    stay in the hot table, so the account standings never change.
+    """
+    borrowing = Borrowing._meta.db_table
+    payment = Payment._meta.db_table
+    archive = ArchivedBorrowing._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH batch AS (
+                SELECT id FROM {borrowing}
+                WHERE actual_return_date < %s
+                  AND NOT EXISTS (
+                      SELECT 1 FROM {payment}
+                      WHERE {payment}.borrowing_id = {borrowing}.id
+                        AND {payment}.status IN ('Creating', 'Pending')
+                  )
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ),
+            moved_payments AS (
+                SELECT * FROM {payment}
+                WHERE borrowing_id IN (SELECT id FROM batch)
+            ),
+            moved AS (
+                DELETE FROM {borrowing}
+                WHERE id IN (SELECT id FROM batch)
+                RETURNING *
+            )
+            INSERT INTO {archive} (
+                id, borrow_date, expected_return_date, actual_return_date,
+                book_id, user_id, payments, archived_at
+            )
+            SELECT moved.id, moved.borrow_date, moved.expected_return_date,
+                   moved.actual_return_date, moved.book_id, moved.user_id,
+                   COALESCE(
+                       (
+                           SELECT jsonb_agg(
+                               to_jsonb(moved_payments) - 'borrowing_id'
+                               ORDER BY moved_payments.id
+                           )
+                           FROM moved_payments
+                           WHERE moved_payments.borrowing_id = moved.id
+                       ),
+                       '[]'::jsonb
+                   ),
+                   now()
+            FROM moved
+            """,
+            [cutoff, batch_size],
+        )
+        return cursor.rowcount
+
+
+def archive_returned_borrowings(
+    today: date = None, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """Moves old returned borrowings to the archive, one transaction per batch.
+
+    Returns the number of archived borrowings.
+    """
+    cutoff = get_archive_cutoff(today)
+    dates = Borrowing.objects.filter(actual_return_date__lt=cutoff).aggregate(
+        first=Min("borrow_date"), last=Max("borrow_date")
+    )
+    if dates["first"] is None:
+        return 0
+    ensure_archive_partitions(dates["first"].year, dates["last"].year)
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            moved = _archive_batch(cutoff, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
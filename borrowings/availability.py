@@ -0,0 +1,154 @@
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.db import connection
+from django.db.models import Count, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+
+from books.models import Book
+from borrowings.models import BookReturnSchedule, Reservation
+
+MAX_AVAILABILITY_DAYS = 365
+
+
+def record_expected_return(book_id: int, expected_return_date: date, count: int):
+    """Adds (or removes, when negative) copies due back on the given date.
+
+    A single atomic statement, so concurrent checkouts of the same book
+    never lose each other's updates.
+    """
+    table = BookReturnSchedule._meta.db_table
+    day = expected_return_date.isoformat()
+    with connection.cursor() as cursor:
+        if count > 0:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (book_id, returns)
+                VALUES (%s, jsonb_build_object(%s::text, %s::integer))
+                ON CONFLICT (book_id) DO UPDATE SET returns =
+                    {table}.returns || jsonb_build_object(
+                        %s::text,
+                        COALESCE(({table}.returns ->> %s)::integer, 0) + %s
+                    )
+                """,
+                [book_id, day, count, day, day, count],
+            )
+            return
+
+        cursor.execute(
+            f"""
+            UPDATE {table} SET returns = CASE
+                WHEN COALESCE((returns ->> %s)::integer, 0) + %s > 0
+                THEN returns || jsonb_build_object(
+                    %s::text, COALESCE((returns ->> %s)::integer, 0) + %s
+                )
+                ELSE returns - %s
+            END
+            WHERE book_id = %s
+            """,
+            [day, count, day, day, count, day, book_id],
+        )
+
+
+def _merge_returns(table: str, returns: str, changes: str) -> str:
+    """SQL summing two returns objects per day, dropping days at zero"""
+    return f"""(
+        SELECT COALESCE(jsonb_object_agg(day, total), '{{}}'::jsonb)
+        FROM (
+            SELECT day, SUM(count::integer) AS total
+            FROM (
+                SELECT * FROM jsonb_each_text({table}.{returns})
+                UNION ALL
+                SELECT * FROM jsonb_each_text({changes})
+            ) AS entries (day, count)
+            GROUP BY day
+        ) AS totals
+        WHERE total > 0
+    )"""
+
+
+def record_expected_returns(changes: dict[tuple[int, date], int]) -> None:
+    """Set-based record_expected_return for many (book, date) counts.
+
+    Additions are upserted with one statement and removals applied with
+    one UPDATE, whatever the number of books. Both merge into the locked
+    row, so concurrent checkouts still never lose each other's updates.
+    """
+    table = BookReturnSchedule._meta.db_table
+    additions, removals = defaultdict(dict), defaultdict(dict)
+    for (book_id, expected_return_date), count in changes.items():
+        target = additions if count > 0 else removals
+        target[book_id][expected_return_date.isoformat()] = count
+
+    with connection.cursor() as cursor:
+        if additions:
+            values = ", ".join(["(%s::bigint, %s::jsonb)"] * len(additions))
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (book_id, returns)
+                VALUES {values}
+                ON CONFLICT (book_id) DO UPDATE SET returns =
+                    {_merge_returns(table, "returns", "EXCLUDED.returns")}
+                """,
+                [
+                    param
+                    for book_id, returns in sorted(additions.items())
+                    for param in (book_id, json.dumps(returns))
+                ],
+            )
+        if removals:
+            values = ", ".join(["(%s::bigint, %s::jsonb)"] * len(removals))
+            cursor.execute(
+                f"""
+                UPDATE {table} SET returns =
+                    {_merge_returns(table, "returns", "changes.returns")}
+                FROM (VALUES {values}) AS changes (book_id, returns)
+                WHERE {table}.book_id = changes.book_id
+                """,
+                [
+                    param
+                    for book_id, returns in sorted(removals.items())
+                    for param in (book_id, json.dumps(returns))
+                ],
+            )
+
+
+def annotate_waiting_reservations(queryset: QuerySet) -> QuerySet:
+    """Adds ``waiting_reservations``, the length of each book queue"""
+    waiting = (
+        Reservation.objects.filter(
+            book=OuterRef("pk"), status=Reservation.StatusChoices.WAITING
+        )
+        .order_by()
+        .values("book")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return queryset.annotate(waiting_reservations=Coalesce(Subquery(waiting), 0))
+
+
+def get_projected_availability(book: Book, days: int) -> list[dict]:
+    """Copies available per day: current inventory plus copies due back.
+
+    Copies due back go to the waiting reservations first, so only those
+    beyond the queue count. Allocated copies are already off the shelf.
+    Overdue copies are not counted, nobody knows when they will be back.
+    """
+    schedule = getattr(book, "return_schedule", None)
+    returns = schedule.returns if schedule else {}
+    waiting = getattr(book, "waiting_reservations", None)
+    if waiting is None:
+        waiting = Reservation.objects.filter(
+            book=book, status=Reservation.StatusChoices.WAITING
+        ).count()
+    returned = 0
+    today = datetime.now().date()
+    availability = []
+    for offset in range(days):
+        day = today + timedelta(days=offset)
+        returned += returns.get(day.isoformat(), 0)
+        availability.append(
+            {"date": day, "available": book.inventory + max(returned - waiting, 0)}
+        )
+    return availability
@@ -0,0 +1,144 @@
+import statistics
+import time
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from books.models import Book
+from borrowings.models import Borrowing
+from borrowings.overdue import plan_overdue_chunks
+
+ACTIVE_INDEXES = ("borrowing_active_user_idx", "borrowing_active_due_idx")
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Django command that times active/overdue borrowing queries"""
+
+    help = (
+        "Seed borrowings inside a rolled back transaction and time the "
+        "active and overdue queries with and without the partial indexes. "
+        "Refuses to run unless the database name contains 'benchmark', "
+        "use --force to run it anyway."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--borrowings", type=int, default=10_000_000)
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run against a database not named as a benchmark database",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        database = connection.settings_dict["NAME"]
+        if "benchmark" not in database and not options["force"]:
+            raise CommandError(
+                f"Seeds {options['borrowings']} borrowings into '{database}', "
+                "use a benchmark database or pass --force."
+            )
+
+        try:
+            with transaction.atomic():
+                user_ids = self.seed(options["borrowings"], options["users"])
+                # The seeded rows aren't committed, so index-only scans still
+                # visit the heap; both runs pay for it alike
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {Borrowing._meta.db_table}")
+                self.benchmark_all("with partial indexes", user_ids[0], options["runs"])
+                try:
+                    with transaction.atomic():
+                        with connection.cursor() as cursor:
+                            for name in ACTIVE_INDEXES:
+                                cursor.execute(f"DROP INDEX {name}")
+                        self.benchmark_all(
+                            "without partial indexes", user_ids[0], options["runs"]
+                        )
+                        raise _Rollback
+                except _Rollback:
+                    pass
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, borrowings: int, users: int) -> list[int]:
+        """Every 20th borrowing is active, a fifth of those are overdue"""
+        user_table = get_user_model()._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {user_table} (
+                    password, is_superuser, first_name, last_name, email,
+                    is_staff, is_active, date_joined
+                )
+                SELECT '', false, '', '', 'benchmark' || n || '@example.com',
+                       false, true, now()
+                FROM generate_series(1, %s) AS n
+                RETURNING id
+                """,
+                [users],
+            )
+            user_ids = [row[0] for row in cursor.fetchall()]
+            book = Book.objects.create(
+                title="benchmark", author="benchmark", inventory=1, daily_fee=1
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {Borrowing._meta.db_table} (
+                    borrow_date, expected_return_date, actual_return_date,
+                    book_id, user_id, updated_at
+                )
+                SELECT current_date - (n %% 3650) - 14,
+                       current_date - (n %% 3650) + CASE
+                           WHEN n %% 20 = 0 AND n %% 100 <> 0 THEN 3650
+                           ELSE 0
+                       END,
+                       CASE WHEN n %% 20 = 0 THEN NULL
+                            ELSE current_date - (n %% 3650) END,
+                       %s,
+                       %s + (n / 20) %% %s,
+                       now()
+                FROM generate_series(1, %s) AS n
+                """,
+                [book.id, user_ids[0], users, borrowings],
+            )
+        self.stdout.write(f"Seeded {borrowings} borrowings of {users} users")
+        return user_ids
+
+    def benchmark_all(self, title: str, user_id: int, runs: int) -> None:
+        today = datetime.now().date()
+        overdue = Q(actual_return_date__isnull=True, expected_return_date__lt=today)
+        borrowings = Borrowing.objects.select_related("book", "user")
+        queries = {
+            "overdue list page": lambda: list(borrowings.filter(overdue)[:6]),
+            "overdue count": lambda: borrowings.filter(overdue).count(),
+            "user active borrowings": lambda: list(
+                borrowings.filter(user_id=user_id, actual_return_date__isnull=True)
+            ),
+            "user overdue borrowings": lambda: list(
+                borrowings.filter(overdue, user_id=user_id)
+            ),
+            "overdue scan plan": lambda: plan_overdue_chunks(today, 0),
+        }
+        self.stdout.write(title)
+        for name, query in queries.items():
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"  {name}: median {statistics.median(timings):.1f} ms, "
+                f"p95 {p95:.1f} ms"
+            )
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.5 on 2026-10-17 07:26
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def build_return_schedules(apps, schema_editor):
+    Borrowing = apps.get_model("borrowings", "Borrowing")
+    BookReturnSchedule = apps.get_model("borrowings", "BookReturnSchedule")
+    schedules = defaultdict(dict)
+    outstanding = (
+        Borrowing.objects.filter(actual_return_date__isnull=True)
+        .values("book_id", "expected_return_date")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for row in outstanding.iterator():
+        schedules[row["book_id"]][row["expected_return_date"].isoformat()] = row[
+            "count"
+        ]
+    BookReturnSchedule.objects.bulk_create(
+        [
+            BookReturnSchedule(book_id=book_id, returns=returns)
+            for book_id, returns in schedules.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0003_keyset_ordering"),
+        ("borrowings", "0004_borrowing_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookReturnSchedule",
+            fields=[
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="return_schedule",
+                        serialize=False,
+                        to="books.book",
+                    ),
+                ),
+                ("returns", models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.RunPython(build_return_schedules, migrations.RunPython.noop),
+    ]
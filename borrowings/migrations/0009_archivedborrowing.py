@@ -0,0 +1,94 @@
+# Generated by Django 4.2.5 on 2026-10-17 08:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+CREATE_ARCHIVE_TABLE = """
+CREATE TABLE borrowings_archivedborrowing (
+    id bigint NOT NULL,
+    borrow_date date NOT NULL,
+    expected_return_date date NOT NULL,
+    actual_return_date date NOT NULL,
+    payments jsonb NOT NULL,
+    archived_at timestamp with time zone NOT NULL,
+    book_id bigint NOT NULL,
+    user_id bigint NOT NULL,
+    PRIMARY KEY (id, borrow_date)
+) PARTITION BY RANGE (borrow_date);
+CREATE INDEX archived_borrowing_user_idx
+    ON borrowings_archivedborrowing (user_id, borrow_date);
+CREATE INDEX archived_borrowing_book_idx
+    ON borrowings_archivedborrowing (book_id);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("books", "0004_book_facet_indexes"),
+        ("borrowings", "0008_borrowing_active_indexes"),
+    ]
+
+    operations = [
+        # Django can't declare a partitioned table, so the table is created
+        # with SQL; yearly partitions are added by borrowings/archive.py
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql=CREATE_ARCHIVE_TABLE,
+                    reverse_sql="DROP TABLE borrowings_archivedborrowing",
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name="ArchivedBorrowing",
+                    fields=[
+                        (
+                            "id",
+                            models.BigIntegerField(primary_key=True, serialize=False),
+                        ),
+                        ("borrow_date", models.DateField()),
+                        ("expected_return_date", models.DateField()),
+                        ("actual_return_date", models.DateField()),
+                        ("payments", models.JSONField(default=list)),
+                        (
+                            "archived_at",
+                            models.DateTimeField(default=django.utils.timezone.now),
+                        ),
+                        (
+                            "book",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="archived_borrowings",
+                                to="books.book",
+                            ),
+                        ),
+                        (
+                            "user",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="archived_borrowings",
+                                to=settings.AUTH_USER_MODEL,
+                            ),
+                        ),
+                    ],
+                    options={
+                        "ordering": ("borrow_date", "id"),
+                        "indexes": [
+                            models.Index(
+                                fields=["user", "borrow_date"],
+                                name="archived_borrowing_user_idx",
+                            ),
+                            models.Index(
+                                fields=["book"], name="archived_borrowing_book_idx"
+                            ),
+                        ],
+                    },
+                ),
+            ],
+        ),
+    ]
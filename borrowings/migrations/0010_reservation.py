@@ -0,0 +1,86 @@
+# Generated by Django 4.2.5 on 2026-10-17 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("books", "0004_book_facet_indexes"),
+        ("borrowings", "0009_archivedborrowing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Reservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("Waiting", "Waiting"),
+                            ("Allocated", "Allocated"),
+                            ("Fulfilled", "Fulfilled"),
+                            ("Cancelled", "Cancelled"),
+                            ("Expired", "Expired"),
+                        ],
+                        default="Waiting",
+                        max_length=255,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("allocated_at", models.DateTimeField(blank=True, null=True)),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="books.book",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("created_at", "id"),
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "Waiting")),
+                        fields=["book", "created_at", "id"],
+                        name="reservation_queue_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "Allocated")),
+                        fields=["expires_at"],
+                        name="reservation_allocated_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="reservation",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["Waiting", "Allocated"])),
+                fields=("user", "book"),
+                name="reservation_active_unique",
+            ),
+        ),
+    ]
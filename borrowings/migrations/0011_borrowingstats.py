@@ -0,0 +1,93 @@
+# Generated by Django 4.2.5 on 2026-10-17 09:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_borrowing_stats(apps, schema_editor):
+    """Counts the live and the archived history of every user once"""
+    borrowing = apps.get_model("borrowings", "Borrowing")._meta.db_table
+    archived = apps.get_model("borrowings", "ArchivedBorrowing")._meta.db_table
+    payment = apps.get_model("payments", "Payment")._meta.db_table
+    stats = apps.get_model("borrowings", "BorrowingStats")._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {stats} (
+                user_id, books_borrowed, current_loans, books_returned,
+                returned_on_time, fines_paid, fines_paid_amount, updated_at
+            )
+            SELECT history.user_id,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE history.actual_return_date IS NULL),
+                   COUNT(history.actual_return_date),
+                   COUNT(*) FILTER (
+                       WHERE history.actual_return_date <= history.expected_return_date
+                   ),
+                   COALESCE(SUM(history.fines_paid), 0),
+                   COALESCE(SUM(history.fines_paid_amount), 0),
+                   now()
+            FROM (
+                SELECT borrowing.user_id, borrowing.expected_return_date,
+                       borrowing.actual_return_date,
+                       fines.count AS fines_paid, fines.amount AS fines_paid_amount
+                FROM {borrowing} AS borrowing
+                LEFT JOIN LATERAL (
+                    SELECT COUNT(*) AS count, SUM(money_to_pay) AS amount
+                    FROM {payment}
+                    WHERE borrowing_id = borrowing.id
+                      AND type = 'Fine' AND status = 'Paid'
+                ) AS fines ON true
+                UNION ALL
+                SELECT archived.user_id, archived.expected_return_date,
+                       archived.actual_return_date,
+                       fines.count, fines.amount
+                FROM {archived} AS archived
+                LEFT JOIN LATERAL (
+                    SELECT COUNT(*) AS count,
+                           SUM((item ->> 'money_to_pay')::numeric) AS amount
+                    FROM jsonb_array_elements(archived.payments) AS item
+                    WHERE item ->> 'type' = 'Fine' AND item ->> 'status' = 'Paid'
+                ) AS fines ON true
+            ) AS history
+            GROUP BY history.user_id
+            """
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0001_initial"),
+        ("borrowings", "0010_reservation"),
+        ("payments", "0004_payment_checkout_placeholder"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BorrowingStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="borrowing_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("books_borrowed", models.IntegerField(default=0)),
+                ("current_loans", models.IntegerField(default=0)),
+                ("books_returned", models.IntegerField(default=0)),
+                ("returned_on_time", models.IntegerField(default=0)),
+                ("fines_paid", models.IntegerField(default=0)),
+                (
+                    "fines_paid_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_borrowing_stats, migrations.RunPython.noop),
+    ]
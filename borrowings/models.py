@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 from books.models import Book
 
@@ -12,9 +13,198 @@ class Borrowing(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="borrowings"
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
-        ordering = ("borrow_date",)
+        ordering = ("borrow_date", "id")
+        indexes = [
+            models.Index(fields=["borrow_date", "id"], name="borrowing_date_id_idx"),
+            models.Index(
+                fields=["user", "expected_return_date"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_user_idx",
+            ),
+            models.Index(
+                fields=["expected_return_date", "id"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_due_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Id {self.id}: {self.book.title} borrowed by {self.user}"
+
+
+class BookReturnSchedule(models.Model):
+    """Outstanding borrowings of a book counted by expected return date"""
+
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="return_schedule",
+    )
+    returns = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Return schedule of {self.book}"
+
+
+class TelegramMessage(models.Model):
+    """Outbox of Telegram notifications, drained by a Celery task"""
+
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                condition=models.Q(sent_at__isnull=True),
+                name="telegram_message_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Telegram message {self.id} ({'sent' if self.sent_at else 'queued'})"
+
+
+class TaskWatermark(models.Model):
+    """Progress of an incremental background job, keyed by job name"""
+
+    name = models.CharField(max_length=255, unique=True)
+    value = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ArchivedBorrowing(models.Model):
+    """Returned borrowing moved out of the hot table by the archive task.
+
+    The table is range-partitioned by ``borrow_date`` (one partition per
+    year, see borrowings/archive.py), so queries on a date range read only
+    the matching partitions. The payments stay in their table, a JSON
+    snapshot of them is kept for the archived detail.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField()
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="archived_borrowings",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="archived_borrowings",
+    )
+    payments = models.JSONField(default=list)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ("borrow_date", "id")
+        indexes = [
+            models.Index(
+                fields=["user", "borrow_date"], name="archived_borrowing_user_idx"
+            ),
+            models.Index(fields=["book"], name="archived_borrowing_book_idx"),
+        ]
+
+    def __str__(self):
+        return f"Id {self.id}: {self.book.title} borrowed by {self.user} (archived)"
+
+
+class Reservation(models.Model):
+    """Hold on a book out of stock, served first come first served on return"""
+
+    class StatusChoices(models.TextChoices):
+        WAITING = "Waiting"
+        ALLOCATED = "Allocated"
+        FULFILLED = "Fulfilled"
+        CANCELLED = "Cancelled"
+        EXPIRED = "Expired"
+
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="reservations"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+    )
+    status = models.CharField(
+        choices=StatusChoices.choices, default="Waiting", max_length=255
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    allocated_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("created_at", "id")
+        indexes = [
+            models.Index(
+                fields=["book", "created_at", "id"],
+                condition=models.Q(status="Waiting"),
+                name="reservation_queue_idx",
+            ),
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(status="Allocated"),
+                name="reservation_allocated_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "book"],
+                condition=models.Q(status__in=["Waiting", "Allocated"]),
+                name="reservation_active_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"Reservation {self.id}: {self.book.title} for {self.user} ({self.status})"
+        )
+
+
+class BorrowingStats(models.Model):
+    """Borrowing totals of a user, moved by every borrow, return and fine.
+
+    The counters are changed by deltas (see borrowings/stats.py), so they
+    keep the history of borrowings moved to the archive as well.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="borrowing_stats",
+    )
+    books_borrowed = models.IntegerField(default=0)
+    current_loans = models.IntegerField(default=0)
+    books_returned = models.IntegerField(default=0)
+    returned_on_time = models.IntegerField(default=0)
+    fines_paid = models.IntegerField(default=0)
+    fines_paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def on_time_rate(self):
+        if not self.books_returned:
+            return None
+        return round(self.returned_on_time / self.books_returned, 4)
+
+    def __str__(self):
+        return f"Stats of {self.user}: {self.books_borrowed} borrowed"
@@ -1,13 +1,47 @@
 import requests
 from django.conf import settings
-from rest_framework.response import Response
+from requests.adapters import HTTPAdapter
+
+from borrowings.models import TelegramMessage
 
 TELEGRAM_BOT_TOKEN = settings.TELEGRAM_BOT_TOKEN
 TELEGRAM_CHAT_ID = settings.TELEGRAM_CHAT_ID
 URL = settings.URL_NOTIFICATION
+TELEGRAM_TIMEOUT = (3.05, 10)
+
+_session = None
+
 
+def get_telegram_session() -> requests.Session:
+    """Keep-alive session reused by every request of this process"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    return _session
 
-def send_telegram_notification(message: str) -> Response:
-    req_info = requests.post(URL, json={"chat_id": TELEGRAM_CHAT_ID, "text": message})
+
+def send_telegram_notification(message: str) -> requests.Response:
+    req_info = get_telegram_session().post(
+        URL,
+        json={"chat_id": TELEGRAM_CHAT_ID, "text": message},
+        timeout=TELEGRAM_TIMEOUT,
+    )
 
     return req_info
+
+
+def queue_telegram_notification(message: str) -> TelegramMessage:
+    """Stores the message in the outbox, in the caller's transaction.
+
+    It is sent by the dispatch_telegram_outbox task, so the message goes
+    out only if the transaction commits and the request never waits for
+    Telegram.
+    """
+    return TelegramMessage.objects.create(text=message)
+
+
+def queue_telegram_notifications(messages: list[str]) -> list[TelegramMessage]:
+    return TelegramMessage.objects.bulk_create(
+        [TelegramMessage(text=message) for message in messages]
+    )
@@ -0,0 +1,116 @@
+import time
+from datetime import timedelta
+
+import requests
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from borrowings.models import TelegramMessage
+from borrowings.notifications import send_telegram_notification
+
+OUTBOX_BATCH_SIZE = 20
+OUTBOX_LEASE = timedelta(minutes=2)
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BASE_BACKOFF = 5
+OUTBOX_MAX_BACKOFF = 60 * 60
+# Telegram accepts about one message per second in the same chat
+TELEGRAM_SEND_INTERVAL = 1.0
+DISPATCH_TIME_BUDGET = 50
+DISPATCH_LOCK_KEY = "borrowings:telegram:dispatching"
+
+
+def claim_messages(batch_size: int = OUTBOX_BATCH_SIZE) -> list[TelegramMessage]:
+    """Leases the oldest due messages, so a crashed dispatcher's batch comes back"""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            TelegramMessage.objects.filter(
+                sent_at__isnull=True, next_attempt_at__lte=now
+            ).select_for_update(skip_locked=True)[:batch_size]
+        )
+        TelegramMessage.objects.filter(
+            id__in=[message.id for message in messages]
+        ).update(next_attempt_at=now + OUTBOX_LEASE)
+    return messages
+
+
+def get_retry_after(response: requests.Response) -> int | None:
+    if response.status_code != 429:
+        return None
+    try:
+        return int(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return OUTBOX_BASE_BACKOFF
+
+
+def schedule_retry(
+    message: TelegramMessage, error: str, retry_after: int | None = None
+) -> None:
+    """Backs off exponentially; a message out of attempts is left unsent"""
+    attempts = message.attempts + 1
+    if retry_after is None:
+        retry_after = min(OUTBOX_BASE_BACKOFF * 2**attempts, OUTBOX_MAX_BACKOFF)
+    next_attempt_at = timezone.now() + timedelta(seconds=retry_after)
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        next_attempt_at = None
+    TelegramMessage.objects.filter(id=message.id).update(
+        attempts=attempts, next_attempt_at=next_attempt_at, last_error=error[:1000]
+    )
+
+
+def release_messages(messages: list[TelegramMessage], delay: int = 0) -> None:
+    TelegramMessage.objects.filter(id__in=[message.id for message in messages]).update(
+        next_attempt_at=timezone.now() + timedelta(seconds=delay)
+    )
+
+
+def dispatch_outbox(time_budget: float = DISPATCH_TIME_BUDGET, sleep=time.sleep) -> int:
+    """Sends due outbox messages in order, paced to Telegram's rate limit.
+
+    Only one dispatcher runs at a time, so the pace holds across workers.
+    A 429 response pauses the whole outbox for the advertised retry_after.
+    Returns the number of messages sent.
+    """
+    if not cache.add(DISPATCH_LOCK_KEY, 1, timeout=time_budget + 30):
+        return 0
+
+    sent = 0
+    deadline = time.monotonic() + time_budget
+    try:
+        while time.monotonic() < deadline:
+            messages = claim_messages()
+            if not messages:
+                break
+            for position, message in enumerate(messages):
+                if time.monotonic() >= deadline:
+                    release_messages(messages[position:])
+                    return sent
+
+                started = time.monotonic()
+                retry_after = None
+                try:
+                    response = send_telegram_notification(message.text)
+                except requests.RequestException as error:
+                    schedule_retry(message, str(error))
+                else:
+                    if response.ok:
+                        TelegramMessage.objects.filter(id=message.id).update(
+                            sent_at=timezone.now(), attempts=message.attempts + 1
+                        )
+                        sent += 1
+                    else:
+                        retry_after = get_retry_after(response)
+                        schedule_retry(
+                            message,
+                            f"{response.status_code}: {response.text}",
+                            retry_after,
+                        )
+
+                if retry_after is not None:
+                    release_messages(messages[position + 1 :], retry_after)
+                    return sent
+                sleep(max(0.0, TELEGRAM_SEND_INTERVAL - (time.monotonic() - started)))
+    finally:
+        cache.delete(DISPATCH_LOCK_KEY)
+    return sent
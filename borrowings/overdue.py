@@ -0,0 +1,97 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q
+
+from borrowings.models import TaskWatermark
+from borrowings.notifications import queue_telegram_notifications
+from borrowings.utils import build_overdue_digest, check_borrowings_overdue
+
+OVERDUE_SCAN_CHUNK_SIZE = 5000
+OVERDUE_SCAN_WATERMARK = "borrowings:overdue-scan"
+
+
+def get_overdue_scan_start(scan_date: date) -> int | None:
+    """Last borrowing id already notified on the scan date, None on a new day"""
+    watermark = (
+        TaskWatermark.objects.filter(name=OVERDUE_SCAN_WATERMARK)
+        .values_list("value", flat=True)
+        .first()
+        or {}
+    )
+    if watermark.get("date") != scan_date.isoformat():
+        return None
+    return watermark["last_id"]
+
+
+def plan_overdue_chunks(
+    scan_date: date, after_id: int, chunk_size: int = OVERDUE_SCAN_CHUNK_SIZE
+) -> tuple[list[tuple[tuple, tuple]], int]:
+    """Splits the overdue borrowings with id above ``after_id`` into key ranges.
+
+    Keys are (expected return date, id), the order of the active due-date
+    index, so the server-side cursor reads that index only and needs no
+    sort. The planner keeps one range per ``chunk_size`` borrowings and
+    the highest id seen, which becomes the watermark.
+    """
+    rows = (
+        check_borrowings_overdue(scan_date)
+        .filter(id__gt=after_id)
+        .order_by("expected_return_date", "id")
+        .values_list("expected_return_date", "id")
+        .iterator(chunk_size=chunk_size)
+    )
+    chunks = []
+    first_key = last_key = None
+    count = 0
+    max_id = after_id
+    for expected_return_date, borrowing_id in rows:
+        last_key = (expected_return_date.isoformat(), borrowing_id)
+        if first_key is None:
+            first_key = last_key
+        max_id = max(max_id, borrowing_id)
+        count += 1
+        if count == chunk_size:
+            chunks.append((first_key, last_key))
+            first_key, count = None, 0
+    if first_key is not None:
+        chunks.append((first_key, last_key))
+    return chunks, max_id
+
+
+def get_key_range_filter(first_key: tuple, last_key: tuple) -> Q:
+    """(expected_return_date, id) between the two keys, both included"""
+    first_date, first_id = date.fromisoformat(first_key[0]), first_key[1]
+    last_date, last_id = date.fromisoformat(last_key[0]), last_key[1]
+    return (
+        Q(expected_return_date__gt=first_date)
+        | Q(expected_return_date=first_date, id__gte=first_id)
+    ) & (
+        Q(expected_return_date__lt=last_date)
+        | Q(expected_return_date=last_date, id__lte=last_id)
+    )
+
+
+def notify_overdue_chunk(
+    scan_date: date, first_key: tuple, last_key: tuple, after_id: int = 0
+) -> int:
+    """Queues the digest of one key range, returns the number of messages"""
+    queryset = (
+        check_borrowings_overdue(scan_date)
+        .filter(get_key_range_filter(first_key, last_key), id__gt=after_id)
+        .order_by("expected_return_date", "id")
+    )
+    messages = build_overdue_digest(queryset)
+    queue_telegram_notifications(messages)
+    return len(messages)
+
+
+def advance_overdue_watermark(scan_date: date, last_id: int) -> None:
+    with transaction.atomic():
+        watermark, _ = TaskWatermark.objects.select_for_update().get_or_create(
+            name=OVERDUE_SCAN_WATERMARK
+        )
+        if watermark.value.get("date") == scan_date.isoformat():
+            last_id = max(last_id, watermark.value["last_id"])
+        watermark.value = {"date": scan_date.isoformat(), "last_id": last_id}
+        watermark.save()
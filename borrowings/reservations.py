@@ -0,0 +1,179 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from books.inventory import release_copies
+from borrowings.models import Reservation
+from borrowings.notifications import queue_telegram_notifications
+
+
+def get_reservation_info(reservation: Reservation) -> str:
+    return (
+        f"Reservation id: {reservation.id}\n"
+        f"Book: {reservation.book.title}\n"
+        f"User: {reservation.user}\n"
+        f"Hold until: {reservation.expires_at:%Y-%m-%d %H:%M}"
+    )
+
+
+def annotate_queue_position(queryset: QuerySet) -> QuerySet:
+    """Adds ``ahead``, the waiting reservations before each one in its book queue"""
+    ahead = (
+        Reservation.objects.filter(
+            book=OuterRef("book"), status=Reservation.StatusChoices.WAITING
+        )
+        .filter(
+            Q(created_at__lt=OuterRef("created_at"))
+            | Q(created_at=OuterRef("created_at"), id__lt=OuterRef("id"))
+        )
+        .order_by()
+        .values("book")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return queryset.annotate(ahead=Coalesce(Subquery(ahead), 0))
+
+
+def allocate_copies(counts: dict[int, int]) -> dict[int, int]:
+    """Hands returned copies to the heads of the book queues.
+
+    One statement takes the first ``count`` waiting reservations of every
+    book through the queue index, skipping rows locked by a concurrent
+    allocation, and marks them Allocated. The holders are notified through
+    the Telegram outbox. Returns the number of copies allocated per book.
+    """
+    if not counts:
+        return {}
+    table = Reservation._meta.db_table
+    values = ", ".join(["(%s::bigint, %s::integer)"] * len(counts))
+    params = [param for item in sorted(counts.items()) for param in item]
+    expires_at = timezone.now() + timedelta(hours=settings.RESERVATION_HOLD_HOURS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table}
+            SET status = 'Allocated', allocated_at = now(), expires_at = %s
+            WHERE id IN (
+                SELECT head.id
+                FROM (VALUES {values}) AS returned (book_id, count)
+                CROSS JOIN LATERAL (
+                    SELECT id FROM {table}
+                    WHERE book_id = returned.book_id AND status = 'Waiting'
+                    ORDER BY created_at, id
+                    LIMIT returned.count
+                    FOR UPDATE SKIP LOCKED
+                ) AS head
+            )
+            RETURNING id
+            """,
+            [expires_at] + params,
+        )
+        allocated_ids = [row[0] for row in cursor.fetchall()]
+    if not allocated_ids:
+        return {}
+
+    allocated = list(
+        Reservation.objects.filter(id__in=allocated_ids).select_related("book", "user")
+    )
+    queue_telegram_notifications(
+        [
+            "Reserved book is waiting for you:\n" + get_reservation_info(reservation)
+            for reservation in allocated
+        ]
+    )
+    return Counter(reservation.book_id for reservation in allocated)
+
+
+def return_copies(counts: dict[int, int]) -> None:
+    """Copies coming back go to the reservation queues, the rest to the shelf"""
+    allocated = allocate_copies(counts)
+    remaining = {
+        book_id: count - allocated.get(book_id, 0)
+        for book_id, count in counts.items()
+        if count > allocated.get(book_id, 0)
+    }
+    if remaining:
+        release_copies(remaining)
+
+
+def fulfil_reservation(user_id: int, book_id: int) -> bool:
+    """Turns the copy held for the user into a borrowing, False without one"""
+    return bool(
+        Reservation.objects.filter(
+            user_id=user_id,
+            book_id=book_id,
+            status=Reservation.StatusChoices.ALLOCATED,
+        ).update(status=Reservation.StatusChoices.FULFILLED)
+    )
+
+
+def fulfil_reservations(user_id: int, book_ids: set[int]) -> set[int]:
+    """Cart version of fulfil_reservation, returns the books it had copies of"""
+    if not book_ids:
+        return set()
+    table = Reservation._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} SET status = 'Fulfilled'
+            WHERE user_id = %s AND book_id = ANY(%s) AND status = 'Allocated'
+            RETURNING book_id
+            """,
+            [user_id, sorted(book_ids)],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def has_allocated_copy(user_id: int, book_id: int) -> bool:
+    return Reservation.objects.filter(
+        user_id=user_id, book_id=book_id, status=Reservation.StatusChoices.ALLOCATED
+    ).exists()
+
+
+def get_allocated_books(user_id: int, book_ids: set[int]) -> set[int]:
+    """Books of ``book_ids`` with a copy held for the user"""
+    return set(
+        Reservation.objects.filter(
+            user_id=user_id,
+            book_id__in=book_ids,
+            status=Reservation.StatusChoices.ALLOCATED,
+        ).values_list("book_id", flat=True)
+    )
+
+
+@transaction.atomic
+def cancel_reservation(reservation_id: int) -> None:
+    """A cancelled allocation passes its copy to the next in the queue"""
+    reservation = Reservation.objects.select_for_update().get(id=reservation_id)
+    if reservation.status not in (
+        Reservation.StatusChoices.WAITING,
+        Reservation.StatusChoices.ALLOCATED,
+    ):
+        return
+    was_allocated = reservation.status == Reservation.StatusChoices.ALLOCATED
+    reservation.status = Reservation.StatusChoices.CANCELLED
+    reservation.save(update_fields=["status"])
+    if was_allocated:
+        return_copies({reservation.book_id: 1})
+
+
+@transaction.atomic
+def expire_allocations() -> int:
+    """Allocations not borrowed in time pass their copy on, returns how many"""
+    table = Reservation._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} SET status = 'Expired'
+            WHERE status = 'Allocated' AND expires_at < now()
+            RETURNING book_id
+            """
+        )
+        book_ids = [row[0] for row in cursor.fetchall()]
+    return_copies(Counter(book_ids))
+    return len(book_ids)
@@ -0,0 +1,112 @@
+from collections import Counter
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.request import Request
+
+from borrowings.availability import record_expected_returns
+from borrowings.models import Borrowing
+from borrowings.reservations import return_copies
+from borrowings.stats import record_returned
+from library_service_api.events import publish_borrowing_events
+from payments.checkout import start_fine_checkout
+
+MAX_BULK_RETURN = 1000
+
+
+def _mark_returned(borrowing_ids: list[int], actual_return_date) -> list[tuple]:
+    """Returns the active borrowings with one UPDATE, RETURNING the changed rows"""
+    table = Borrowing._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table}
+            SET actual_return_date = %s, updated_at = %s
+            WHERE id = ANY(%s) AND actual_return_date IS NULL
+            RETURNING id, book_id, user_id, expected_return_date
+            """,
+            [actual_return_date, timezone.now(), borrowing_ids],
+        )
+        return cursor.fetchall()
+
+
+def return_borrowings(borrowing_ids: list[int], request: Request) -> list[dict]:
+    """Returns many borrowings at the circulation desk.
+
+    The borrowings are marked returned with one UPDATE. The copies go to
+    the reservation queues first, then back to the shelf with one UPDATE
+    aggregated by book. Overdue borrowings get a fine
+    whose Stripe session is created in the background after commit.
+    Returns a result per requested id, in the request order.
+    """
+    actual_return_date = datetime.now().date()
+    with transaction.atomic():
+        returned = _mark_returned(sorted(set(borrowing_ids)), actual_return_date)
+        returned_ids = {borrowing_id for borrowing_id, _, _, _ in returned}
+        fines = {}
+        if returned:
+            return_copies(Counter(book_id for _, book_id, _, _ in returned))
+            schedule = Counter((book_id, day) for _, book_id, _, day in returned)
+            record_expected_returns({key: -count for key, count in schedule.items()})
+            record_returned(
+                [
+                    (user_id, day >= actual_return_date)
+                    for _, _, user_id, day in returned
+                ]
+            )
+            publish_borrowing_events(
+                Borrowing(
+                    id=borrowing_id,
+                    book_id=book_id,
+                    user_id=user_id,
+                    expected_return_date=day,
+                    actual_return_date=actual_return_date,
+                )
+                for borrowing_id, book_id, user_id, day in returned
+            )
+
+            overdue = Borrowing.objects.filter(
+                id__in=[
+                    borrowing_id
+                    for borrowing_id, _, _, day in returned
+                    if day < actual_return_date
+                ]
+            ).select_related("book")
+            for payment in start_fine_checkout(list(overdue), request):
+                fines[payment.borrowing_id] = payment
+
+        existing = set(
+            Borrowing.objects.filter(
+                id__in=set(borrowing_ids) - returned_ids
+            ).values_list("id", flat=True)
+        )
+
+    results = []
+    for borrowing_id in borrowing_ids:
+        if borrowing_id in returned_ids:
+            result = {"id": borrowing_id, "status": "returned"}
+            if borrowing_id in fines:
+                payment = fines[borrowing_id]
+                result["fine"] = {
+                    "payment": payment.id,
+                    "money_to_pay": payment.money_to_pay,
+                }
+            results.append(result)
+        elif borrowing_id in existing:
+            results.append(
+                {
+                    "id": borrowing_id,
+                    "status": "already_returned",
+                    "detail": "Borrowing has been already returned.",
+                }
+            )
+        else:
+            results.append(
+                {
+                    "id": borrowing_id,
+                    "status": "not_found",
+                    "detail": "Borrowing not found.",
+                }
+            )
+    return results
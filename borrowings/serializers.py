@@ -1,14 +1,57 @@
+from collections import Counter
 from datetime import datetime
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
-from borrowings.models import Borrowing
-from borrowings.notifications import send_telegram_notification
+from books.inventory import reserve_copies, reserve_copy
+from books.models import Book
+from borrowings.availability import record_expected_return, record_expected_returns
+from borrowings.models import (
+    ArchivedBorrowing,
+    Borrowing,
+    BorrowingStats,
+    Reservation,
+)
+from borrowings.notifications import queue_telegram_notification
+from borrowings.reservations import (
+    fulfil_reservation,
+    fulfil_reservations,
+    get_allocated_books,
+    has_allocated_copy,
+    return_copies,
+)
+from borrowings.returns import MAX_BULK_RETURN
+from borrowings.stats import record_borrowed, record_returned
 from borrowings.utils import get_borrowing_info
-from payments.models import Payment
-from payments.stripe_session import create_stripe_session_and_payment
+from library_service_api.events import publish_borrowing_events
+from payments.checkout import start_cart_checkout, start_checkout
+from payments.standing import has_pending_payments
+from payments.stripe_session import (
+    create_cart_session_and_payments,
+    create_stripe_session_and_payment,
+)
+
+MAX_CART_SIZE = 10
+
+
+def validate_no_pending_payments(user) -> None:
+    if has_pending_payments(user.id):
+        raise ValidationError(
+            detail="You have one or more pending payments. You can't make borrowings until you pay for them."
+        )
+
+
+def validate_return_date(value):
+    if value < datetime.now().date():
+        raise ValidationError(
+            detail="You can't put expected return date in the past!!!"
+        )
+    return value
 
 
 class BorrowingSerializer(serializers.ModelSerializer):
@@ -25,31 +68,27 @@ class BorrowingSerializer(serializers.ModelSerializer):
 
 
 class BorrowingCreateSerializer(serializers.ModelSerializer):
+    checkout = serializers.SerializerMethodField()
+
     class Meta:
         model = Borrowing
-        fields = ("id", "borrow_date", "expected_return_date", "book")
+        fields = ("id", "borrow_date", "expected_return_date", "book", "checkout")
+
+    def get_checkout(self, borrowing: Borrowing) -> str:
+        """Url to poll for the Stripe session of the borrowing payment"""
+        return reverse("borrowings:borrowing-checkout", args=[borrowing.id])
 
     def validate(self, attrs):
         data = super(BorrowingCreateSerializer, self).validate(attrs)
-        user = self.context["request"].user
-        pending_payments = Payment.objects.filter(borrowing__user=user).filter(
-            status="Pending"
-        )
-        if pending_payments:
-            raise ValidationError(
-                detail="You have one or more pending payments. You can't make borrowings until you pay for them."
-            )
+        validate_no_pending_payments(self.context["request"].user)
         return data
 
     def validate_expected_return_date(self, value):
-        if value < datetime.now().date():
-            raise ValidationError(
-                detail="You can't put expected return date in the past!!!"
-            )
-        return value
+        return validate_return_date(value)
 
     def validate_book(self, value):
-        if value.inventory == 0:
+        user = self.context["request"].user
+        if value.inventory == 0 and not has_allocated_copy(user.id, value.id):
             raise serializers.ValidationError(
                 {"book_inventory": f"{value.title} out of stock at this moment"}
             )
@@ -59,18 +98,143 @@ class BorrowingCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         borrowing = Borrowing.objects.create(**validated_data)
         book = validated_data["book"]
-        book.inventory -= 1
-        book.save()
 
-        create_stripe_session_and_payment(
-            borrowing, request=self.context["request"], payment_type="Payment"
-        )
+        # The copy is taken before the Stripe session is created, so a
+        # checkout losing the race never leaves a payable session behind.
+        # A copy allocated to the user from the reservation queue is taken
+        # instead of one from the shelf.
+        if not fulfil_reservation(borrowing.user_id, book.id) and not reserve_copy(
+            book.id
+        ):
+            raise serializers.ValidationError(
+                {"book_inventory": f"{book.title} out of stock at this moment"}
+            )
+
+        if settings.STRIPE_ASYNC_CHECKOUT:
+            start_checkout(borrowing, request=self.context["request"])
+        else:
+            create_stripe_session_and_payment(
+                borrowing, request=self.context["request"], payment_type="Payment"
+            )
+        record_expected_return(book.id, borrowing.expected_return_date, 1)
+        record_borrowed([borrowing.user_id])
+        publish_borrowing_events([borrowing])
+
         message = "New borrowing created:\n" + get_borrowing_info(borrowing)
-        send_telegram_notification(message)
+        queue_telegram_notification(message)
 
         return borrowing
 
 
+class BorrowingCartSerializer(serializers.Serializer):
+    expected_return_date = serializers.DateField(write_only=True)
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=MAX_CART_SIZE,
+        write_only=True,
+    )
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        validate_no_pending_payments(self.context["request"].user)
+        return data
+
+    def validate_expected_return_date(self, value):
+        return validate_return_date(value)
+
+    def validate_books(self, value):
+        """Loads every book of the cart with a single query.
+
+        A copy allocated to the user from the reservation queue counts on
+        top of the shelf inventory.
+        """
+        books = Book.objects.in_bulk(set(value))
+        missing = sorted(set(value) - set(books))
+        if missing:
+            raise ValidationError(f"Books not found: {missing}")
+        allocated = get_allocated_books(self.context["request"].user.id, set(books))
+        out_of_stock = [
+            books[book_id].title
+            for book_id, count in Counter(value).items()
+            if books[book_id].inventory + (book_id in allocated) < count
+        ]
+        if out_of_stock:
+            raise serializers.ValidationError(
+                {
+                    "book_inventory": f"{', '.join(out_of_stock)} out of stock at this moment"
+                }
+            )
+        return [books[book_id] for book_id in value]
+
+    @transaction.atomic()
+    def create(self, validated_data):
+        """Borrowings of the cart in one transaction and one Stripe session"""
+        user = validated_data["user"]
+        expected_return_date = validated_data["expected_return_date"]
+        borrowings = Borrowing.objects.bulk_create(
+            Borrowing(expected_return_date=expected_return_date, book=book, user=user)
+            for book in validated_data["books"]
+        )
+
+        # Copies are taken before the Stripe session is created, so a cart
+        # losing the race never leaves a payable session behind. Copies
+        # allocated to the user from the reservation queues go first.
+        counts = Counter(borrowing.book_id for borrowing in borrowings)
+        fulfilled = fulfil_reservations(user.id, set(counts))
+        remaining = {
+            book_id: count - (book_id in fulfilled)
+            for book_id, count in counts.items()
+            if count > (book_id in fulfilled)
+        }
+        reserved = reserve_copies(remaining) if remaining else set()
+        out_of_stock = [
+            book.title
+            for book in validated_data["books"]
+            if book.id in remaining and book.id not in reserved
+        ]
+        if out_of_stock:
+            raise serializers.ValidationError(
+                {
+                    "book_inventory": f"{', '.join(dict.fromkeys(out_of_stock))} "
+                    "out of stock at this moment"
+                }
+            )
+
+        if settings.STRIPE_ASYNC_CHECKOUT:
+            start_cart_checkout(borrowings, request=self.context["request"])
+        else:
+            create_cart_session_and_payments(
+                borrowings, request=self.context["request"]
+            )
+
+        record_expected_returns(
+            {
+                (book_id, expected_return_date): count
+                for book_id, count in counts.items()
+            }
+        )
+        record_borrowed([borrowing.user_id for borrowing in borrowings])
+        publish_borrowing_events(borrowings)
+
+        message = "New borrowings created:\n" + "\n\n".join(
+            get_borrowing_info(borrowing) for borrowing in borrowings
+        )
+        queue_telegram_notification(message)
+
+        return borrowings
+
+    def to_representation(self, borrowings):
+        return {
+            "borrowings": BorrowingCreateSerializer(
+                borrowings, many=True, context=self.context
+            ).data,
+            "checkout": reverse(
+                "borrowings:borrowing-checkout", args=[borrowings[0].id]
+            ),
+        }
+
+
 class BorrowingDetailSerializer(BorrowingCreateSerializer):
     user = serializers.SlugRelatedField(many=False, read_only=True, slug_field="email")
     book = serializers.StringRelatedField(many=False, read_only=True)
@@ -85,10 +249,47 @@ class BorrowingDetailSerializer(BorrowingCreateSerializer):
             "book",
             "user",
             "payments",
+            "checkout",
         )
         read_only_fields = ("id", "payments")
 
 
+class ArchivedBorrowingSerializer(serializers.ModelSerializer):
+    user = serializers.SlugRelatedField(many=False, read_only=True, slug_field="email")
+    book = serializers.StringRelatedField(many=False, read_only=True)
+
+    class Meta:
+        model = ArchivedBorrowing
+        fields = (
+            "id",
+            "borrow_date",
+            "expected_return_date",
+            "actual_return_date",
+            "book",
+            "user",
+            "payments",
+            "archived_at",
+        )
+        read_only_fields = fields
+
+
+class BorrowingStatsSerializer(serializers.ModelSerializer):
+    on_time_rate = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = BorrowingStats
+        fields = (
+            "books_borrowed",
+            "current_loans",
+            "books_returned",
+            "returned_on_time",
+            "on_time_rate",
+            "fines_paid",
+            "fines_paid_amount",
+        )
+        read_only_fields = fields
+
+
 class BorrowingReturnSerializer(serializers.ModelSerializer):
     class Meta:
         model = Borrowing
@@ -127,9 +328,86 @@ class BorrowingReturnSerializer(serializers.ModelSerializer):
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        book = instance.book
-        instance.actual_return_date = datetime.now().date()
-        instance.save()
-        book.inventory += 1
-        book.save()
+        actual_return_date = datetime.now().date()
+        updated_at = timezone.now()
+        returned = Borrowing.objects.filter(
+            id=instance.id, actual_return_date__isnull=True
+        ).update(actual_return_date=actual_return_date, updated_at=updated_at)
+        if not returned:
+            raise ValidationError(detail="Borrowing has been already returned.")
+
+        instance.actual_return_date = actual_return_date
+        instance.updated_at = updated_at
+        return_copies({instance.book_id: 1})
+        record_expected_return(instance.book_id, instance.expected_return_date, -1)
+        record_returned(
+            [(instance.user_id, actual_return_date <= instance.expected_return_date)]
+        )
+        publish_borrowing_events([instance])
         return instance
+
+
+class BorrowingBulkReturnSerializer(serializers.Serializer):
+    borrowings = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=MAX_BULK_RETURN,
+    )
+
+    def validate_borrowings(self, value):
+        if len(value) != len(set(value)):
+            raise serializers.ValidationError(
+                "Each borrowing can be returned only once."
+            )
+        return value
+
+
+class ReservationSerializer(serializers.ModelSerializer):
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Reservation
+        fields = (
+            "id",
+            "book",
+            "status",
+            "position",
+            "created_at",
+            "allocated_at",
+            "expires_at",
+        )
+        read_only_fields = (
+            "id",
+            "status",
+            "created_at",
+            "allocated_at",
+            "expires_at",
+        )
+
+    def get_position(self, reservation: Reservation) -> int | None:
+        """Place in the book queue, while the reservation is waiting"""
+        if reservation.status != Reservation.StatusChoices.WAITING:
+            return None
+        ahead = getattr(reservation, "ahead", None)
+        if ahead is None:
+            ahead = Reservation.objects.filter(
+                book_id=reservation.book_id,
+                status=Reservation.StatusChoices.WAITING,
+                id__lt=reservation.id,
+            ).count()
+        return ahead + 1
+
+    def validate_book(self, value):
+        user = self.context["request"].user
+        if value.inventory > 0:
+            raise ValidationError(f"{value.title} is in stock, borrow it instead.")
+        if Reservation.objects.filter(
+            user=user,
+            book=value,
+            status__in=[
+                Reservation.StatusChoices.WAITING,
+                Reservation.StatusChoices.ALLOCATED,
+            ],
+        ).exists():
+            raise ValidationError("You already have a reservation for this book.")
+        return value
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection
+
+from borrowings.models import BorrowingStats
+
+STATS_FIELDS = {
+    "books_borrowed": "integer",
+    "current_loans": "integer",
+    "books_returned": "integer",
+    "returned_on_time": "integer",
+    "fines_paid": "integer",
+    "fines_paid_amount": "numeric",
+}
+
+
+def update_borrowing_stats(changes: dict[int, dict]) -> None:
+    """Adds the deltas to the stats rows of the users with one upsert.
+
+    ``changes`` maps a user id to ``{field: delta}``. Rows are written in
+    user order, so concurrent updates lock them in the same order.
+    """
+    if not changes:
+        return
+    table = BorrowingStats._meta.db_table
+    columns = ", ".join(STATS_FIELDS)
+    row = ", ".join(
+        ["%s::bigint"] + [f"%s::{db_type}" for db_type in STATS_FIELDS.values()]
+    )
+    values = ", ".join([f"({row})"] * len(changes))
+    params = []
+    for user_id in sorted(changes):
+        params.append(user_id)
+        params.extend(changes[user_id].get(field, 0) for field in STATS_FIELDS)
+    updates = ", ".join(
+        f"{field} = {table}.{field} + EXCLUDED.{field}" for field in STATS_FIELDS
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (user_id, {columns}, updated_at)
+            SELECT *, now() FROM (VALUES {values}) AS delta
+            ON CONFLICT (user_id) DO UPDATE
+            SET {updates}, updated_at = EXCLUDED.updated_at
+            """,
+            params,
+        )
+
+
+def record_borrowed(user_ids: list[int]) -> None:
+    """One entry per new borrowing"""
+    changes = defaultdict(lambda: defaultdict(int))
+    for user_id in user_ids:
+        changes[user_id]["books_borrowed"] += 1
+        changes[user_id]["current_loans"] += 1
+    update_borrowing_stats(changes)
+
+
+def record_returned(returns: list[tuple[int, bool]]) -> None:
+    """One ``(user_id, on_time)`` entry per returned borrowing"""
+    changes = defaultdict(lambda: defaultdict(int))
+    for user_id, on_time in returns:
+        changes[user_id]["current_loans"] -= 1
+        changes[user_id]["books_returned"] += 1
+        changes[user_id]["returned_on_time"] += int(on_time)
+    update_borrowing_stats(changes)
+
+
+def record_fines_paid(fines: list[tuple[int, Decimal]]) -> None:
+    """One ``(user_id, amount)`` entry per fine that became Paid"""
+    changes = defaultdict(lambda: defaultdict(int))
+    for user_id, amount in fines:
+        changes[user_id]["fines_paid"] += 1
+        changes[user_id]["fines_paid_amount"] += amount
+    update_borrowing_stats(changes)
@@ -1,8 +1,83 @@
-from celery import shared_task
+from datetime import date, datetime
 
-from borrowings.utils import borrowing_overdue_send_message, check_borrowings_overdue
+from celery import chord, shared_task
+
+from borrowings.archive import archive_returned_borrowings
+from borrowings.notifications import queue_telegram_notifications
+from borrowings.outbox import dispatch_outbox
+from borrowings.overdue import (
+    OVERDUE_SCAN_CHUNK_SIZE,
+    advance_overdue_watermark,
+    get_overdue_scan_start,
+    notify_overdue_chunk,
+    plan_overdue_chunks,
+)
+from borrowings.reservations import expire_allocations
+from borrowings.utils import (
+    NO_OVERDUE_MESSAGE,
+    borrowing_overdue_send_digest,
+    borrowing_overdue_send_message,
+    check_borrowings_overdue,
+)
+
+
+@shared_task
+def daily_borrowings_overdue_notification(digest: bool = True):
+    """Digest mode sends a few messages; otherwise one per overdue borrowing"""
+    if digest:
+        borrowing_overdue_send_digest(check_borrowings_overdue())
+    else:
+        borrowing_overdue_send_message(check_borrowings_overdue())
+
+
+@shared_task
+def dispatch_telegram_outbox():
+    dispatch_outbox()
+
+
+@shared_task
+def scan_borrowings_overdue(chunk_size: int = OVERDUE_SCAN_CHUNK_SIZE):
+    """Fans the overdue borrowings out to workers as a chord of key chunks.
+
+    The watermark records the last borrowing notified today, so a re-run
+    on the same day only picks up borrowings that became overdue since.
+    """
+    scan_date = datetime.now().date()
+    start = get_overdue_scan_start(scan_date)
+    chunks, last_id = plan_overdue_chunks(scan_date, start or 0, chunk_size)
+    if not chunks:
+        if start is None:
+            queue_telegram_notifications([NO_OVERDUE_MESSAGE])
+            advance_overdue_watermark(scan_date, 0)
+        return
+
+    chord(
+        notify_borrowings_overdue_chunk.si(
+            scan_date.isoformat(), first_key, last_key, start or 0
+        )
+        for first_key, last_key in chunks
+    )(finish_borrowings_overdue_scan.si(scan_date.isoformat(), last_id))
+
+
+@shared_task
+def notify_borrowings_overdue_chunk(
+    scan_date: str, first_key: list, last_key: list, after_id: int = 0
+):
+    return notify_overdue_chunk(
+        date.fromisoformat(scan_date), first_key, last_key, after_id
+    )
+
+
+@shared_task
+def finish_borrowings_overdue_scan(scan_date: str, last_id: int):
+    advance_overdue_watermark(date.fromisoformat(scan_date), last_id)
+
+
+@shared_task
+def archive_old_borrowings() -> int:
+    return archive_returned_borrowings()
 
 
 @shared_task
-def daily_borrowings_overdue_notification():
-    borrowing_overdue_send_message(check_borrowings_overdue())
+def expire_reservation_allocations() -> int:
+    return expire_allocations()
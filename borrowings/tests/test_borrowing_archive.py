@@ -0,0 +1,143 @@
+import decimal
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from books.tests.test_book_api import sample_book
+from borrowings.archive import archive_returned_borrowings
+from borrowings.models import ArchivedBorrowing, Borrowing
+from payments.models import Payment
+
+ARCHIVE_URL = reverse("borrowings:borrowing-archive")
+PAYMENT_URL = reverse("payments:payment-list")
+PAYMENT_CANCEL_URL = reverse("payments:payment-cancel")
+
+
+def detail_url(borrowing_id):
+    return reverse("borrowings:borrowing-detail", args=[borrowing_id])
+
+
+@override_settings(QUERY_INSPECTOR="raise", BORROWING_ARCHIVE_AFTER_DAYS=365)
+class BorrowingArchiveTests(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.user2 = get_user_model().objects.create_user(
+            "testunique1@tests.com", "unique_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.book = sample_book()
+        self.today = datetime.now().date()
+
+    def create_borrowing(self, days_ago: int, returned: bool = True, user=None):
+        borrow_date = self.today - timedelta(days=days_ago)
+        borrowing = Borrowing.objects.create(
+            expected_return_date=borrow_date + timedelta(days=7),
+            actual_return_date=borrow_date + timedelta(days=5) if returned else None,
+            book=self.book,
+            user=user or self.user,
+        )
+        Borrowing.objects.filter(id=borrowing.id).update(borrow_date=borrow_date)
+        return borrowing
+
+    def create_payment(self, borrowing, payment_status: str) -> Payment:
+        return Payment.objects.create(
+            status=payment_status,
+            type="Payment",
+            borrowing=borrowing,
+            session_id=f"cs_{borrowing.id}",
+            money_to_pay=decimal.Decimal(25),
+        )
+
+    def test_archive_moves_old_returned_borrowings(self):
+        old = self.create_borrowing(800)
+        paid = self.create_payment(old, "Paid")
+        older = self.create_borrowing(1200, user=self.user2)
+        unpaid = self.create_borrowing(900)
+        self.create_payment(unpaid, "Pending")
+        recent = self.create_borrowing(30)
+        active = self.create_borrowing(800, returned=False)
+
+        archived = archive_returned_borrowings(batch_size=1)
+
+        self.assertEquals(archived, 2)
+        self.assertEquals(
+            set(Borrowing.objects.values_list("id", flat=True)),
+            {unpaid.id, recent.id, active.id},
+        )
+        archived_old = ArchivedBorrowing.objects.get(id=old.id)
+        self.assertEquals(archived_old.user, self.user)
+        self.assertEquals(archived_old.payments[0]["id"], paid.id)
+        self.assertEquals(archived_old.payments[0]["status"], "Paid")
+        self.assertTrue(Payment.objects.filter(id=paid.id).exists())
+        self.assertTrue(ArchivedBorrowing.objects.filter(id=older.id).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_inherits "
+                "WHERE inhparent = 'borrowings_archivedborrowing'::regclass"
+            )
+            self.assertGreaterEqual(cursor.fetchone()[0], 2)
+
+    def test_archived_borrowing_stays_readable(self):
+        old = self.create_borrowing(800)
+        other_user = self.create_borrowing(800, user=self.user2)
+        archive_returned_borrowings()
+
+        response = self.client.get(detail_url(old.id))
+        response_other_user = self.client.get(detail_url(other_user.id))
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data["id"], old.id)
+        self.assertEquals(response.data["user"], self.user.email)
+        self.assertEquals(response.data["payments"], [])
+        self.assertEquals(response_other_user.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_payments_of_archived_borrowings_stay_readable(self):
+        old = self.create_borrowing(800)
+        paid = self.create_payment(old, "Paid")
+        other_user = self.create_borrowing(800, user=self.user2)
+        other_paid = self.create_payment(other_user, "Paid")
+        archive_returned_borrowings()
+
+        payments = self.client.get(PAYMENT_URL)
+        payment = self.client.get(reverse("payments:payment-detail", args=[paid.id]))
+        payment_other_user = self.client.get(
+            reverse("payments:payment-detail", args=[other_paid.id])
+        )
+        cancel = self.client.get(PAYMENT_CANCEL_URL, {"session_id": paid.session_id})
+
+        self.assertEquals([row["id"] for row in payments.data["results"]], [paid.id])
+        self.assertEquals(payment.status_code, status.HTTP_200_OK)
+        self.assertEquals(
+            payment.data["borrowing"], str(ArchivedBorrowing.objects.get(id=old.id))
+        )
+        self.assertEquals(payment_other_user.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEquals(cancel.status_code, status.HTTP_200_OK)
+        self.assertEquals(cancel.data["id"], paid.id)
+
+    def test_archive_list_filtered_by_borrow_date(self):
+        old = self.create_borrowing(800)
+        older = self.create_borrowing(1200)
+        archive_returned_borrowings()
+        borrowed_after = (self.today - timedelta(days=1000)).isoformat()
+
+        response = self.client.get(ARCHIVE_URL)
+        response_filtered = self.client.get(
+            ARCHIVE_URL, {"borrowed_after": borrowed_after}
+        )
+        response_invalid = self.client.get(ARCHIVE_URL, {"borrowed_after": "x"})
+
+        self.assertEquals(
+            [row["id"] for row in response.data["results"]], [older.id, old.id]
+        )
+        self.assertEquals(
+            [row["id"] for row in response_filtered.data["results"]], [old.id]
+        )
+        self.assertEquals(response_invalid.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.tests.test_book_api import sample_book
+from borrowings.models import Borrowing
+from library_service_api import events
+from payments.models import Payment
+
+EVENTS_URL = reverse("events")
+SUCCESS_URL = reverse("payments:payment-success")
+
+
+def return_url(borrowing_id):
+    return reverse("borrowings:borrowing-borrowing-return", args=[borrowing_id])
+
+
+def published_events(mock_redis) -> list[tuple[str, dict]]:
+    pipeline = mock_redis.return_value.pipeline.return_value
+    return [
+        (channel, json.loads(message))
+        for (channel, message), _ in pipeline.publish.call_args_list
+    ]
+
+
+@override_settings(QUERY_INSPECTOR="raise", EVENTS_REDIS_URL="redis://events")
+@patch("library_service_api.events.get_redis")
+class EventPublishingTests(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.borrowing = Borrowing.objects.create(
+            expected_return_date=datetime.now().date() + timedelta(days=7),
+            book=sample_book(),
+            user=self.user,
+        )
+
+    def test_return_published_on_commit(self, mock_redis):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(return_url(self.borrowing.id))
+
+        [(channel, message)] = published_events(mock_redis)
+        self.assertEquals(channel, f"events:user:{self.user.id}")
+        self.assertEquals(message["event"], "borrowing")
+        self.assertEquals(message["data"]["id"], self.borrowing.id)
+        self.assertEquals(
+            message["data"]["actual_return_date"], datetime.now().date().isoformat()
+        )
+
+    @patch("payments.views.stripe.checkout.Session.retrieve")
+    def test_paid_payment_published(self, mock_retrieve, mock_redis):
+        mock_retrieve.return_value.payment_status = "paid"
+        payment = Payment.objects.create(
+            status="Pending",
+            type="Payment",
+            borrowing=self.borrowing,
+            session_id="cs_paid",
+            money_to_pay=10,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(SUCCESS_URL + "?session_id=cs_paid")
+
+        [(channel, message)] = published_events(mock_redis)
+        self.assertEquals(channel, f"events:user:{self.user.id}")
+        self.assertEquals(message["event"], "payment")
+        self.assertEquals(message["data"]["id"], payment.id)
+        self.assertEquals(message["data"]["status"], "Paid")
+
+    def test_rolled_back_changes_not_published(self, mock_redis):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    events.publish_borrowing_events([self.borrowing])
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEquals(callbacks, [])
+        self.assertEquals(published_events(mock_redis), [])
+
+
+async def idle(broker):
+    """Stands in for the Redis subscription, events are dispatched directly"""
+
+
+@override_settings(EVENTS_REDIS_URL="redis://events")
+class EventStreamTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.token = str(AccessToken.for_user(self.user))
+        listen = patch.object(events.EventBroker, "listen", idle)
+        listen.start()
+        self.addCleanup(listen.stop)
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get(EVENTS_URL, {"token": "invalid"})
+        streaming = await self.async_client.get(EVENTS_URL, {"token": self.token})
+
+        self.assertEquals(response.status_code, 401)
+        self.assertEquals(streaming.status_code, 200)
+        self.assertEquals(streaming["Content-Type"], "text/event-stream")
+
+    @patch("library_service_api.events.EVENTS_HEARTBEAT_SECONDS", 0.01)
+    async def test_stream_events_of_the_user(self):
+        stream = events.stream_events(self.user.id, seconds=5)
+        retry = await anext(stream)
+        events.broker.dispatch(self.user.id + 1, b'{"event": "payment", "data": {}}')
+        events.broker.dispatch(
+            self.user.id, b'{"event": "payment", "data": {"status": "Paid"}}'
+        )
+        event = await anext(stream)
+        heartbeat = await anext(stream)
+        await stream.aclose()
+
+        self.assertEquals(retry, "retry: 3000\n\n")
+        self.assertEquals(event, 'event: payment\ndata: {"status": "Paid"}\n\n')
+        self.assertEquals(heartbeat, ": heartbeat\n\n")
+        self.assertEquals(dict(events.broker.queues), {})
+
+
+class EventListenerTests(TestCase):
+    @patch("library_service_api.events.asyncio.sleep", new_callable=AsyncMock)
+    @patch("library_service_api.events.aioredis.Redis.from_url")
+    async def test_listener_survives_bad_messages(self, mock_from_url, mock_sleep):
+        async def bad_channel():
+            yield {"type": "pmessage", "channel": b"events:user:x", "data": b"{}"}
+
+        async def user_event():
+            yield {"type": "pmessage", "channel": b"events:user:7", "data": b"{}"}
+            raise asyncio.CancelledError
+
+        subscriptions = iter([bad_channel, user_event])
+        client = mock_from_url.return_value
+        client.aclose = AsyncMock()
+        pubsub = client.pubsub.return_value
+        pubsub.psubscribe = AsyncMock()
+        pubsub.aclose = AsyncMock()
+        pubsub.listen.side_effect = lambda: next(subscriptions)()
+        broker = events.EventBroker()
+        broker.dispatch = MagicMock()
+
+        with self.assertLogs("library_service_api.events", "ERROR"):
+            with self.assertRaises(asyncio.CancelledError):
+                await broker.listen()
+
+        broker.dispatch.assert_called_once_with(7, b"{}")
@@ -0,0 +1,98 @@
+import decimal
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from books.tests.test_book_api import sample_book
+from borrowings.models import Borrowing, BorrowingStats
+from payments.models import Payment
+
+BORROWING_URL = reverse("borrowings:borrowing-list")
+BULK_RETURN_URL = reverse("borrowings:borrowing-bulk-return")
+STATS_URL = reverse("borrowings:borrowing-stats")
+SUCCESS_URL = reverse("payments:payment-success")
+
+
+def return_url(borrowing_id):
+    return reverse("borrowings:borrowing-borrowing-return", args=[borrowing_id])
+
+
+@override_settings(QUERY_INSPECTOR="raise")
+class BorrowingStatsApiTests(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.admin = get_user_model().objects.create_user(
+            "admin@tests.com", "unique_password", is_staff=True
+        )
+        self.book = sample_book()
+
+    def test_stats_without_history(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(STATS_URL)
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data["books_borrowed"], 0)
+        self.assertIsNone(response.data["on_time_rate"])
+
+    @patch("payments.views.stripe.checkout.Session.retrieve")
+    @patch("borrowings.serializers.create_stripe_session_and_payment")
+    def test_stats_follow_borrow_return_and_fines(self, mock_session, mock_retrieve):
+        mock_retrieve.return_value = MagicMock(payment_status="paid")
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            self.client.post(
+                BORROWING_URL,
+                {
+                    "expected_return_date": datetime.now().date() + timedelta(days=2),
+                    "book": self.book.id,
+                },
+            )
+        on_time, still_borrowed = Borrowing.objects.filter(user=self.user)
+        self.client.post(return_url(on_time.id))
+        overdue = Borrowing.objects.create(
+            expected_return_date=datetime.now().date() - timedelta(days=2),
+            book=self.book,
+            user=self.user,
+        )
+        self.client.force_authenticate(self.admin)
+        self.client.post(
+            BULK_RETURN_URL, data={"borrowings": [overdue.id]}, format="json"
+        )
+        Payment.objects.filter(borrowing=overdue).update(
+            status="Pending", session_id="cs_fine"
+        )
+        fine = Payment.objects.get(borrowing=overdue)
+        self.client.get(SUCCESS_URL + "?session_id=cs_fine")
+        self.client.get(SUCCESS_URL + "?session_id=cs_fine")
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(STATS_URL)
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(
+            response.data,
+            {
+                "books_borrowed": 2,
+                "current_loans": 0,
+                "books_returned": 2,
+                "returned_on_time": 1,
+                "on_time_rate": 0.5,
+                "fines_paid": 1,
+                "fines_paid_amount": str(fine.money_to_pay),
+            },
+        )
+        self.assertEquals(response["X-Query-Count"], "1")
+        self.assertFalse(BorrowingStats.objects.filter(user=self.admin).exists())
+        self.assertEquals(
+            BorrowingStats.objects.get(user=self.user).fines_paid_amount,
+            decimal.Decimal(fine.money_to_pay),
+        )
@@ -1,28 +1,42 @@
 import decimal
+import json
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
 
+import stripe
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
+from books.inventory import reserve_copies, reserve_copy
 from books.models import Book
 from books.tests.test_book_api import sample_book
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, BookReturnSchedule, TelegramMessage
 from borrowings.serializers import (
     BorrowingSerializer,
     BorrowingDetailSerializer,
 )
+from library_service_api.queries import QueryBudgetExceeded, QueryInspector
 from payments.models import Payment
+from payments.tasks import create_checkout_session
 
 BORROWING_URL = reverse("borrowings:borrowing-list")
+EXPORT_URL = reverse("borrowings:borrowing-export")
+CART_URL = reverse("borrowings:borrowing-cart")
+BULK_RETURN_URL = reverse("borrowings:borrowing-bulk-return")
+PAYMENT_SUCCESS_URL = reverse("payments:payment-success")
 
 
 def detail_url(borrowing_id):
     return reverse("borrowings:borrowing-detail", args=[borrowing_id])
 
 
+def checkout_url(borrowing_id):
+    return reverse("borrowings:borrowing-checkout", args=[borrowing_id])
+
+
 class UnauthenticatedBorrowingsApiTests(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -32,6 +46,7 @@ class UnauthenticatedBorrowingsApiTests(APITestCase):
         self.assertEquals(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+@override_settings(QUERY_INSPECTOR="raise")
 class AuthenticatedBorrowingApiTests(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -54,6 +69,44 @@ class AuthenticatedBorrowingApiTests(APITestCase):
             user=self.user2,
         )
 
+    def test_list_borrowings_queries_do_not_grow_with_page(self):
+        response_one = self.client.get(BORROWING_URL, {"limit": 20})
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                expected_return_date=datetime.now().date(),
+                book=sample_book(),
+                user=self.user,
+            )
+            for _ in range(20)
+        )
+        response_many = self.client.get(BORROWING_URL, {"limit": 20})
+
+        self.assertEquals(len(response_many.data["results"]), 20)
+        self.assertEquals(response_many["X-Query-Count"], response_one["X-Query-Count"])
+
+    def test_query_inspector_flags_repeated_queries(self):
+        with QueryInspector(duplicate_threshold=2) as inspector:
+            titles = [borrowing.book.title for borrowing in Borrowing.objects.all()]
+
+        duplicates = inspector.get_duplicates()
+        self.assertEquals(len(titles), 2)
+        self.assertEquals(inspector.count, 3)
+        self.assertEquals(len(duplicates), 1)
+        self.assertIn('FROM "books_book"', duplicates[0][0])
+        self.assertEquals(duplicates[0][1], 2)
+        self.assertTrue(
+            duplicates[0][2][0].startswith(
+                "borrowings/tests/test_borrowing_view_api.py:"
+            )
+        )
+
+    @patch.dict(
+        "borrowings.views.BorrowingViewSet.query_budgets", {"list": 1}, clear=False
+    )
+    def test_query_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(BORROWING_URL)
+
     def test_list_borrowings(self):
         response = self.client.get(BORROWING_URL)
         borrowings = Borrowing.objects.all()
@@ -78,8 +131,7 @@ class AuthenticatedBorrowingApiTests(APITestCase):
         self.assertEquals(response1.data, serializer.data)
         self.assertEquals(response2.status_code, status.HTTP_404_NOT_FOUND)
 
-    @patch("borrowings.serializers.send_telegram_notification")
-    def test_borrowing_create(self, mock_data):
+    def test_borrowing_create(self):
         book = self.book
         data = {
             "expected_return_date": datetime.now().date() + timedelta(days=8),
@@ -92,6 +144,269 @@ class AuthenticatedBorrowingApiTests(APITestCase):
         self.assertEquals(response.status_code, status.HTTP_201_CREATED)
         self.assertEquals(book_inventory_after_borrowing, 24)
 
+    @patch("borrowings.serializers.create_stripe_session_and_payment")
+    def test_book_availability_follows_borrowings(self, mock_session):
+        book = sample_book(inventory=1)
+        availability_url = reverse("books:book-availability", args=[book.id])
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "book": book.id,
+        }
+
+        response = self.client.post(BORROWING_URL, data=data)
+        availability = self.client.get(availability_url, data={"days": 4})
+        self.client.post(detail_url(response.data["id"]) + "return/")
+        availability_after_return = self.client.get(availability_url, data={"days": 4})
+
+        self.assertEquals(
+            [day["available"] for day in availability.data["availability"]],
+            [0, 0, 1, 1],
+        )
+        self.assertEquals(
+            [
+                day["available"]
+                for day in availability_after_return.data["availability"]
+            ],
+            [1, 1, 1, 1],
+        )
+        self.assertEquals(BookReturnSchedule.objects.get(book=book).returns, {})
+
+    @patch("borrowings.serializers.create_stripe_session_and_payment")
+    @patch("borrowings.serializers.reserve_copy")
+    def test_borrowing_create_last_copy_taken_concurrently(
+        self, mock_reserve, mock_session
+    ):
+        book = sample_book(inventory=1)
+        mock_reserve.side_effect = lambda book_id: Book.objects.filter(
+            id=book.id
+        ).update(inventory=0) and reserve_copy(book_id)
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "book": book.id,
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(BORROWING_URL, data=data)
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(
+            str(response.data["book_inventory"]),
+            f"{book.title} out of stock at this moment",
+        )
+        self.assertFalse(Borrowing.objects.filter(book=book).exists())
+        self.assertFalse(BookReturnSchedule.objects.filter(book=book).exists())
+        self.assertFalse(TelegramMessage.objects.exists())
+        mock_session.assert_not_called()
+
+    @patch("borrowings.serializers.create_stripe_session_and_payment")
+    def test_borrowing_create_and_return_update_inventory(self, mock_session):
+        book = sample_book(inventory=2)
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "book": book.id,
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(BORROWING_URL, data=data)
+        inventory_after_borrowing = Book.objects.get(id=book.id).inventory
+        self.client.post(detail_url(response.data["id"]) + "return/")
+        inventory_after_return = Book.objects.get(id=book.id).inventory
+
+        self.assertEquals(response.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(inventory_after_borrowing, 1)
+        self.assertEquals(inventory_after_return, 2)
+        self.assertEquals(
+            TelegramMessage.objects.get().text[:22], "New borrowing created:"
+        )
+
+    @override_settings(STRIPE_ASYNC_CHECKOUT=True)
+    @patch("payments.tasks.create_stripe_session")
+    @patch("payments.checkout.create_checkout_session.delay")
+    def test_borrowing_create_async_checkout(self, mock_delay, mock_session):
+        mock_session.return_value = MagicMock(id="cs_test", url="https://stripe.test")
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "book": self.book.id,
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(BORROWING_URL, data=data)
+        payment = Payment.objects.get(borrowing_id=response.data["id"])
+        checkout_before = self.client.get(response.data["checkout"])
+        create_checkout_session([payment.id], *mock_delay.call_args.args[1:])
+        checkout_after = self.client.get(response.data["checkout"])
+
+        self.assertEquals(response.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(payment.money_to_pay, self.book.daily_fee * 2)
+        mock_delay.assert_called_once()
+        self.assertEquals(checkout_before.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEquals(checkout_before.data["status"], "Creating")
+        self.assertEquals(checkout_after.status_code, status.HTTP_200_OK)
+        self.assertEquals(checkout_after.data["status"], "Pending")
+        self.assertEquals(checkout_after.data["session_url"], "https://stripe.test")
+        self.assertEquals(
+            mock_session.call_args.kwargs["idempotency_key"],
+            f"checkout-payment-{payment.id}",
+        )
+
+    def test_checkout_of_another_user_not_found(self):
+        Payment.objects.create(
+            status="Pending",
+            type="Payment",
+            borrowing=self.borrowing2,
+            session_url="https://checkout.stripe.com/c/pay/cs_test1",
+            session_id="cs_test1",
+            money_to_pay=decimal.Decimal(16),
+        )
+
+        response = self.client.get(checkout_url(self.borrowing2.id))
+
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("session_url", response.data)
+
+    @override_settings(STRIPE_ASYNC_CHECKOUT=True)
+    @patch("payments.checkout.create_checkout_session.delay")
+    def test_borrowing_refused_while_checkout_is_created(self, mock_delay):
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "book": self.book.id,
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(BORROWING_URL, data=data)
+        second = self.client.post(BORROWING_URL, data=data)
+
+        self.assertEquals(first.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(
+            Payment.objects.get(borrowing_id=first.data["id"]).status, "Creating"
+        )
+        self.assertEquals(second.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("payments.tasks.create_stripe_session")
+    def test_async_checkout_session_failure_expires_payment(self, mock_session):
+        mock_session.side_effect = stripe.error.InvalidRequestError("invalid", None)
+        payment = Payment.objects.create(
+            status="Creating",
+            type="Payment",
+            borrowing=self.borrowing,
+            money_to_pay=decimal.Decimal(25),
+        )
+
+        create_checkout_session([payment.id], "http://success", "http://cancel")
+        payment.refresh_from_db()
+
+        self.assertEquals(payment.status, "Expired")
+
+    @patch("payments.views.stripe.checkout.Session.retrieve")
+    @patch("payments.stripe_session.create_stripe_session")
+    def test_cart_checkout_with_single_session(self, mock_session, mock_retrieve):
+        mock_session.return_value = MagicMock(id="cs_cart", url="https://stripe.test")
+        mock_retrieve.return_value = MagicMock(payment_status="paid")
+        first_book = sample_book(inventory=2)
+        second_book = sample_book(inventory=3, daily_fee=decimal.Decimal(10))
+        expected_return_date = datetime.now().date() + timedelta(days=2)
+        data = {
+            "expected_return_date": expected_return_date,
+            "books": [first_book.id, second_book.id, second_book.id],
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(CART_URL, data=data, format="json")
+        payments = Payment.objects.filter(session_id="cs_cart")
+        success = self.client.get(PAYMENT_SUCCESS_URL + "?session_id=cs_cart")
+
+        self.assertEquals(response.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(len(response.data["borrowings"]), 3)
+        mock_session.assert_called_once()
+        self.assertEquals(
+            [amount for amount, _ in mock_session.call_args.args[0]],
+            [5000, 2000, 2000],
+        )
+        self.assertEquals(payments.count(), 3)
+        self.assertEquals(Book.objects.get(id=first_book.id).inventory, 1)
+        self.assertEquals(Book.objects.get(id=second_book.id).inventory, 1)
+        self.assertEquals(
+            BookReturnSchedule.objects.get(book=second_book).returns,
+            {expected_return_date.isoformat(): 2},
+        )
+        self.assertEquals(
+            TelegramMessage.objects.get(
+                text__startswith="New borrowings created:"
+            ).text.count("User id:"),
+            3,
+        )
+        self.assertEquals(success.status_code, status.HTTP_200_OK)
+        self.assertEquals(len(success.data), 3)
+        self.assertFalse(payments.exclude(status="Paid").exists())
+
+    @patch("payments.stripe_session.create_stripe_session")
+    def test_cart_checkout_out_of_stock(self, mock_session):
+        book = sample_book(inventory=1)
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "books": [self.book.id, book.id, book.id],
+        }
+
+        response = self.client.post(CART_URL, data=data, format="json")
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(
+            str(response.data["books"]["book_inventory"]),
+            f"{book.title} out of stock at this moment",
+        )
+        mock_session.assert_not_called()
+        self.assertFalse(Borrowing.objects.filter(book=book).exists())
+
+    @patch("payments.stripe_session.create_stripe_session")
+    @patch("borrowings.serializers.reserve_copies")
+    def test_cart_checkout_copy_taken_concurrently(self, mock_reserve, mock_session):
+        book = sample_book(inventory=1)
+        mock_reserve.side_effect = lambda counts: Book.objects.filter(
+            id=book.id
+        ).update(inventory=0) and reserve_copies(counts)
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "books": [self.book.id, book.id],
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(CART_URL, data=data, format="json")
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(
+            str(response.data["book_inventory"]),
+            f"{book.title} out of stock at this moment",
+        )
+        self.assertEquals(Book.objects.get(id=self.book.id).inventory, 25)
+        self.assertEquals(Borrowing.objects.count(), 2)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(TelegramMessage.objects.exists())
+        mock_session.assert_not_called()
+
+    @override_settings(STRIPE_ASYNC_CHECKOUT=True)
+    @patch("payments.tasks.create_stripe_session")
+    @patch("payments.checkout.create_checkout_session.delay")
+    def test_cart_async_checkout(self, mock_delay, mock_session):
+        mock_session.return_value = MagicMock(id="cs_cart", url="https://stripe.test")
+        book = sample_book()
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "books": [self.book.id, book.id],
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(CART_URL, data=data, format="json")
+        create_checkout_session(*mock_delay.call_args.args)
+        checkout = self.client.get(response.data["checkout"])
+
+        self.assertEquals(response.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(len(mock_delay.call_args.args[0]), 2)
+        mock_session.assert_called_once()
+        self.assertEquals(checkout.data["session_url"], "https://stripe.test")
+        self.assertEquals(
+            Payment.objects.filter(session_id="cs_cart", status="Pending").count(), 2
+        )
+
     def test_borrowing_create_not_allowed_if_previous_not_payed(self):
         Payment.objects.create(
             status="Pending",
@@ -114,6 +429,13 @@ class AuthenticatedBorrowingApiTests(APITestCase):
             "You have one or more pending payments. You can't make borrowings until you pay for them.",
         )
 
+    def test_bulk_return_staff_only(self):
+        response = self.client.post(
+            BULK_RETURN_URL, data={"borrowings": [self.borrowing.id]}, format="json"
+        )
+
+        self.assertEquals(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_borrowing_return(self):
         borrowing = self.borrowing
 
@@ -165,6 +487,53 @@ class AuthenticatedBorrowingApiTests(APITestCase):
         self.assertEquals(response.data["status"], "Session url has been updated")
         self.assertEquals(response2.data["status"], "Session url is still active")
 
+    def test_list_borrowings_conditional_get(self):
+        response = self.client.get(BORROWING_URL)
+        etag = response["ETag"]
+
+        response_not_modified = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+        self.client.post(detail_url(self.borrowing.id) + "return/")
+        response_modified = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertIn("private", response["Cache-Control"])
+        self.assertEquals(
+            response_not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEquals(response_modified.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_borrowing_conditional_get(self):
+        url = detail_url(self.borrowing.id)
+        response = self.client.get(url)
+
+        response_not_modified = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        Payment.objects.create(
+            status="Paid",
+            type="Payment",
+            borrowing=self.borrowing,
+            money_to_pay=decimal.Decimal(25),
+        )
+        response_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEquals(
+            response_not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+        self.assertEquals(response_modified.status_code, status.HTTP_200_OK)
+        self.assertEquals(len(response_modified.data["payments"]), 1)
+
+    def test_retrieve_borrowing_etag_follows_book(self):
+        url = detail_url(self.borrowing.id)
+        response = self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = "new_title"
+            self.book.save()
+        response_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEquals(response_modified.status_code, status.HTTP_200_OK)
+        self.assertIn("new_title", response_modified.data["book"])
+
     def test_filter_borrowings_is_active_true_or_false(self):
         borrowing1 = Borrowing.objects.create(
             expected_return_date=datetime.now().date() + timedelta(days=10),
@@ -202,7 +571,38 @@ class AuthenticatedBorrowingApiTests(APITestCase):
         self.assertIn(serializer3.data, response2.data["results"])
         self.assertIn(serializer2.data, response2.data["results"])
 
+    def test_filter_borrowings_overdue(self):
+        overdue = Borrowing.objects.create(
+            expected_return_date=datetime.now().date() - timedelta(days=1),
+            book=self.book,
+            user=self.user,
+        )
+        Borrowing.objects.create(
+            expected_return_date=datetime.now().date() - timedelta(days=1),
+            actual_return_date=datetime.now().date(),
+            book=self.book,
+            user=self.user,
+        )
+        Borrowing.objects.create(
+            expected_return_date=datetime.now().date() - timedelta(days=1),
+            book=self.book,
+            user=self.user2,
+        )
+
+        response = self.client.get(BORROWING_URL, data={"overdue": "True"})
+        response_not_overdue = self.client.get(BORROWING_URL, data={"overdue": "False"})
+
+        self.assertEquals(
+            [borrowing["id"] for borrowing in response.data["results"]], [overdue.id]
+        )
+        self.assertEquals(response_not_overdue.data["count"], 2)
+        self.assertNotIn(
+            overdue.id,
+            [borrowing["id"] for borrowing in response_not_overdue.data["results"]],
+        )
+
 
+@override_settings(QUERY_INSPECTOR="raise")
 class AdminBorrowingApiTests(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -218,6 +618,18 @@ class AdminBorrowingApiTests(APITestCase):
         self.book = sample_book()
         self.client.force_authenticate(self.user)
 
+    def test_keyset_list_validated_without_count(self):
+        response = self.client.get(BORROWING_URL, {"cursor": ""})
+
+        response_not_modified = self.client.get(
+            BORROWING_URL, {"cursor": ""}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+        self.assertEquals(response["X-Query-Count"], "1")
+        self.assertEquals(
+            response_not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
     def test_list_all_borrowings(self):
         borrowing1 = Borrowing.objects.create(
             expected_return_date=datetime.now().date() + timedelta(days=10),
@@ -324,3 +736,95 @@ class AdminBorrowingApiTests(APITestCase):
         self.assertEquals(
             response2.data["results"], serializer_active_false_borrowings.data
         )
+
+    def test_export_borrowings_ndjson(self):
+        borrowing1 = Borrowing.objects.create(
+            expected_return_date=datetime.now().date() + timedelta(days=9),
+            book=self.book,
+            user=self.user2,
+        )
+        borrowing2 = Borrowing.objects.create(
+            expected_return_date=datetime.now().date() + timedelta(days=10),
+            book=self.book,
+            user=self.user3,
+        )
+
+        response = self.client.get(EXPORT_URL, data={"user": f"{self.user3.id}"})
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response["Content-Type"], "application/x-ndjson")
+        self.assertEquals(
+            rows,
+            [
+                {
+                    "id": borrowing2.id,
+                    "borrow_date": str(borrowing2.borrow_date),
+                    "expected_return_date": str(borrowing2.expected_return_date),
+                    "actual_return_date": None,
+                    "book_id": self.book.id,
+                    "user_id": self.user3.id,
+                }
+            ],
+        )
+
+    @patch("payments.checkout.create_checkout_session.delay")
+    def test_bulk_return(self, mock_delay):
+        today = datetime.now().date()
+        other_book = sample_book(inventory=5)
+        on_time, overdue, other = Borrowing.objects.bulk_create(
+            [
+                Borrowing(
+                    expected_return_date=today + timedelta(days=3),
+                    book=self.book,
+                    user=self.user2,
+                ),
+                Borrowing(
+                    expected_return_date=today - timedelta(days=2),
+                    book=self.book,
+                    user=self.user3,
+                ),
+                Borrowing(
+                    expected_return_date=today + timedelta(days=3),
+                    book=other_book,
+                    user=self.user3,
+                    actual_return_date=today,
+                ),
+            ]
+        )
+        ids = [on_time.id, overdue.id, other.id, other.id + 1000]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(13):
+                response = self.client.post(
+                    BULK_RETURN_URL, data={"borrowings": ids}, format="json"
+                )
+        fine = Payment.objects.get(borrowing=overdue)
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(
+            [result["status"] for result in response.data["results"]],
+            ["returned", "returned", "already_returned", "not_found"],
+        )
+        self.assertNotIn("fine", response.data["results"][0])
+        self.assertEquals(response.data["results"][1]["fine"]["payment"], fine.id)
+        self.assertEquals((fine.type, fine.status), ("Fine", "Creating"))
+        self.assertEquals(fine.money_to_pay, self.book.daily_fee * 2 * 2)
+        self.assertEquals(mock_delay.call_args.args[0], [fine.id])
+        self.assertEquals(Book.objects.get(id=self.book.id).inventory, 27)
+        self.assertEquals(Book.objects.get(id=other_book.id).inventory, 5)
+        self.assertFalse(
+            Borrowing.objects.filter(
+                id__in=ids, actual_return_date__isnull=True
+            ).exists()
+        )
+
+    def test_bulk_return_rejects_duplicates(self):
+        response = self.client.post(
+            BULK_RETURN_URL, data={"borrowings": [1, 1]}, format="json"
+        )
+
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from books.tests.test_book_api import sample_book
+from borrowings.models import Borrowing, TaskWatermark, TelegramMessage
+from borrowings.overdue import OVERDUE_SCAN_WATERMARK, plan_overdue_chunks
+from borrowings.tasks import (
+    daily_borrowings_overdue_notification,
+    scan_borrowings_overdue,
+)
+from borrowings.utils import (
+    OVERDUE_DIGEST_HEADER,
+    build_overdue_digest,
+    check_borrowings_overdue,
+    get_borrowing_info,
+)
+from library_service_api.celery import app
+
+
+class OverdueDigestTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.book = sample_book()
+
+    def create_overdue_borrowings(self, count: int) -> None:
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                expected_return_date=datetime.now().date() - timedelta(days=1),
+                book=self.book,
+                user=self.user,
+            )
+            for _ in range(count)
+        )
+
+    def test_digest_packs_borrowings_under_limit(self):
+        self.create_overdue_borrowings(100)
+        info = get_borrowing_info(Borrowing.objects.first())
+
+        with self.assertNumQueries(1):
+            messages = build_overdue_digest(check_borrowings_overdue(), limit=1000)
+
+        per_message = (1000 - len(OVERDUE_DIGEST_HEADER)) // (len(info) + 2)
+        self.assertEquals(len(messages), -(-100 // per_message))
+        self.assertTrue(all(len(message) <= 1000 for message in messages))
+        self.assertTrue(all(m.startswith(OVERDUE_DIGEST_HEADER) for m in messages))
+        self.assertEquals(sum(message.count("User id:") for message in messages), 100)
+
+    def test_daily_notification_queues_digest(self):
+        self.create_overdue_borrowings(300)
+
+        daily_borrowings_overdue_notification()
+
+        messages = list(TelegramMessage.objects.values_list("text", flat=True))
+        self.assertLess(len(messages), 300 // 10)
+        self.assertTrue(all(len(message) <= 4096 for message in messages))
+        self.assertEquals(sum(message.count("User id:") for message in messages), 300)
+
+    def test_daily_notification_without_overdue(self):
+        daily_borrowings_overdue_notification()
+
+        self.assertEquals(
+            TelegramMessage.objects.get().text, "No borrowings overdue today!"
+        )
+
+
+class OverdueScanPipelineTests(TestCase):
+    def setUp(self) -> None:
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, "task_always_eager", False)
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.book = sample_book()
+
+    def create_borrowings(self, count: int, days_overdue: int = 1) -> None:
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                expected_return_date=datetime.now().date()
+                - timedelta(days=days_overdue),
+                book=self.book,
+                user=self.user,
+            )
+            for _ in range(count)
+        )
+
+    def test_plan_overdue_chunks(self):
+        self.create_borrowings(4, days_overdue=1)
+        self.create_borrowings(3, days_overdue=2)
+        self.create_borrowings(2, days_overdue=-5)
+        keys = [
+            (expected_return_date.isoformat(), borrowing_id)
+            for expected_return_date, borrowing_id in check_borrowings_overdue()
+            .order_by("expected_return_date", "id")
+            .values_list("expected_return_date", "id")
+        ]
+        after_id = min(key[1] for key in keys)
+
+        chunks, last_id = plan_overdue_chunks(
+            datetime.now().date(), after_id, chunk_size=3
+        )
+
+        keys = [key for key in keys if key[1] > after_id]
+        self.assertEquals(chunks, [(keys[0], keys[2]), (keys[3], keys[5])])
+        self.assertEquals(last_id, max(key[1] for key in keys))
+
+    def test_scan_notifies_every_overdue_borrowing_once_per_day(self):
+        self.create_borrowings(25)
+
+        scan_borrowings_overdue(chunk_size=10)
+        first_run = TelegramMessage.objects.count()
+        scan_borrowings_overdue(chunk_size=10)
+        self.create_borrowings(3)
+        scan_borrowings_overdue(chunk_size=10)
+
+        texts = list(TelegramMessage.objects.values_list("text", flat=True))
+        self.assertEquals(first_run, 3)
+        self.assertEquals(sum(text.count("User id:") for text in texts), 28)
+        self.assertEquals(
+            TaskWatermark.objects.get(name=OVERDUE_SCAN_WATERMARK).value,
+            {
+                "date": datetime.now().date().isoformat(),
+                "last_id": Borrowing.objects.order_by("id").last().id,
+            },
+        )
+
+    def test_scan_restarts_on_a_new_day(self):
+        self.create_borrowings(5)
+        TaskWatermark.objects.create(
+            name=OVERDUE_SCAN_WATERMARK,
+            value={
+                "date": (datetime.now().date() - timedelta(days=1)).isoformat(),
+                "last_id": Borrowing.objects.order_by("id").last().id,
+            },
+        )
+
+        scan_borrowings_overdue()
+
+        self.assertEquals(TelegramMessage.objects.get().text.count("User id:"), 5)
+
+    def test_scan_without_overdue(self):
+        scan_borrowings_overdue()
+        scan_borrowings_overdue()
+
+        self.assertEquals(
+            TelegramMessage.objects.get().text, "No borrowings overdue today!"
+        )
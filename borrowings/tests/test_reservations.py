@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from books.models import Book
+from books.tests.test_book_api import sample_book
+from borrowings.availability import record_expected_return
+from borrowings.models import Borrowing, Reservation, TelegramMessage
+from borrowings.reservations import expire_allocations
+
+RESERVATION_URL = reverse("borrowings:reservation-list")
+BORROWING_URL = reverse("borrowings:borrowing-list")
+CART_URL = reverse("borrowings:borrowing-cart")
+
+
+def reservation_detail_url(reservation_id):
+    return reverse("borrowings:reservation-detail", args=[reservation_id])
+
+
+def return_url(borrowing_id):
+    return reverse("borrowings:borrowing-borrowing-return", args=[borrowing_id])
+
+
+@override_settings(QUERY_INSPECTOR="raise")
+class ReservationApiTests(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "testunique@tests.com", "unique_password"
+        )
+        self.user2 = get_user_model().objects.create_user(
+            "testunique1@tests.com", "unique_password"
+        )
+        self.user3 = get_user_model().objects.create_user(
+            "testunique3@tests.com", "unique_password"
+        )
+        self.book = sample_book(inventory=0)
+        self.borrowing = Borrowing.objects.create(
+            expected_return_date=datetime.now().date() + timedelta(days=7),
+            book=self.book,
+            user=self.user3,
+        )
+
+    def reserve(self, user, book=None):
+        self.client.force_authenticate(user)
+        return self.client.post(RESERVATION_URL, {"book": (book or self.book).id})
+
+    def test_reservation_queue_positions(self):
+        first = self.reserve(self.user)
+        second = self.reserve(self.user2)
+        duplicate = self.reserve(self.user2)
+        in_stock = self.reserve(self.user2, sample_book())
+        reservations = self.client.get(RESERVATION_URL)
+
+        self.assertEquals(first.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(first.data["position"], 1)
+        self.assertEquals(second.data["position"], 2)
+        self.assertEquals(duplicate.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(in_stock.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(
+            [row["position"] for row in reservations.data["results"]], [2]
+        )
+
+    @patch("borrowings.serializers.create_stripe_session_and_payment")
+    def test_return_allocates_copy_to_queue_head(self, mock_session):
+        first = self.reserve(self.user).data["id"]
+        second = self.reserve(self.user2).data["id"]
+
+        self.client.force_authenticate(self.user3)
+        self.client.post(return_url(self.borrowing.id))
+        allocated = Reservation.objects.get(id=first)
+        inventory_after_return = Book.objects.get(id=self.book.id).inventory
+        self.client.force_authenticate(self.user2)
+        borrowing_without_copy = self.client.post(
+            BORROWING_URL,
+            {
+                "expected_return_date": datetime.now().date() + timedelta(days=2),
+                "book": self.book.id,
+            },
+        )
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            borrowing = self.client.post(
+                BORROWING_URL,
+                {
+                    "expected_return_date": datetime.now().date() + timedelta(days=2),
+                    "book": self.book.id,
+                },
+            )
+
+        self.assertEquals(allocated.status, "Allocated")
+        self.assertGreater(allocated.expires_at, timezone.now())
+        self.assertEquals(Reservation.objects.get(id=second).status, "Waiting")
+        self.assertEquals(inventory_after_return, 0)
+        self.assertTrue(
+            TelegramMessage.objects.filter(
+                text__startswith="Reserved book is waiting for you:"
+            ).exists()
+        )
+        self.assertEquals(
+            borrowing_without_copy.status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEquals(borrowing.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(Reservation.objects.get(id=first).status, "Fulfilled")
+        self.assertEquals(Book.objects.get(id=self.book.id).inventory, 0)
+
+    @patch("borrowings.serializers.create_cart_session_and_payments")
+    def test_cart_takes_copy_allocated_from_queue(self, mock_session):
+        first = self.reserve(self.user).data["id"]
+        second = self.reserve(self.user2).data["id"]
+        self.client.force_authenticate(self.user3)
+        self.client.post(return_url(self.borrowing.id))
+        in_stock = sample_book(inventory=1)
+        data = {
+            "expected_return_date": datetime.now().date() + timedelta(days=2),
+            "books": [self.book.id, in_stock.id],
+        }
+
+        self.client.force_authenticate(self.user2)
+        cart_without_copy = self.client.post(CART_URL, data, format="json")
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            cart = self.client.post(CART_URL, data, format="json")
+
+        self.assertEquals(cart_without_copy.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(cart.status_code, status.HTTP_201_CREATED)
+        self.assertEquals(Reservation.objects.get(id=first).status, "Fulfilled")
+        self.assertEquals(Reservation.objects.get(id=second).status, "Waiting")
+        self.assertEquals(Book.objects.get(id=self.book.id).inventory, 0)
+        self.assertEquals(Book.objects.get(id=in_stock.id).inventory, 0)
+
+    def test_availability_leaves_returns_to_the_queue(self):
+        due = datetime.now().date() + timedelta(days=1)
+        record_expected_return(self.book.id, due, 2)
+        self.reserve(self.user)
+        url = reverse("books:book-availability", args=[self.book.id])
+
+        response = self.client.get(url, {"days": 3})
+
+        self.assertEquals(
+            [day["available"] for day in response.data["availability"]], [0, 1, 1]
+        )
+
+    def test_cancelled_allocation_goes_to_next_in_queue(self):
+        first = self.reserve(self.user).data["id"]
+        second = self.reserve(self.user2).data["id"]
+        self.client.force_authenticate(self.user3)
+        self.client.post(return_url(self.borrowing.id))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.delete(reservation_detail_url(first))
+
+        self.assertEquals(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEquals(Reservation.objects.get(id=first).status, "Cancelled")
+        self.assertEquals(Reservation.objects.get(id=second).status, "Allocated")
+        self.assertEquals(Book.objects.get(id=self.book.id).inventory, 0)
+
+    def test_expired_allocation_returns_copy_to_shelf(self):
+        first = self.reserve(self.user).data["id"]
+        self.client.force_authenticate(self.user3)
+        self.client.post(return_url(self.borrowing.id))
+        Reservation.objects.filter(id=first).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        expired = expire_allocations()
+
+        self.assertEquals(expired, 1)
+        self.assertEquals(Reservation.objects.get(id=first).status, "Expired")
+        self.assertEquals(Book.objects.get(id=self.book.id).inventory, 1)
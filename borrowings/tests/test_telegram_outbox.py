@@ -0,0 +1,102 @@
+from unittest.mock import MagicMock, patch
+
+import requests
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from borrowings.models import TelegramMessage
+from borrowings.notifications import queue_telegram_notification
+from borrowings.outbox import (
+    DISPATCH_LOCK_KEY,
+    OUTBOX_MAX_ATTEMPTS,
+    TELEGRAM_SEND_INTERVAL,
+    dispatch_outbox,
+)
+
+
+def telegram_response(status_code=200, body=None):
+    return MagicMock(
+        ok=status_code == 200,
+        status_code=status_code,
+        text="error",
+        json=MagicMock(return_value=body or {}),
+    )
+
+
+@patch("borrowings.outbox.send_telegram_notification")
+class TelegramOutboxTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.sleep = MagicMock()
+
+    def test_dispatch_sends_due_messages_in_order(self, mock_send):
+        mock_send.return_value = telegram_response()
+        for text in ("first", "second", "third"):
+            queue_telegram_notification(text)
+
+        sent = dispatch_outbox(sleep=self.sleep)
+
+        self.assertEquals(sent, 3)
+        self.assertEquals(
+            [call.args[0] for call in mock_send.call_args_list],
+            ["first", "second", "third"],
+        )
+        self.assertFalse(TelegramMessage.objects.filter(sent_at__isnull=True).exists())
+        self.assertLessEqual(self.sleep.call_args.args[0], TELEGRAM_SEND_INTERVAL)
+
+    def test_dispatch_backs_off_failed_messages(self, mock_send):
+        mock_send.side_effect = [requests.ConnectionError("down"), telegram_response()]
+        failed = queue_telegram_notification("failed")
+        queue_telegram_notification("sent")
+
+        sent = dispatch_outbox(sleep=self.sleep)
+        failed.refresh_from_db()
+
+        self.assertEquals(sent, 1)
+        self.assertIsNone(failed.sent_at)
+        self.assertEquals(failed.attempts, 1)
+        self.assertEquals(failed.last_error, "down")
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+
+    def test_dispatch_respects_rate_limit(self, mock_send):
+        mock_send.return_value = telegram_response(
+            429, {"parameters": {"retry_after": 30}}
+        )
+        first = queue_telegram_notification("first")
+        second = queue_telegram_notification("second")
+
+        sent = dispatch_outbox(sleep=self.sleep)
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        self.assertEquals(sent, 0)
+        mock_send.assert_called_once()
+        self.assertGreater(
+            second.next_attempt_at, timezone.now() + timezone.timedelta(seconds=25)
+        )
+        self.assertGreater(
+            first.next_attempt_at, timezone.now() + timezone.timedelta(seconds=25)
+        )
+
+    def test_dispatch_gives_up_after_max_attempts(self, mock_send):
+        mock_send.return_value = telegram_response(400)
+        message = queue_telegram_notification("bad")
+        TelegramMessage.objects.filter(id=message.id).update(
+            attempts=OUTBOX_MAX_ATTEMPTS - 1
+        )
+
+        dispatch_outbox(sleep=self.sleep)
+        message.refresh_from_db()
+
+        self.assertIsNone(message.next_attempt_at)
+        self.assertEquals(message.last_error, "400: error")
+
+    def test_single_dispatcher_at_a_time(self, mock_send):
+        queue_telegram_notification("message")
+        cache.add(DISPATCH_LOCK_KEY, 1)
+
+        sent = dispatch_outbox(sleep=self.sleep)
+
+        self.assertEquals(sent, 0)
+        mock_send.assert_not_called()
@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework import routers
-from borrowings.views import BorrowingViewSet
+from borrowings.views import BorrowingViewSet, ReservationViewSet
 
 router = routers.DefaultRouter()
+router.register("reservations", ReservationViewSet)
 router.register("", BorrowingViewSet)
 
 urlpatterns = router.urls
@@ -1,9 +1,16 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from django.db.models import QuerySet
 
 from borrowings.models import Borrowing
-from borrowings.notifications import send_telegram_notification
+from borrowings.notifications import (
+    queue_telegram_notifications,
+    send_telegram_notification,
+)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+OVERDUE_DIGEST_HEADER = "Borrowings overdue:"
+NO_OVERDUE_MESSAGE = "No borrowings overdue today!"
 
 
 def get_borrowing_info(borrowing: Borrowing) -> str:
@@ -17,19 +24,47 @@ def get_borrowing_info(borrowing: Borrowing) -> str:
     )
 
 
-def check_borrowings_overdue() -> QuerySet:
+def check_borrowings_overdue(today: date = None) -> QuerySet:
+    today = today or datetime.now().date()
     queryset = Borrowing.objects.select_related("user", "book").filter(
         actual_return_date__isnull=True,
-        expected_return_date__lte=datetime.now().date() + timedelta(days=1),
+        expected_return_date__lte=today + timedelta(days=1),
     )
     return queryset
 
 
 def borrowing_overdue_send_message(queryset: QuerySet):
     if not queryset:
-        return send_telegram_notification("No borrowings overdue today!")
+        return send_telegram_notification(NO_OVERDUE_MESSAGE)
 
     for borrowing in queryset:
         send_telegram_notification(
             "Borrowing overdue:\n" + get_borrowing_info(borrowing)
         )
+
+
+def build_overdue_digest(
+    queryset: QuerySet, limit: int = TELEGRAM_MESSAGE_LIMIT
+) -> list[str]:
+    """Packs overdue borrowings into as few messages under the limit as possible.
+
+    The queryset is read once, in chunks, and every message starts with
+    the digest header.
+    """
+    messages = []
+    message = OVERDUE_DIGEST_HEADER
+    for borrowing in queryset.iterator(chunk_size=2000):
+        info = get_borrowing_info(borrowing)
+        if len(message) + 2 + len(info) > limit and message != OVERDUE_DIGEST_HEADER:
+            messages.append(message)
+            message = OVERDUE_DIGEST_HEADER
+        message = f"{message}\n\n{info}"[:limit]
+    if message != OVERDUE_DIGEST_HEADER:
+        messages.append(message)
+    return messages
+
+
+def borrowing_overdue_send_digest(queryset: QuerySet) -> None:
+    """Queues the overdue digest in the Telegram outbox with one INSERT"""
+    messages = build_overdue_digest(queryset) or [NO_OVERDUE_MESSAGE]
+    queue_telegram_notifications(messages)
@@ -1,26 +1,50 @@
+import json
 from datetime import datetime
 
 import rest_framework_simplejwt.authentication
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
+from django.db.models import Q
+from django.http import Http404
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import mixins, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.serializers import DateField
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 
-from borrowings.models import Borrowing
+from books.cache import get_catalog_last_modified, get_catalog_version
+from borrowings.models import (
+    ArchivedBorrowing,
+    Borrowing,
+    BorrowingStats,
+    Reservation,
+)
+from borrowings.reservations import annotate_queue_position, cancel_reservation
+from borrowings.returns import return_borrowings
 from borrowings.serializers import (
+    ArchivedBorrowingSerializer,
+    BorrowingBulkReturnSerializer,
+    BorrowingCartSerializer,
     BorrowingCreateSerializer,
     BorrowingDetailSerializer,
     BorrowingReturnSerializer,
     BorrowingSerializer,
+    BorrowingStatsSerializer,
+    ReservationSerializer,
 )
+from library_service_api.conditional import ConditionalGetMixin, make_etag
+from library_service_api.export import ExportMixin
 from payments.models import Payment
 from payments.stripe_session import create_stripe_session_and_payment
 
 
 class BorrowingViewSet(
+    ConditionalGetMixin,
+    ExportMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -29,6 +53,27 @@ class BorrowingViewSet(
     queryset = Borrowing.objects.all().select_related("book", "user")
     serializer_class = BorrowingSerializer
     permission_classes = (IsAuthenticated,)
+    export_fields = (
+        "id",
+        "borrow_date",
+        "expected_return_date",
+        "actual_return_date",
+        "book_id",
+        "user_id",
+    )
+    query_budgets = {
+        "list": 2,
+        "retrieve": 2,
+        "create": 13,
+        "cart": 14,
+        "export": 1,
+        "borrowing_return": 13,
+        "bulk_return": 13,
+        "update_expired_borrowing_session_url_and_sesion_id": 5,
+        "checkout": 2,
+        "archive": 2,
+        "stats": 1,
+    }
     authentication_classes = (
         rest_framework_simplejwt.authentication.JWTAuthentication,
     )
@@ -36,6 +81,12 @@ class BorrowingViewSet(
     def get_serializer_class(self):
         if self.action == "create":
             return BorrowingCreateSerializer
+        if self.action == "cart":
+            return BorrowingCartSerializer
+        if self.action == "bulk_return":
+            return BorrowingBulkReturnSerializer
+        if self.action == "archive":
+            return ArchivedBorrowingSerializer
         if self.action == "retrieve":
             return BorrowingDetailSerializer
         return BorrowingSerializer
@@ -60,7 +111,10 @@ class BorrowingViewSet(
 
     def get_queryset(self):
         queryset = self.queryset
-        if self.action in ("list", "retrieve") and not self.request.user.is_staff:
+        if (
+            self.action in ("list", "retrieve", "checkout")
+            and not self.request.user.is_staff
+        ):
             queryset = queryset.filter(user=self.request.user)
 
         """Filtering by user and is active borrowing"""
@@ -85,11 +139,31 @@ class BorrowingViewSet(
                 queryset = queryset.filter(
                     actual_return_date__isnull=False, user=self.request.user
                 )
+
+        """Filtering by overdue borrowing (active and past the expected date)"""
+        overdue = self.request.query_params.get("overdue")
+        if overdue:
+            overdue_filter = Q(
+                actual_return_date__isnull=True,
+                expected_return_date__lt=datetime.now().date(),
+            )
+            if self._params_to_bool(overdue):
+                queryset = queryset.filter(overdue_filter)
+            else:
+                queryset = queryset.exclude(overdue_filter)
         return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(methods=["POST"], detail=False, url_path="cart")
+    def cart(self, request):
+        """Endpoint for borrowing several books with a single Stripe payment"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @transaction.atomic
     @action(
         methods=["POST"],
@@ -113,6 +187,19 @@ class BorrowingViewSet(
         serializer_update.save()
         return Response({"status": "borrowing returned"})
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="bulk_return",
+        permission_classes=[IsAdminUser],
+    )
+    def bulk_return(self, request):
+        """Endpoint for returning many borrowings at the circulation desk"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = return_borrowings(serializer.validated_data["borrowings"], request)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
     @transaction.atomic
     @action(
         methods=["POST"],
@@ -135,6 +222,30 @@ class BorrowingViewSet(
 
         return Response({"status": "Session url is still active"})
 
+    @action(methods=["GET"], detail=True, url_path="checkout")
+    def checkout(self, request, pk=None):
+        """Endpoint for polling the Stripe session of the borrowing payment"""
+        borrowing = self.get_object()
+        payment = (
+            Payment.objects.filter(borrowing=borrowing, type="Payment")
+            .order_by("-id")
+            .first()
+        )
+        if payment is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        data = {
+            "payment": payment.id,
+            "status": payment.status,
+            "session_url": payment.session_url,
+            "session_id": payment.session_id,
+        }
+        if payment.status == "Creating":
+            return Response(
+                data, status=status.HTTP_202_ACCEPTED, headers={"Retry-After": "1"}
+            )
+        return Response(data)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -147,7 +258,137 @@ class BorrowingViewSet(
                 type={"type": "string"},
                 description="Filter by is_active borrowing  (ex. ?is_active=True)",
             ),
+            OpenApiParameter(
+                "overdue",
+                type={"type": "string"},
+                description="Filter by overdue borrowing  (ex. ?overdue=True)",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        response = super(BorrowingViewSet, self).list(request, *args, **kwargs)
+        # Validated by the page itself, a watermark over the whole filtered
+        # set would cost a full COUNT on every request
+        etag = make_etag("borrowings", json.dumps(response.data, cls=DjangoJSONEncoder))
+        return self.conditional_response(request, etag, None, lambda: response)
+
+    def get_archive_queryset(self):
+        queryset = ArchivedBorrowing.objects.select_related("book", "user")
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
+    @staticmethod
+    def _params_to_date(name: str, qs: str):
+        """Converts an ISO date, a 400 response when it isn't one"""
+        try:
+            return DateField().to_internal_value(qs)
+        except ValidationError as error:
+            raise ValidationError({name: error.detail})
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "borrowed_after",
+                type={"type": "string"},
+                description="Borrowed on or after the date (ex. ?borrowed_after=2023-01-01)",
+            ),
+            OpenApiParameter(
+                "borrowed_before",
+                type={"type": "string"},
+                description="Borrowed before the date (ex. ?borrowed_before=2024-01-01)",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="archive")
+    def archive(self, request):
+        """Endpoint for listing archived borrowings, filtered by borrow date"""
+        queryset = self.get_archive_queryset()
+
+        """Filtering by borrow date, so only the matching partitions are read"""
+        borrowed_after = request.query_params.get("borrowed_after")
+        borrowed_before = request.query_params.get("borrowed_before")
+        if borrowed_after:
+            queryset = queryset.filter(
+                borrow_date__gte=self._params_to_date("borrowed_after", borrowed_after)
+            )
+        if borrowed_before:
+            queryset = queryset.filter(
+                borrow_date__lt=self._params_to_date("borrowed_before", borrowed_before)
+            )
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=["GET"], detail=False, url_path="stats")
+    def stats(self, request):
+        """Endpoint for the borrowing totals of the user, a primary key lookup"""
+        stats = BorrowingStats.objects.filter(user=request.user).first()
+        serializer = BorrowingStatsSerializer(
+            stats or BorrowingStats(user=request.user)
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def retrieve_archived(self, request, pk):
+        """Borrowings moved to the archive stay readable by their id"""
+        archived = get_object_or_404(self.get_archive_queryset(), pk=pk)
+        etag = make_etag("archived-borrowing", archived.id, archived.archived_at)
+        return self.conditional_response(
+            request,
+            etag,
+            archived.archived_at,
+            lambda: Response(ArchivedBorrowingSerializer(archived).data),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            borrowing = self.get_object()
+        except Http404:
+            return self.retrieve_archived(request, kwargs["pk"])
+        # The book is embedded, so its changes move the validators too
+        etag = make_etag(
+            "borrowing", borrowing.id, borrowing.updated_at, get_catalog_version()
+        )
+        return self.conditional_response(
+            request,
+            etag,
+            max(borrowing.updated_at, get_catalog_last_modified()),
+            lambda: Response(self.get_serializer(borrowing).data),
+        )
+
+
+class ReservationViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    """Endpoint for holding books out of stock, allocated in order on return"""
+
+    queryset = Reservation.objects.all()
+    serializer_class = ReservationSerializer
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (
+        rest_framework_simplejwt.authentication.JWTAuthentication,
+    )
+    query_budgets = {
+        "list": 2,
+        "retrieve": 1,
+        "create": 4,
+        "destroy": 8,
+    }
+
+    def get_queryset(self):
+        queryset = annotate_queue_position(self.queryset)
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        """Cancels the reservation, an allocated copy goes to the next holder"""
+        cancel_reservation(instance.id)
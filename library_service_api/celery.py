@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.schedules import crontab
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "library_service_api.settings")
@@ -16,6 +17,25 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+app.conf.beat_schedule = {
+    "dispatch-telegram-outbox": {
+        "task": "borrowings.tasks.dispatch_telegram_outbox",
+        "schedule": 10.0,
+    },
+    "expire-reservation-allocations": {
+        "task": "borrowings.tasks.expire_reservation_allocations",
+        "schedule": 300.0,
+    },
+    "archive-returned-borrowings": {
+        "task": "borrowings.tasks.archive_old_borrowings",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "update-analytics-rollups": {
+        "task": "analytics.tasks.update_analytics_rollups",
+        "schedule": 300.0,
+    },
+}
+
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
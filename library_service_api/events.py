@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Iterable
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL_PREFIX = "events:user:"
+# Comment line sent on idle streams, so proxies keep the connection open
+EVENTS_HEARTBEAT_SECONDS = 15
+# Streams end after this long and EventSource reconnects, so a stream
+# whose client went away is never kept for long
+EVENTS_STREAM_SECONDS = 300
+EVENTS_RETRY_MILLISECONDS = 3000
+EVENTS_QUEUE_SIZE = 100
+
+_redis = None
+
+
+def get_user_channel(user_id: int) -> str:
+    return f"{EVENTS_CHANNEL_PREFIX}{user_id}"
+
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+    return _redis
+
+
+def _publish(messages: list[tuple[str, str]]) -> None:
+    try:
+        pipeline = get_redis().pipeline(transaction=False)
+        for channel, message in messages:
+            pipeline.publish(channel, message)
+        pipeline.execute()
+    except redis.RedisError:
+        logger.warning("Events could not be published", exc_info=True)
+
+
+def publish_events(events: Iterable[tuple[int, str, dict]]) -> None:
+    """Publishes ``(user id, event name, data)`` once the transaction commits.
+
+    Subscribers only hear about committed state, and a rolled back
+    transaction publishes nothing. Events are dropped without
+    ``EVENTS_REDIS_URL``, before the events are even built.
+    """
+    if not settings.EVENTS_REDIS_URL:
+        return
+    messages = [
+        (
+            get_user_channel(user_id),
+            json.dumps({"event": name, "data": data}, cls=DjangoJSONEncoder),
+        )
+        for user_id, name, data in events
+    ]
+    if messages:
+        transaction.on_commit(lambda: _publish(messages))
+
+
+def publish_borrowing_events(borrowings) -> None:
+    publish_events(
+        (
+            (
+                borrowing.user_id,
+                "borrowing",
+                {
+                    "id": borrowing.id,
+                    "book": borrowing.book_id,
+                    "expected_return_date": borrowing.expected_return_date,
+                    "actual_return_date": borrowing.actual_return_date,
+                },
+            )
+            for borrowing in borrowings
+        )
+    )
+
+
+def publish_payment_events(payments) -> None:
+    publish_events(
+        (
+            (
+                payment.borrowing.user_id,
+                "payment",
+                {
+                    "id": payment.id,
+                    "borrowing": payment.borrowing_id,
+                    "type": payment.type,
+                    "status": payment.status,
+                    "session_url": payment.session_url,
+                    "money_to_pay": payment.money_to_pay,
+                },
+            )
+            for payment in payments
+        )
+    )
+
+
+class EventBroker:
+    """One Redis subscription per process, fanned out to the open streams.
+
+    The streams of a process share a pattern subscription instead of
+    holding a Redis connection each, so an idle stream costs a queue.
+    """
+
+    def __init__(self):
+        self.queues = defaultdict(set)
+        self.listener = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.queues[user_id].add(queue)
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        self.queues[user_id].discard(queue)
+        if not self.queues[user_id]:
+            del self.queues[user_id]
+
+    def dispatch(self, user_id: int, message: bytes) -> None:
+        for queue in self.queues.get(user_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A stalled client reads the current state when it reconnects
+                pass
+
+    async def listen(self) -> None:
+        while True:
+            client = aioredis.Redis.from_url(settings.EVENTS_REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{EVENTS_CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    user_id = int(message["channel"].rsplit(b":", 1)[1])
+                    self.dispatch(user_id, message["data"])
+            except redis.RedisError:
+                logger.warning("Event subscription lost, reconnecting", exc_info=True)
+                await asyncio.sleep(1)
+            except Exception:
+                # A bad message must not end the only subscription of the process
+                logger.exception("Event listener failed, resubscribing")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+broker = EventBroker()
+
+
+def format_event(message: bytes) -> str:
+    payload = json.loads(message)
+    return f"event: {payload['event']}\ndata: {json.dumps(payload['data'])}\n\n"
+
+
+async def stream_events(user_id: int, seconds: float = EVENTS_STREAM_SECONDS):
+    """Server-sent events of the user, with heartbeats while idle"""
+    queue = broker.subscribe(user_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    try:
+        yield f"retry: {EVENTS_RETRY_MILLISECONDS}\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(
+                    queue.get(), min(EVENTS_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_event(message)
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+def get_stream_user_id(request) -> int:
+    """User id of the access token, from the header or ``?token=``.
+
+    EventSource can't send headers, so browsers pass the token in the
+    query string. The token is only validated, the user isn't loaded.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = (
+        authentication.get_raw_token(header)
+        if header
+        else request.GET.get("token", "").encode()
+    )
+    if not raw_token:
+        raise InvalidToken("Authentication credentials were not provided.")
+    validated_token = authentication.get_validated_token(raw_token)
+    return validated_token[api_settings.USER_ID_CLAIM]
+
+
+async def event_stream(request):
+    """Endpoint streaming the borrowing and payment changes of the user.
+
+    Needs an ASGI server, under WSGI the stream would be buffered.
+    """
+    try:
+        user_id = get_stream_user_id(request)
+    except (InvalidToken, TokenError, KeyError):
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided or not valid."},
+            status=401,
+        )
+    if not settings.EVENTS_REDIS_URL:
+        return JsonResponse({"detail": "Events are not configured."}, status=503)
+
+    response = StreamingHttpResponse(
+        stream_events(user_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,168 @@
+import json
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    LimitOffsetPagination,
+)
+from rest_framework.utils.urls import replace_query_param
+
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination keyed on every field of the model ordering.
+
+    Unlike the DRF cursor, which keys on the first ordering field plus an
+    offset, the cursor holds the values of all ordering fields of the last
+    row (``title, id`` for books), so each page is a single index range scan
+    and no page ever runs an OFFSET or a COUNT(*).
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        self.model = queryset.model
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = self._reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None and self.cursor.position is not None:
+            queryset = queryset.filter(
+                self._get_position_filter(ordering, self.cursor.position)
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        has_cursor_position = self.cursor is not None and bool(self.cursor.position)
+        self.has_next = True if reverse else has_more
+        self.has_previous = has_more if reverse else has_cursor_position
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def get_ordering(self, request, queryset, view):
+        """Uses the model ordering, made unique by the primary key"""
+        ordering = tuple(queryset.model._meta.ordering)
+        if not {"id", "-id", "pk", "-pk"} & set(ordering):
+            ordering += ("id",)
+        return ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        if not encoded:
+            return Cursor(offset=0, reverse=False, position=None)
+
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+            position = json.loads(tokens["p"][0])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {"p": json.dumps(cursor.position, cls=DjangoJSONEncoder)}
+        if cursor.reverse:
+            tokens["r"] = "1"
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field_name in ordering:
+            field_name = field_name.lstrip("-")
+            if field_name == "pk":
+                field_name = "id"
+            if isinstance(instance, dict):
+                position.append(instance[field_name])
+            else:
+                position.append(getattr(instance, field_name))
+        return position
+
+    def _get_position_filter(self, ordering, position) -> Q:
+        """Builds ``(a > x) OR (a = x AND b > y) OR ...`` for the row values"""
+        values = []
+        for field_name, value in zip(ordering, position):
+            field = self.model._meta.get_field(field_name.lstrip("-"))
+            try:
+                values.append(field.to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        position_filter = Q()
+        for index, field_name in enumerate(ordering):
+            lookup = "lt" if field_name.startswith("-") else "gt"
+            condition = Q(**{f"{field_name.lstrip('-')}__{lookup}": values[index]})
+            for previous_name, previous_value in zip(ordering[:index], values):
+                condition &= Q(**{previous_name.lstrip("-"): previous_value})
+            position_filter |= condition
+        return position_filter
+
+    @staticmethod
+    def _reverse_ordering(ordering):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}" for field in ordering
+        )
+
+
+class LibraryPagination(LimitOffsetPagination):
+    """Limit/offset pagination, switching to keyset pagination on ``?cursor=``"""
+
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_paginator = None
+        if self.keyset_pagination_class.cursor_query_param in request.query_params:
+            self.keyset_paginator = self.keyset_pagination_class()
+            self.display_page_controls = True
+            return self.keyset_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(
+            view
+        ) + self.keyset_pagination_class().get_schema_operation_parameters(view)
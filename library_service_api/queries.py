@@ -0,0 +1,126 @@
+import logging
+import traceback
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_call_site() -> str:
+    """Innermost frame of the project code that ran the query"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename.startswith(base_dir)
+            and "site-packages" not in filename
+            and filename != __file__
+        ):
+            return f"{Path(filename).relative_to(base_dir)}:{frame.lineno}"
+    return "unknown"
+
+
+class QueryInspector:
+    """Records the queries run inside the block with their call sites.
+
+    Queries are grouped by SQL text before the parameters are bound, so
+    the same statement run once per row of a page, the N+1 pattern,
+    shows up as one group with many call counts.
+    """
+
+    def __init__(self, duplicate_threshold: int = None):
+        self.duplicate_threshold = (
+            duplicate_threshold or settings.QUERY_DUPLICATE_THRESHOLD
+        )
+        self.count = 0
+        self.statements = defaultdict(list)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        if not sql.startswith(TRANSACTION_STATEMENTS):
+            self.statements[sql].append(get_call_site())
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def get_duplicates(self) -> list[tuple[str, int, list[str]]]:
+        """(sql, times run, distinct call sites) of the repeated statements"""
+        return [
+            (sql, len(call_sites), sorted(set(call_sites)))
+            for sql, call_sites in self.statements.items()
+            if len(call_sites) >= self.duplicate_threshold
+        ]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries"]
+        for sql, times, call_sites in self.get_duplicates():
+            lines.append(f"{times}x {sql[:200]}\n    at {', '.join(call_sites)}")
+        return "\n".join(lines)
+
+
+def get_query_budget(view_func, method: str) -> Optional[int]:
+    """Budget the viewset declares for the action routed to the method.
+
+    Viewsets declare ``query_budgets``, the most queries each action may
+    run, e.g. ``{"list": 2, "retrieve": 1}``. The API tests run with
+    ``QUERY_INSPECTOR="raise"``, so a view going over its budget fails
+    them; actions without a budget are only counted.
+    """
+    view_class = getattr(view_func, "cls", None)
+    actions = getattr(view_func, "actions", None) or {}
+    action = actions.get(method.lower())
+    if view_class is None or action is None:
+        return None
+    return getattr(view_class, "query_budgets", {}).get(action)
+
+
+class QueryInspectorMiddleware:
+    """Counts the queries of each request when ``QUERY_INSPECTOR`` is on.
+
+    ``log`` adds an ``X-Query-Count`` header and logs repeated statements
+    and exceeded budgets; ``raise`` fails the request when the view goes
+    over its ``query_budgets``, which is how the test suite enforces them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.QUERY_INSPECTOR
+        if mode not in ("log", "raise"):
+            return self.get_response(request)
+
+        request.query_budget = None
+        with QueryInspector() as inspector:
+            response = self.get_response(request)
+        response["X-Query-Count"] = str(inspector.count)
+
+        path = f"{request.method} {request.path}"
+        budget = request.query_budget
+        if budget is not None and inspector.count > budget:
+            message = f"{path} is over its budget of {budget}: {inspector.report()}"
+            if mode == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        elif inspector.get_duplicates():
+            logger.warning(f"{path} repeats queries: {inspector.report()}")
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "debug_toolbar",
     "rest_framework",
     "drf_spectacular",
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
     "payments",
     "books",
     "user",
+    "analytics",
 ]
 
 MIDDLEWARE = [
@@ -59,6 +61,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "library_service_api.queries.QueryInspectorMiddleware",
 ]
 
 ROOT_URLCONF = "library_service_api.urls"
@@ -145,11 +148,43 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY")
+# Create Stripe sessions in a Celery task instead of the borrowing request
+STRIPE_ASYNC_CHECKOUT = os.getenv("STRIPE_ASYNC_CHECKOUT", "False").lower() == "true"
+
+# Returned borrowings older than this move to the partitioned archive
+BORROWING_ARCHIVE_AFTER_DAYS = int(os.getenv("BORROWING_ARCHIVE_AFTER_DAYS", 365))
+
+# Hours a returned copy is held for the head of the reservation queue
+RESERVATION_HOLD_HOURS = int(os.getenv("RESERVATION_HOLD_HOURS", 48))
+
+# Per-request query counting: "off", "log" or "raise" (see queries.py)
+QUERY_INSPECTOR = os.getenv("QUERY_INSPECTOR", "off").lower()
+QUERY_DUPLICATE_THRESHOLD = 3
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# Redis pub/sub feeding the server-sent events, off when unset
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", REDIS_URL)
+
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = "Europe/Kiev"
@@ -159,7 +194,7 @@ CELERY_TASK_TIME_LIMIT = 30 * 60
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_PAGINATION_CLASS": "library_service_api.pagination.LibraryPagination",
     "PAGE_SIZE": 6,
 }
 
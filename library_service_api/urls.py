@@ -21,12 +21,16 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from library_service_api.events import event_stream
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/books/", include("books.urls", namespace="books")),
     path("api/borrowings/", include("borrowings.urls", namespace="borrowings")),
     path("api/payments/", include("payments.urls", namespace="payments")),
     path("api/user/", include("user.urls", namespace="user")),
+    path("api/analytics/", include("analytics.urls", namespace="analytics")),
+    path("api/events/", event_stream, name="events"),
     path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from payments.models import Payment
+from payments.models import AccountStanding, Payment
 
 admin.site.register(Payment)
+admin.site.register(AccountStanding)
@@ -0,0 +1,74 @@
+from django.db import transaction
+from rest_framework.request import Request
+
+from borrowings.models import Borrowing
+from library_service_api.events import publish_payment_events
+from payments.models import Payment
+from payments.standing import refresh_account_standing
+from payments.stripe_session import (
+    get_checkout_amount,
+    get_checkout_urls,
+    get_payment_amount,
+)
+from payments.tasks import create_checkout_session
+
+
+def start_checkout(borrowing: Borrowing, request: Request) -> Payment:
+    """Saves a placeholder payment and creates its Stripe session after commit.
+
+    The borrowing request never waits for Stripe: the client polls the
+    borrowing ``checkout/`` endpoint until the session url is there.
+    """
+    return start_cart_checkout([borrowing], request)[0]
+
+
+def start_cart_checkout(borrowings: list[Borrowing], request: Request) -> list:
+    """Placeholder payments of several borrowings sharing one Stripe session"""
+    payments = Payment.objects.bulk_create(
+        Payment(
+            status="Creating",
+            type="Payment",
+            borrowing=borrowing,
+            money_to_pay=get_checkout_amount(borrowing)[0] / 100,
+        )
+        for borrowing in borrowings
+    )
+    refresh_account_standing([borrowing.id for borrowing in borrowings])
+    publish_payment_events(payments)
+    payment_ids = [payment.id for payment in payments]
+    success_url, cancel_url = get_checkout_urls(request)
+    transaction.on_commit(
+        lambda: create_checkout_session.delay(payment_ids, success_url, cancel_url)
+    )
+    return payments
+
+
+def start_fine_checkout(borrowings: list[Borrowing], request: Request) -> list:
+    """Placeholder fines of returned overdue borrowings, one session each.
+
+    Borrowings which already have a fine are skipped.
+    """
+    fined = set(
+        Payment.objects.filter(borrowing__in=borrowings, type="Fine").values_list(
+            "borrowing_id", flat=True
+        )
+    )
+    payments = [
+        Payment(status="Creating", type="Fine", borrowing=borrowing)
+        for borrowing in borrowings
+        if borrowing.id not in fined
+    ]
+    for payment in payments:
+        payment.money_to_pay = get_payment_amount(payment)[0] / 100
+    payments = Payment.objects.bulk_create(payments)
+    if payments:
+        refresh_account_standing([payment.borrowing_id for payment in payments])
+    publish_payment_events(payments)
+    success_url, cancel_url = get_checkout_urls(request)
+    for payment in payments:
+        transaction.on_commit(
+            lambda payment_id=payment.id: create_checkout_session.delay(
+                [payment_id], success_url, cancel_url
+            )
+        )
+    return payments
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.5 on 2026-10-17 07:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0002_alter_payment_money_to_pay"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="payment",
+            options={"ordering": ("id",)},
+        ),
+    ]
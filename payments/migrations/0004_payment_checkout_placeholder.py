@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-17 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payments", "0003_keyset_ordering"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="session_id",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="session_url",
+            field=models.URLField(blank=True, max_length=400),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("Creating", "Creating"),
+                    ("Pending", "Pending"),
+                    ("Paid", "Paid"),
+                ],
+                default="PENDING",
+                max_length=255,
+            ),
+        ),
+    ]
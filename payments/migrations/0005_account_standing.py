@@ -0,0 +1,60 @@
+# Generated by Django 4.2.5 on 2026-10-17 08:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def build_account_standings(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    AccountStanding = apps.get_model("payments", "AccountStanding")
+    pending = (
+        Payment.objects.filter(status="Pending")
+        .values("borrowing__user_id")
+        .annotate(count=Count("id"), amount=Sum("money_to_pay"))
+        .order_by()
+    )
+    AccountStanding.objects.bulk_create(
+        [
+            AccountStanding(
+                user_id=row["borrowing__user_id"],
+                pending_payments=row["count"],
+                outstanding_amount=row["amount"],
+            )
+            for row in pending.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0001_initial"),
+        ("payments", "0004_payment_checkout_placeholder"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountStanding",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="account_standing",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("pending_payments", models.PositiveIntegerField(default=0)),
+                (
+                    "outstanding_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_account_standings, migrations.RunPython.noop),
+    ]
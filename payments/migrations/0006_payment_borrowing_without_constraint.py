@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-17 09:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("borrowings", "0011_borrowingstats"),
+        ("payments", "0005_account_standing"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="borrowing",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payments",
+                to="borrowings.borrowing",
+            ),
+        ),
+    ]
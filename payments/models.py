@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -6,6 +7,7 @@ from borrowings.models import Borrowing
 
 class Payment(models.Model):
     class StatusChoices(models.TextChoices):
+        CREATING = "Creating"
         PENDING = "Pending"
         PAID = "Paid"
 
@@ -19,14 +21,42 @@ class Payment(models.Model):
     type = models.CharField(
         choices=TypeChoices.choices, default="PAYMENT", max_length=255
     )
+    # No database constraint: the payments of archived borrowings stay
+    # here after the borrowing row moves to the archive table
     borrowing = models.ForeignKey(
-        Borrowing, on_delete=models.CASCADE, related_name="payments"
+        Borrowing,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="payments",
     )
-    session_url = models.URLField(max_length=400)
-    session_id = models.CharField(max_length=255)
+    session_url = models.URLField(max_length=400, blank=True)
+    session_id = models.CharField(max_length=255, blank=True)
     money_to_pay = models.DecimalField(
         max_digits=12, decimal_places=2, validators=[MinValueValidator(0)]
     )
 
+    class Meta:
+        ordering = ("id",)
+
     def __str__(self) -> str:
         return f"{self.type}: {self.status} ({self.money_to_pay}USD)"
+
+
+class AccountStanding(models.Model):
+    """Pending payments of a user, kept in step with every payment change"""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="account_standing",
+    )
+    pending_payments = models.PositiveIntegerField(default=0)
+    outstanding_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.user}: {self.pending_payments} pending "
+            f"({self.outstanding_amount}USD)"
+        )
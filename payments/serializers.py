@@ -1,8 +1,6 @@
 from rest_framework import serializers
 
-from borrowings.notifications import send_telegram_notification
-from payments.models import Payment
-from payments.utils import get_payment_info
+from payments.models import AccountStanding, Payment
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -18,12 +16,12 @@ class PaymentSerializer(serializers.ModelSerializer):
             "money_to_pay",
         )
 
-    def update(self, instance, validated_data):
-        instance = super().update(instance, validated_data)
-        message = "Payment has been made successfully\n" + get_payment_info(instance)
-        send_telegram_notification(message)
-        return instance
-
 
 class PaymentDetailSerializer(PaymentSerializer):
     borrowing = serializers.StringRelatedField(many=False, read_only=True)
+
+
+class AccountStandingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AccountStanding
+        fields = ("pending_payments", "outstanding_amount")
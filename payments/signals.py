@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from borrowings.models import Borrowing
+from library_service_api.events import publish_payment_events
+from payments.models import Payment
+from payments.standing import refresh_account_standing
+
+
+@receiver([post_save, post_delete], sender=Payment)
+def touch_borrowing(sender, instance, **kwargs):
+    """Payments are shown in the borrowing detail, so they move its watermark"""
+    Borrowing.objects.filter(pk=instance.borrowing_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Payment)
+def update_account_standing(sender, instance, **kwargs):
+    refresh_account_standing([instance.borrowing_id])
+
+
+@receiver(post_delete, sender=Payment)
+def recount_account_standing(sender, instance, **kwargs):
+    """Never recreates the standing, it's gone when the user is deleted"""
+    refresh_account_standing([instance.borrowing_id], create=False)
+
+
+@receiver(post_save, sender=Payment)
+def publish_payment_change(sender, instance, **kwargs):
+    publish_payment_events([instance])
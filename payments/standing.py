@@ -0,0 +1,63 @@
+from django.db import connection
+
+from borrowings.models import Borrowing
+from payments.models import AccountStanding, Payment
+
+
+def refresh_account_standing(borrowing_ids: list[int], create: bool = True) -> None:
+    """Recounts the pending payments of the users of the borrowings.
+
+    Placeholders still waiting for their Stripe session count as pending,
+    so a user can't borrow around a checkout that is being created.
+
+    Runs in the transaction that changed the payments. The first statement
+    creates or locks the standing rows, so the recount below starts after
+    any concurrent payment change of the same user has committed. With
+    ``create=False`` only existing rows are recounted, deleting a user
+    cascades to the standing before the payments are deleted.
+    """
+    standing = AccountStanding._meta.db_table
+    borrowing = Borrowing._meta.db_table
+    payment = Payment._meta.db_table
+    with connection.cursor() as cursor:
+        if create:
+            cursor.execute(
+                f"""
+                INSERT INTO {standing} (user_id, pending_payments, outstanding_amount, updated_at)
+                SELECT DISTINCT user_id, 0, 0, now()
+                FROM {borrowing}
+                WHERE id = ANY(%s)
+                ORDER BY user_id
+                ON CONFLICT (user_id) DO UPDATE SET updated_at = EXCLUDED.updated_at
+                """,
+                [borrowing_ids],
+            )
+        cursor.execute(
+            f"""
+            UPDATE {standing} AS standing
+            SET pending_payments = totals.pending_payments,
+                outstanding_amount = totals.outstanding_amount
+            FROM (
+                SELECT borrowing.user_id,
+                       COUNT(payment.id) AS pending_payments,
+                       COALESCE(SUM(payment.money_to_pay), 0) AS outstanding_amount
+                FROM {borrowing} AS borrowing
+                LEFT JOIN {payment} AS payment
+                  ON payment.borrowing_id = borrowing.id
+                 AND payment.status IN ('Creating', 'Pending')
+                WHERE borrowing.user_id IN (
+                    SELECT user_id FROM {borrowing} WHERE id = ANY(%s)
+                )
+                GROUP BY borrowing.user_id
+            ) AS totals
+            WHERE standing.user_id = totals.user_id
+            """,
+            [borrowing_ids],
+        )
+
+
+def has_pending_payments(user_id: int) -> bool:
+    """Single primary key lookup on the standing of the user"""
+    return AccountStanding.objects.filter(
+        user_id=user_id, pending_payments__gt=0
+    ).exists()
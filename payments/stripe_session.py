@@ -5,7 +5,9 @@ from rest_framework.request import Request
 from rest_framework.reverse import reverse
 
 from borrowings.models import Borrowing
+from library_service_api.events import publish_payment_events
 from payments.models import Payment
+from payments.standing import refresh_account_standing
 
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -25,9 +27,10 @@ def create_payment(
     )
 
 
-def create_stripe_session_and_payment(
-    borrowing: Borrowing, request: Request, payment_type: str, overdue_days: int = None
-):
+def get_checkout_amount(
+    borrowing: Borrowing, overdue_days: int = None
+) -> tuple[int, str]:
+    """Amount in cents and product name of a borrowing payment or fine"""
     book = borrowing.book
     if overdue_days is None:
         borrowing_period = (borrowing.expected_return_date - borrowing.borrow_date).days
@@ -39,10 +42,34 @@ def create_stripe_session_and_payment(
     else:
         amount = int(book.daily_fee * overdue_days * 100) * FINE_MULTIPLIER
         product_name = f"Fine payment for {book.title}: {overdue_days} days overdue"
+    return amount, product_name
+
+
+def get_payment_amount(payment: Payment) -> tuple[int, str]:
+    """Amount in cents and product name of an existing payment or fine"""
+    borrowing = payment.borrowing
+    if payment.type == "Fine":
+        overdue_days = (
+            borrowing.actual_return_date - borrowing.expected_return_date
+        ).days
+        return get_checkout_amount(borrowing, overdue_days)
+    return get_checkout_amount(borrowing)
 
+
+def get_checkout_urls(request: Request) -> tuple[str, str]:
     success_url = reverse("payments:payment-success", request=request)
     cancel_url = reverse("payments:payment-cancel", request=request)
-    session = stripe.checkout.Session.create(
+    return success_url, cancel_url
+
+
+def create_stripe_session(
+    line_items: list[tuple[int, str]],
+    success_url: str,
+    cancel_url: str,
+    idempotency_key: str = None,
+) -> stripe.checkout.Session:
+    """One checkout session with a line item per (amount, product name)"""
+    return stripe.checkout.Session.create(
         line_items=[
             {
                 "price_data": {
@@ -54,11 +81,48 @@ def create_stripe_session_and_payment(
                 },
                 "quantity": 1,
             }
+            for amount, product_name in line_items
         ],
         mode="payment",
         success_url=success_url + "?session_id={CHECKOUT_SESSION_ID}",
         cancel_url=cancel_url + "?session_id={CHECKOUT_SESSION_ID}",
+        idempotency_key=idempotency_key,
     )
+
+
+def create_stripe_session_and_payment(
+    borrowing: Borrowing, request: Request, payment_type: str, overdue_days: int = None
+):
+    amount, product_name = get_checkout_amount(borrowing, overdue_days)
+    success_url, cancel_url = get_checkout_urls(request)
+    session = create_stripe_session([(amount, product_name)], success_url, cancel_url)
     if not Payment.objects.filter(Q(borrowing=borrowing) & Q(type=payment_type)):
         create_payment(borrowing, session, payment_type)
     return session
+
+
+def create_cart_session_and_payments(
+    borrowings: list[Borrowing], request: Request
+) -> stripe.checkout.Session:
+    """One Stripe session for several borrowings, one payment per borrowing.
+
+    The payments share the session, so paying it pays all of them.
+    """
+    line_items = [get_checkout_amount(borrowing) for borrowing in borrowings]
+    success_url, cancel_url = get_checkout_urls(request)
+    session = create_stripe_session(line_items, success_url, cancel_url)
+    payments = Payment.objects.bulk_create(
+        Payment(
+            status="Pending",
+            type="Payment",
+            borrowing=borrowing,
+            session_id=session.id,
+            session_url=session.url,
+            money_to_pay=amount / 100,
+        )
+        for borrowing, (amount, _) in zip(borrowings, line_items)
+    )
+    # bulk_create sends no post_save, so the standing is refreshed here
+    refresh_account_standing([payment.borrowing_id for payment in payments])
+    publish_payment_events(payments)
+    return session
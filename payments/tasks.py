@@ -4,9 +4,11 @@ from django.conf import settings
 from django.db.models import QuerySet
 
 from payments.models import Payment
+from payments.stripe_session import create_stripe_session, get_payment_amount
 
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
+CHECKOUT_MAX_RETRIES = 5
 
 
 def get_pending_payments() -> QuerySet:
@@ -17,9 +19,55 @@ def get_pending_payments() -> QuerySet:
 @shared_task
 def track_expire_stripe_sessions() -> None:
     pending_payments = get_pending_payments()
+    sessions = {}
     for payment in pending_payments:
         session_id = payment.session_id
-        session = stripe.checkout.Session.retrieve(session_id)
+        # Payments of a cart share their session
+        if session_id not in sessions:
+            sessions[session_id] = stripe.checkout.Session.retrieve(session_id)
+        session = sessions[session_id]
         if session.status == "expired":
             payment.status = "Expired"
             payment.save()
+
+
+@shared_task(bind=True, max_retries=CHECKOUT_MAX_RETRIES)
+def create_checkout_session(
+    self, payment_ids: list[int], success_url: str, cancel_url: str
+) -> None:
+    """Creates the Stripe session shared by placeholder payments.
+
+    The idempotency key makes a retried or redelivered task get the same
+    session back. Payments whose session can't be created are marked
+    Expired, so the borrower can ask for a new one with update_session_url.
+    """
+    payments = list(
+        Payment.objects.filter(id__in=payment_ids, status="Creating")
+        .select_related("borrowing__book")
+        .order_by("id")
+    )
+    if not payments:
+        return
+
+    line_items = [get_payment_amount(payment) for payment in payments]
+    ids = "-".join(str(payment.id) for payment in payments)
+    try:
+        session = create_stripe_session(
+            line_items,
+            success_url,
+            cancel_url,
+            idempotency_key=f"checkout-payment-{ids}",
+        )
+    except (stripe.error.APIConnectionError, stripe.error.RateLimitError) as error:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=error, countdown=2**self.request.retries)
+        payment_status, session_id, session_url = "Expired", "", ""
+    except stripe.error.StripeError:
+        payment_status, session_id, session_url = "Expired", "", ""
+    else:
+        payment_status, session_id, session_url = "Pending", session.id, session.url
+    for payment in payments:
+        payment.status = payment_status
+        payment.session_id = session_id
+        payment.session_url = session_url
+        payment.save()
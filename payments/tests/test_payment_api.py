@@ -3,18 +3,22 @@ from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
 from books.tests.test_book_api import sample_book
-from borrowings.models import Borrowing
-from payments.models import Payment
+from borrowings.models import Borrowing, TelegramMessage
+from payments.models import AccountStanding, Payment
 from payments.serializers import PaymentSerializer, PaymentDetailSerializer
 
 SUCCESS_URL = reverse("payments:payment-success")
 CANCEL_URL = reverse("payments:payment-cancel")
 PAYMENT_URL = reverse("payments:payment-list")
+EXPORT_URL = reverse("payments:payment-export")
+ME_URL = reverse("user:manage")
 BORROWING_DAYS = 7
 
 
@@ -31,6 +35,7 @@ class UnauthenticatedPaymentApiTests(APITestCase):
         self.assertEquals(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+@override_settings(QUERY_INSPECTOR="raise")
 class AuthenticatedPaymentApiTests(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -79,6 +84,11 @@ class AuthenticatedPaymentApiTests(APITestCase):
         self.assertEquals(response.status_code, status.HTTP_200_OK)
         self.assertEquals(response.data["results"], serializer.data)
 
+    def test_export_payments_not_allowed(self):
+        response = self.client.get(EXPORT_URL)
+
+        self.assertEquals(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_retrieve_own_payment_detail(self):
         own_payment = self.payment_user
         another_user_payment = self.payment_another_user
@@ -95,13 +105,8 @@ class AuthenticatedPaymentApiTests(APITestCase):
         self.assertEquals(response_own.data, serializer_own.data)
         self.assertEquals(response_another_user.status_code, status.HTTP_404_NOT_FOUND)
 
-    @patch("payments.serializers.send_telegram_notification")
     @patch("payments.views.stripe.checkout.Session.retrieve")
-    def test_payment_success(
-        self,
-        mock_data,
-        mock_data1,
-    ):
+    def test_payment_success(self, mock_data):
         mock_data.return_value = MagicMock(payment_status="paid")
         url_success_payment = (
             SUCCESS_URL + f"?session_id={self.payment_user.session_id}"
@@ -114,6 +119,67 @@ class AuthenticatedPaymentApiTests(APITestCase):
 
         self.assertEquals(response.status_code, status.HTTP_200_OK)
         self.assertEquals(response.data, serializer.data)
+        self.assertTrue(
+            TelegramMessage.objects.filter(
+                text__startswith="Payment has been made successfully"
+            ).exists()
+        )
+
+    @patch("payments.views.stripe.checkout.Session.retrieve")
+    def test_repeated_payment_success_notifies_once(self, mock_data):
+        mock_data.return_value = MagicMock(payment_status="paid")
+        url_success_payment = (
+            SUCCESS_URL + f"?session_id={self.payment_user.session_id}"
+        )
+
+        self.client.get(url_success_payment)
+        response = self.client.get(url_success_payment)
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(
+            TelegramMessage.objects.filter(
+                text__startswith="Payment has been made successfully"
+            ).count(),
+            1,
+        )
+
+    @patch("payments.views.stripe.checkout.Session.retrieve")
+    def test_account_standing_follows_payments(self, mock_data):
+        mock_data.return_value = MagicMock(payment_status="paid")
+        fine = Payment.objects.create(
+            status="Pending",
+            type="Fine",
+            borrowing=self.borrowing,
+            session_id="cs_fine",
+            money_to_pay=decimal.Decimal(10),
+        )
+
+        standing = AccountStanding.objects.get(user=self.user)
+        me = self.client.get(ME_URL)
+        self.client.get(SUCCESS_URL + f"?session_id={self.payment_user.session_id}")
+        standing_after_payment = AccountStanding.objects.get(user=self.user)
+        fine.delete()
+        me_after_fine_deleted = self.client.get(ME_URL)
+
+        self.assertEquals(standing.pending_payments, 2)
+        self.assertEquals(standing.outstanding_amount, self.money_to_pay + 10)
+        self.assertEquals(me.data["standing"]["pending_payments"], 2)
+        self.assertEquals(standing_after_payment.pending_payments, 1)
+        self.assertEquals(standing_after_payment.outstanding_amount, 10)
+        self.assertEquals(
+            me_after_fine_deleted.data["standing"],
+            {"pending_payments": 0, "outstanding_amount": "0.00"},
+        )
+        self.assertEquals(
+            AccountStanding.objects.get(user=self.user2).pending_payments, 0
+        )
+
+    def test_delete_user_with_pending_payment(self):
+        self.user.delete()
+        connection.check_constraints()
+
+        self.assertFalse(AccountStanding.objects.filter(user_id=self.user.id).exists())
+        self.assertFalse(Payment.objects.filter(id=self.payment_user.id).exists())
 
     def test_payment_cancel(self):
         url_cancel_payment = CANCEL_URL + f"?session_id={self.payment_user.session_id}"
@@ -135,6 +201,7 @@ class AuthenticatedPaymentApiTests(APITestCase):
         )
 
 
+@override_settings(QUERY_INSPECTOR="raise")
 class AdminPaymentApiTests(APITestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -177,6 +244,30 @@ class AdminPaymentApiTests(APITestCase):
             money_to_pay=self.money_to_pay,
         )
 
+    def test_list_payments_queries_do_not_grow_with_page(self):
+        response_one = self.client.get(PAYMENT_URL, {"limit": 20})
+        borrowings = Borrowing.objects.bulk_create(
+            Borrowing(
+                expected_return_date=datetime.now().date(),
+                book=sample_book(),
+                user=self.user2,
+            )
+            for _ in range(20)
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                status="Paid",
+                type="Payment",
+                borrowing=borrowing,
+                money_to_pay=self.money_to_pay,
+            )
+            for borrowing in borrowings
+        )
+        response_many = self.client.get(PAYMENT_URL, {"limit": 20})
+
+        self.assertEquals(len(response_many.data["results"]), 20)
+        self.assertEquals(response_many["X-Query-Count"], response_one["X-Query-Count"])
+
     def test_list_all_payments(self):
         payments = Payment.objects.all()
 
@@ -185,3 +276,10 @@ class AdminPaymentApiTests(APITestCase):
 
         self.assertEquals(response.status_code, status.HTTP_200_OK)
         self.assertEquals(response.data["results"], serializer.data)
+
+    def test_export_all_payments(self):
+        response = self.client.get(EXPORT_URL, data={"format": "ndjson"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(len(lines), Payment.objects.count())
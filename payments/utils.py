@@ -1,4 +1,12 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from borrowings.models import Borrowing
+from borrowings.notifications import queue_telegram_notifications
+from borrowings.stats import record_fines_paid
+from library_service_api.events import publish_payment_events
 from payments.models import Payment
+from payments.standing import refresh_account_standing
 
 
 def get_payment_info(payment: Payment) -> str:
@@ -10,3 +18,44 @@ def get_payment_info(payment: Payment) -> str:
         f"User: {payment.borrowing.user}"
     )
     return info
+
+
+@transaction.atomic
+def mark_payments_paid(payments: list[Payment]) -> None:
+    """Marks the payments of a paid session with one statement per table.
+
+    A cart session pays several payments, so the per-payment saves and
+    their signals are replaced by set-based writes. Only payments that were
+    not Paid yet count in the stats and are announced, so a repeated
+    success callback changes nothing.
+    """
+    borrowing_ids = [payment.borrowing_id for payment in payments]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {Payment._meta.db_table} SET status = 'Paid'
+            WHERE id = ANY(%s) AND status <> 'Paid'
+            RETURNING id
+            """,
+            [[payment.id for payment in payments]],
+        )
+        newly_paid = {row[0] for row in cursor.fetchall()}
+    record_fines_paid(
+        [
+            (payment.borrowing.user_id, payment.money_to_pay)
+            for payment in payments
+            if payment.id in newly_paid and payment.type == "Fine"
+        ]
+    )
+    Borrowing.objects.filter(id__in=borrowing_ids).update(updated_at=timezone.now())
+    refresh_account_standing(borrowing_ids)
+    for payment in payments:
+        payment.status = "Paid"
+    paid = [payment for payment in payments if payment.id in newly_paid]
+    publish_payment_events(paid)
+    queue_telegram_notifications(
+        [
+            "Payment has been made successfully\n" + get_payment_info(payment)
+            for payment in paid
+        ]
+    )
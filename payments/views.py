@@ -1,21 +1,44 @@
 import stripe
 import rest_framework_simplejwt.authentication
+from django.db.models import Q
+from django.http import Http404
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import mixins, status
 from rest_framework.viewsets import GenericViewSet
 
+from borrowings.models import ArchivedBorrowing, Borrowing
 from borrowings.notifications import send_telegram_notification
+from library_service_api.export import ExportMixin
 from payments.models import Payment
 from payments.serializers import PaymentSerializer, PaymentDetailSerializer
-from payments.utils import get_payment_info
+from payments.utils import get_payment_info, mark_payments_paid
 
 
-class PaymentViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericViewSet):
-    queryset = Payment.objects.all().select_related("borrowing__user")
+class PaymentViewSet(
+    ExportMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericViewSet
+):
+    queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    export_fields = (
+        "id",
+        "status",
+        "type",
+        "borrowing_id",
+        "session_url",
+        "session_id",
+        "money_to_pay",
+    )
+    query_budgets = {
+        "list": 2,
+        "retrieve": 3,
+        "export": 1,
+        "payment_success": 10,
+        "payment_cancel": 2,
+    }
     authentication_classes = (
         rest_framework_simplejwt.authentication.JWTAuthentication,
     )
@@ -31,12 +54,62 @@ class PaymentViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
         return super().get_permissions()
 
     def get_queryset(self):
+        """Payments of archived borrowings are matched through the archive"""
         queryset = self.queryset
         user = self.request.user
         if not user.is_staff:
-            queryset = queryset.filter(borrowing__user=user)
+            borrowings = Borrowing.objects.filter(user=user).values("id")
+            archived = ArchivedBorrowing.objects.filter(user=user).values("id")
+            queryset = queryset.filter(
+                Q(borrowing_id__in=borrowings) | Q(borrowing_id__in=archived)
+            )
         return queryset
 
+    @staticmethod
+    def attach_borrowings(payments: list[Payment]) -> list[Payment]:
+        """Loads the borrowings still in the hot table with one query.
+
+        Payments of archived borrowings are left without one, their
+        borrowing row lives in the archive.
+        """
+        borrowings = Borrowing.objects.select_related("book", "user").in_bulk(
+            {payment.borrowing_id for payment in payments}
+        )
+        for payment in payments:
+            if payment.borrowing_id in borrowings:
+                payment.borrowing = borrowings[payment.borrowing_id]
+        return payments
+
+    def retrieve(self, request, *args, **kwargs):
+        """The borrowing of an archived payment is read from the archive"""
+        payment = self.attach_borrowings([self.get_object()])[0]
+        if Payment.borrowing.is_cached(payment):
+            return Response(self.get_serializer(payment).data)
+
+        archived = get_object_or_404(
+            ArchivedBorrowing.objects.select_related("book", "user"),
+            id=payment.borrowing_id,
+        )
+        data = PaymentSerializer(payment).data
+        data["borrowing"] = str(archived)
+        return Response(data)
+
+    def get_session_payments(self, session_id: str) -> list[Payment]:
+        """Payments paid by the session, several for a cart checkout.
+
+        Payments of archived borrowings were paid before they were
+        archived, so a repeated callback only reads them.
+        """
+        payments = list(Payment.objects.filter(session_id=session_id).order_by("id"))
+        if not payments:
+            raise Http404
+        return self.attach_borrowings(payments)
+
+    @staticmethod
+    def session_data(data: list):
+        """A single payment keeps its flat response, a cart returns the list"""
+        return data[0] if len(data) == 1 else data
+
     @action(
         methods=["GET"],
         detail=False,
@@ -48,15 +121,12 @@ class PaymentViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
     def payment_success(self, request: Request):
         """Endpoint for successful stripe payment session"""
         session_id = request.query_params.get("session_id")
-        payment = Payment.objects.get(session_id=session_id)
+        payments = self.get_session_payments(session_id)
         session = stripe.checkout.Session.retrieve(session_id)
         if session.payment_status == "paid":
-            serializer = PaymentSerializer(
-                payment, data={"status": "Paid"}, partial=True
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            mark_payments_paid(payments)
+            data = PaymentSerializer(payments, many=True).data
+            return Response(self.session_data(data), status=status.HTTP_200_OK)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
     @action(
@@ -70,10 +140,13 @@ class PaymentViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, GenericVi
     def payment_cancel(self, request: Request):
         """Endpoint for canceled stripe payment session"""
         session_id = request.query_params.get("session_id")
-        payment = Payment.objects.get(session_id=session_id)
-        serializer = PaymentSerializer(payment)
+        payments = self.get_session_payments(session_id)
+        serializer = PaymentSerializer(payments, many=True)
+        session_data = self.session_data(serializer.data)
+        if isinstance(session_data, list):
+            session_data = {"payments": session_data}
         data = {
             "message": "You can make a payment during the next 24 hours.",
-            **serializer.data,
+            **session_data,
         }
         return Response(data=data, status=status.HTTP_200_OK)
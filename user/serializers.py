@@ -1,14 +1,24 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from payments.models import AccountStanding
+from payments.serializers import AccountStandingSerializer
+
 
 class UserSerializer(serializers.ModelSerializer):
+    standing = serializers.SerializerMethodField()
+
     class Meta:
         model = get_user_model()
-        fields = ["id", "email", "password", "is_staff"]
+        fields = ["id", "email", "password", "is_staff", "standing"]
         read_only_fields = ["id", "is_staff"]
         extra_kwargs = {"password": {"write_only": True, "min_length": 5}}
 
+    def get_standing(self, user) -> dict:
+        """Pending payments and outstanding amount, read from one row"""
+        standing = AccountStanding.objects.filter(user=user).first()
+        return AccountStandingSerializer(standing or AccountStanding(user=user)).data
+
     def create(self, validated_data):
         """Create user with encrypted password"""
         return get_user_model().objects.create_user(**validated_data)